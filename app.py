@@ -1,9 +1,19 @@
 #app.py
-from sqlalchemy import or_, and_, case
+import time
+IMPORT_STARTED = time.perf_counter()  # for the readiness endpoint's import-to-first-response time
+from sqlalchemy import or_, and_, case, func
 from sqlalchemy.exc import IntegrityError
 from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify
-from models import db, User, Movie as MovieModel, Review, WatchlistItem
+from models import db, User, Movie as MovieModel, MovieGenre, Review, WatchlistItem
+from movie_store import genre_ids_for_names
+from review_feed import review_page
+from rating_stats import record_review, get_rating_stats, movie_rating_stats
+from precompute_recommendations import precomputed_recommendations, discard_precomputed
 from config import SQLALCHEMY_DATABASE_URI, SQLALCHEMY_TRACK_MODIFICATIONS
+from config import (RECOMMENDATION_CACHE_BACKEND, RECOMMENDATION_CACHE_PATH,
+                    RECOMMENDATION_CACHE_TTL, RECOMMENDATION_CACHE_MAX_ENTRIES, MODEL_RELOAD_INTERVAL,
+                    MODEL_VERIFY_CHECKSUMS, REFERENCE_SNAPSHOT_DIR, REFERENCE_SNAPSHOT_MAX_AGE,
+                    MOOD_CATALOGUE_REFRESH_INTERVAL)
 from werkzeug.security import generate_password_hash, check_password_hash
 from tmdb_importer import fetch_and_store_trending_movies
 from tmdbv3api import TMDb, Movie as TMDbMovie
@@ -13,21 +23,18 @@ import requests
 from dateutil.relativedelta import relativedelta
 import pickle
 import pandas as pd
-import time
 from hybrid_recommend import get_hybrid_recommendations 
+from model_registry import ModelRegistry
+from mood_catalogue import MoodCatalogueRefresher, MOOD_GENRES, LANGUAGE_CODES, DECADES
+from reference_maps import ReferenceMap, build_genre_map, build_language_map
+from startup import StartupTracker
+from recommendation_cache import create_recommendation_cache
+from tmdb_client import tmdb_client
+from fanout import FanOut
 import re
 from werkzeug.utils import secure_filename
 
-# --- Initial Setup & Configuration ---
-try:
-    r = requests.get("https://api.themoviedb.org/3/movie/popular?api_key="YOUR_API_KEY"
-")
-    print("TMDB Test Status:", r.status_code)
-except Exception as e:
-    print("TMDB Test Failed:", e)
-
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
-TMDB_API_KEY = "YOUR_API_KEY"
+from config import TMDB_API_KEY
 # --- App Configuration ---
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'default_super_secret_key_for_dev')
@@ -35,72 +42,62 @@ app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = SQLALCHEMY_TRACK_MODIFICATIONS
 db.init_app(app)
 
-# --- Load Recommendation Models on Startup ---
-# This is done once when the app starts for efficiency.
-try:
-    print("Loading content-based model (movie_model.pkl)...")
-    with open("movie_model.pkl", "rb") as f:
-        movies_df, similarity_matrix, indices = pickle.load(f)
-    print("Content-based model loaded successfully.")
-
-    print("Loading collaborative filtering model (collaborative_model.pkl)...")
-    with open("collaborative_model.pkl", "rb") as f:
-        algo = pickle.load(f)
-    print("Collaborative filtering model loaded successfully.")
-
-    print("Loading ratings data (ratings.csv)...")
-    ratings_df = pd.read_csv('ratings.csv')
-    print("Ratings data loaded successfully.")
-    MODELS_LOADED = True
-except Exception as e:
-    print(f"Error loading models: {e}. Recommendation features will be disabled.")
-    movies_df, similarity_matrix, indices, algo, ratings_df = [None]*5
-    MODELS_LOADED = False
+# --- Startup ---
+# Nothing slow happens at import: scripts that import `app` for its app context
+# (export_ratings.py, populate_db.py, ...) never touch the network or the models. The
+# phases below run in the background on the first request each worker serves (or right
+# away under `python app.py`); /ready reports which of them are warm.
+startup = StartupTracker(imported_at=IMPORT_STARTED)
+
+# The registry holds the active model version; retrained artifacts are picked up by a
+# background watcher and swapped in without a restart (see model_registry.py). The content
+# model is memory-mapped, so all workers share one copy of the similarity arrays.
+# Until it has loaded, the dashboard simply renders without hybrid recommendations.
+model_registry = ModelRegistry(verify_checksums=MODEL_VERIFY_CHECKSUMS)
+
+
+def load_models():
+    loaded = model_registry.reload()
+    if not loaded:
+        print("Recommendation features are disabled until a valid model is available.")
+    model_registry.start_watching(interval=MODEL_RELOAD_INTERVAL)
+    return loaded
+
+# Per-user hybrid recommendation results, invalidated when a user's reviews or watchlist change.
+recommendation_cache = create_recommendation_cache(
+    backend=RECOMMENDATION_CACHE_BACKEND, path=RECOMMENDATION_CACHE_PATH,
+    ttl_seconds=RECOMMENDATION_CACHE_TTL, max_entries=RECOMMENDATION_CACHE_MAX_ENTRIES
+)
+
+
+def invalidate_recommendations(user_id):
+    """Drops the user's cached and precomputed recommendations after their reviews or watchlist change."""
+    recommendation_cache.invalidate_user(user_id)
+    discard_precomputed(user_id)
 
 # --- TMDb API and DB Setup ---
 tmdb = TMDb()
 tmdb.api_key = TMDB_API_KEY
 movie = TMDbMovie()
-# Create tables if they dont exist
-with app.app_context():
-    db.create_all()
+
+
+def create_tables():
+    # Create tables if they dont exist
+    with app.app_context():
+        db.create_all()
 
 # --- Helper Function for TMDB API Calls ---
 # This function reduces a lot of repeated code.
 
 
-def fetch_from_tmdb(endpoint_path, params={}, max_retries=3):
+def fetch_from_tmdb(endpoint_path, params={}):
     """
-    Fetches data from a TMDB endpoint with a built-in retry mechanism.
+    Fetches data from a TMDB endpoint through the shared TMDB client.
+    The client reuses pooled keep-alive connections, retries with exponential backoff
+    (honoring Retry-After), applies timeouts, and serves cached responses when possible.
+    Returns None if the resource was not found or the request failed.
     """
-    api_url = f"{TMDB_BASE_URL}/{endpoint_path}"
-    default_params = {'api_key': TMDB_API_KEY}
-    all_params = {**default_params, **params}
-
-    for attempt in range(max_retries):
-        try:
-            # Set a timeout to prevent requests from hanging indefinitely
-            response = requests.get(api_url, params=all_params, timeout=10)
-            
-            # This will raise an error for bad status codes like 404 or 401
-            response.raise_for_status() 
-            
-            # If we get here, the request was successful
-            return response.json() 
-
-        except (requests.exceptions.RequestException, ConnectionResetError) as e:
-            # This block catches network errors and the ConnectionResetError
-            print(f"Attempt {attempt + 1} failed for endpoint '{endpoint_path}'. Error: {e}")
-            
-            if attempt < max_retries - 1:
-                # If this wasn't the last attempt, wait before trying again
-                time.sleep(2) # Wait 2 seconds
-            else:
-                # If all attempts fail, print a final error message
-                print(f"All {max_retries} attempts failed for endpoint '{endpoint_path}'.")
-                return None # Return None to prevent the app from crashing
-
-    return None # Should not be reached, but good practice to have it
+    return tmdb_client.get(endpoint_path, params)
 # --- Helper Function to Parse Year Ranges ---
 
 def parse_year_range(year_string):
@@ -223,30 +220,50 @@ def logout():
 # =================================================================
 # Main Application Routes
 # =================================================================
-# --- Genre Mapping ---
-GENRE_MAP = {}
-with app.app_context():
-    try:
-        genre_data = fetch_from_tmdb("genre/movie/list")
-        if genre_data and 'genres' in genre_data:
-            GENRE_MAP = {genre['id']: genre['name'] for genre in genre_data['genres']}
-            print("Successfully fetched and mapped movie genres.")
-    except Exception as e:
-        print(f"Could not fetch movie genres: {e}")
+# --- Genre and Language Mapping ---
+# Read from on-disk snapshots of the TMDB payloads; the warm-up refreshes stale ones.
+GENRE_MAP = ReferenceMap('genres', "genre/movie/list", build_genre_map,
+                         REFERENCE_SNAPSHOT_DIR, REFERENCE_SNAPSHOT_MAX_AGE)
+LANGUAGE_MAP = ReferenceMap('languages', "configuration/languages", build_language_map,
+                            REFERENCE_SNAPSHOT_DIR, REFERENCE_SNAPSHOT_MAX_AGE)
 
+# Columnar snapshot of the movies table for /mood-recommendations, rebuilt in the background.
+mood_catalogue = MoodCatalogueRefresher(app)
 
 
-# --- Language Mapping ---
-LANGUAGE_MAP = {}
-with app.app_context():
-    try:
-        language_data = fetch_from_tmdb("configuration/languages")
-        if language_data:
-            # Create a map of 'english_name': 'iso_639_1'
-            LANGUAGE_MAP = {lang['english_name']: lang['iso_639_1'] for lang in language_data}
-            print("Successfully fetched and mapped all TMDB languages.")
-    except Exception as e:
-        print(f"Could not fetch languages: {e}")
+def load_mood_catalogue():
+    loaded = mood_catalogue.refresh()
+    mood_catalogue.start_refreshing(interval=MOOD_CATALOGUE_REFRESH_INTERVAL)
+    return loaded
+
+
+startup.register('database', create_tables)
+startup.register('models', load_models)
+startup.register('genres', GENRE_MAP.refresh, required=False)
+startup.register('languages', LANGUAGE_MAP.refresh, required=False)
+startup.register('mood_catalogue', load_mood_catalogue, required=False)
+
+
+@app.before_request
+def start_warmup():
+    startup.start()
+
+
+@app.after_request
+def record_first_response(response):
+    startup.record_response()
+    return response
+
+
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 once the database and models are warm, 503 until then."""
+    status = startup.status()
+    status['model'] = model_registry.status()
+    status['genres'] = GENRE_MAP.status()
+    status['languages'] = LANGUAGE_MAP.status()
+    status['mood_catalogue'] = mood_catalogue.status()
+    return jsonify(status), 200 if status['ready'] else 503
 
 # dictionary right below your PLATFORM_PROVIDER_IDS
 PLATFORM_COMPANY_IDS = {
@@ -260,6 +277,62 @@ PLATFORM_PROVIDER_IDS={
     'hotstar': 122
 }
 
+# Movies read per (genre, language) pair from the movie_genres index before ranking.
+GENRE_CANDIDATES_PER_GENRE = 50
+
+
+def preferred_genre_movies_from_index(genre_ids, lang_codes, n=8):
+    """
+    Top n movies in the user's preferred genres, ranked by how many of them they match, then
+    by votes. Each (genre_id[, language]) pair is a bounded ORDER BY vote_count DESC LIMIT k
+    range scan of the (genre_id, language, vote_count) index; only the merged candidates
+    (at most k per pair) are counted, so the cost does not grow with the size of a genre.
+    A movie outside every pair's top k is not considered.
+    """
+    pairs = [(g, lang) for g in genre_ids for lang in lang_codes] if lang_codes else [(g, None) for g in genre_ids]
+    candidates = set()
+    for genre_id, language in pairs:
+        query = db.session.query(MovieGenre.movie_id).filter(MovieGenre.genre_id == genre_id)
+        if language is not None:
+            query = query.filter(MovieGenre.language == language)
+        candidates.update(movie_id for movie_id, in
+                          query.order_by(MovieGenre.vote_count.desc()).limit(GENRE_CANDIDATES_PER_GENRE))
+    if not candidates:
+        return []
+
+    match_score = func.count(MovieGenre.genre_id).label('match_score')
+    top = db.session.query(MovieGenre.movie_id, match_score).filter(
+        MovieGenre.movie_id.in_(candidates), MovieGenre.genre_id.in_(genre_ids)
+    ).group_by(MovieGenre.movie_id).order_by(
+        match_score.desc(),
+        func.max(MovieGenre.vote_count).desc()
+    ).limit(n).subquery()
+
+    return MovieModel.query.join(top, MovieModel.id == top.c.movie_id).order_by(
+        top.c.match_score.desc(),
+        MovieModel.vote_count.desc()
+    ).all()
+
+
+def preferred_genre_movies_by_name(genre_names, lang_codes, n=8):
+    """The same panel from the movies.genre text column, for databases without movie_genres rows yet."""
+    genre_list = [genre.strip() for genre in genre_names]
+
+    match_score = 0
+    for g in genre_list:
+        match_score += case((MovieModel.genre.ilike(f'%{g}%'), 1), else_=0)
+
+    genre_filters = [MovieModel.genre.ilike(f'%{g}%') for g in genre_list]
+    query = MovieModel.query.filter(or_(*genre_filters))
+    if lang_codes:
+        query = query.filter(MovieModel.language.in_(lang_codes))
+
+    return query.order_by(
+        match_score.desc(),
+        MovieModel.vote_count.desc()
+    ).limit(n).all()
+
+
 @app.route('/dashboard', defaults={'platform': 'all'})
 @app.route('/dashboard/<platform>')
 def dashboard(platform):
@@ -277,16 +350,17 @@ def dashboard(platform):
     section_title = "" 
     provider_id = PLATFORM_PROVIDER_IDS.get(platform)
 
+    # The TMDB calls for sections 1 and 2 run in parallel while sections 3 and 4 query the DB and models.
+    upstream = FanOut()
+
     # 1. Fetch Trending Movies
     if platform == 'all':
-        data = fetch_from_tmdb("trending/movie/week", params={"language": "en-US"})
-        trending_movies = data.get("results", []) if data else []
+        upstream.submit('trending', fetch_from_tmdb, "trending/movie/week", params={"language": "en-US"})
     elif provider_id:
         trending_params = {
             'with_watch_providers': provider_id, 'watch_region': 'IN', 'sort_by': 'popularity.desc'
         }
-        data = fetch_from_tmdb("discover/movie", params=trending_params)
-        trending_movies = data.get("results", []) if data else []
+        upstream.submit('trending', fetch_from_tmdb, "discover/movie", params=trending_params)
 
     # 2. Fetch "Upcoming" or "Popular on Platform" Movies
     if platform == 'all':
@@ -299,79 +373,74 @@ def dashboard(platform):
             'primary_release_date.lte': future_date.strftime('%Y-%m-%d'),
             'with_release_type': '2|3'
         }
-        data = fetch_from_tmdb("discover/movie", params=api_params)
-        dynamic_section_movies = data.get("results", []) if data else []
+        upstream.submit('dynamic', fetch_from_tmdb, "discover/movie", params=api_params)
     elif provider_id:
         section_title = f"Popular on {platform.title()}"
         api_params = {
             'with_watch_providers': provider_id, 'watch_region': 'IN', 'sort_by': 'popularity.desc'
         }
-        data = fetch_from_tmdb("discover/movie", params=api_params)
-        dynamic_section_movies = data.get("results", []) if data else []
-
-    for movie in dynamic_section_movies:
-        genre_names = [GENRE_MAP.get(gid) for gid in movie.get('genre_ids', []) if GENRE_MAP.get(gid)]
-        movie['genres_str'] = ', '.join(genre_names)
+        upstream.submit('dynamic', fetch_from_tmdb, "discover/movie", params=api_params)
 
     # 3. Fetch "Popular in Your Preferred Genres"
     if user.preferred_genres:
-        genre_list = [genre.strip() for genre in user.preferred_genres.split(',')]
-        
-        match_score = 0
-        for g in genre_list:
-            match_score += case((MovieModel.genre.ilike(f'%{g}%'), 1), else_=0)
-        
-        genre_filters = [MovieModel.genre.ilike(f'%{g}%') for g in genre_list]
-        
+        genre_ids = genre_ids_for_names(user.preferred_genres.split(','))
+
         lang_codes = []
         if user.preferred_languages:
             preferred_langs_list = [lang.strip() for lang in user.preferred_languages.split(',')]
             lang_codes = [LANGUAGE_MAP.get(lang) for lang in preferred_langs_list if LANGUAGE_MAP.get(lang)]
 
-        query = MovieModel.query.filter(or_(*genre_filters))
-
-        if lang_codes:
-            query = query.filter(MovieModel.language.in_(lang_codes))
-
-        preferred_genre_movies = query.order_by(
-            match_score.desc(),
-            MovieModel.vote_count.desc()
-        ).limit(8).all()
+        if genre_ids:
+            preferred_genre_movies = preferred_genre_movies_from_index(genre_ids, lang_codes)
+        if not preferred_genre_movies:
+            # The genres / movie_genres tables stay empty until backfill_genres.py has run.
+            preferred_genre_movies = preferred_genre_movies_by_name(user.preferred_genres.split(','), lang_codes)
 
   
 
 
     # 4. Get Hybrid Recommendations
-    if MODELS_LOADED:
+    # One bundle for the whole request, even if a new model version is swapped in meanwhile.
+    models = model_registry.active
+    if models is not None:
         try:
-            # Get recommendations (title, reasons, and score) from your hybrid function
-            recommendations_with_reasons = get_hybrid_recommendations(
-                user_id=user.user_id, movies_df=movies_df, ratings_df=ratings_df,
-                similarity_matrix=similarity_matrix, indices=indices, algo=algo, n=8
-            )
+            # Serve the nightly precomputed list when it was built with this model version
+            # (see precompute_recommendations.py); otherwise get recommendations (title,
+            # reasons, and score) from your hybrid function, reusing the cached result for
+            # this user and model version when there is one.
+            recommendations_with_reasons = precomputed_recommendations(user.user_id, models.version, 8)
+            if recommendations_with_reasons is None:
+                recommendations_with_reasons = recommendation_cache.get_or_compute(
+                    user.user_id, models.version, 8,
+                    lambda: get_hybrid_recommendations(
+                        user_id=user.user_id, movies_df=models.movies_df, ratings=models.ratings,
+                        similarity_matrix=models.similarity_matrix, indices=models.indices, algo=models.algo, n=8,
+                        scorer=models.scorer, catalogue=models.catalogue, rating_stats=movie_rating_stats
+                    )
+                )
 
             # Check if we got any recommendations back
             if recommendations_with_reasons:
-                # Extract just the titles to query the database
-                recommended_titles = [rec['title'] for rec in recommendations_with_reasons]
+                # Extract just the TMDB ids to query the database (tmdb_id is unique and indexed)
+                recommended_ids = [rec['movie_id'] for rec in recommendations_with_reasons]
                 
                 # Create mappings for reasons AND scores for easy lookup later
-                reasons_map = {rec['title']: rec['reasons'] for rec in recommendations_with_reasons}
-                scores_map = {rec['title']: rec.get('match_score', 0) for rec in recommendations_with_reasons}
+                reasons_map = {rec['movie_id']: rec['reasons'] for rec in recommendations_with_reasons}
+                scores_map = {rec['movie_id']: rec.get('match_score', 0) for rec in recommendations_with_reasons}
 
-                # Fetch the full movie objects from our database based on the titles
-                recommended_movies_from_db = MovieModel.query.filter(MovieModel.title.in_(recommended_titles)).all()
+                # Fetch the full movie objects from our database based on the ids
+                recommended_movies_from_db = MovieModel.query.filter(MovieModel.tmdb_id.in_(recommended_ids)).all()
 
                 # Attach both 'reasons' and 'match_score' to each movie object
                 for movie in recommended_movies_from_db:
-                    movie.reasons = reasons_map.get(movie.title, [])
-                    movie.match_score = scores_map.get(movie.title, 0)
+                    movie.reasons = reasons_map.get(movie.tmdb_id, [])
+                    movie.match_score = scores_map.get(movie.tmdb_id, 0)
                 
-                # Create a map of title -> movie object to preserve the original sorted order
-                title_to_movie_map = {movie.title: movie for movie in recommended_movies_from_db}
+                # Create a map of tmdb_id -> movie object to preserve the original sorted order
+                id_to_movie_map = {movie.tmdb_id: movie for movie in recommended_movies_from_db}
 
                 # Build the final list, in the correct order provided by the recommendation function
-                hybrid_recommendations = [title_to_movie_map[title] for title in recommended_titles if title in title_to_movie_map]
+                hybrid_recommendations = [id_to_movie_map[mid] for mid in recommended_ids if mid in id_to_movie_map]
                 
                 print(f"Successfully built final list of {len(hybrid_recommendations)} hybrid recommendations.")
 
@@ -380,7 +449,15 @@ def dashboard(platform):
             print(f"Error generating hybrid recommendations for user {user.user_id}: {e}")
             # The 'hybrid_recommendations' list will remain empty, so the section won't show
 
-    
+    # Collect the TMDB sections; a call that failed or missed the deadline just leaves its section empty.
+    tmdb_data = upstream.results()
+    trending_data, dynamic_data = tmdb_data.get('trending'), tmdb_data.get('dynamic')
+    trending_movies = trending_data.get("results", []) if trending_data else []
+    dynamic_section_movies = dynamic_data.get("results", []) if dynamic_data else []
+
+    for movie in dynamic_section_movies:
+        genre_names = [GENRE_MAP.get(gid) for gid in movie.get('genre_ids', []) if GENRE_MAP.get(gid)]
+        movie['genres_str'] = ', '.join(genre_names)
 
     return render_template(
         "dashboard.html", 
@@ -436,10 +513,13 @@ def search():
     if not query:
         return jsonify({"error": "No search query provided"}), 400
 
-    # Using the helper function for consistency
-    movies_data = fetch_from_tmdb("search/movie", params={"query": query, "include_adult": False})
-    tv_data = fetch_from_tmdb("search/tv", params={"query": query, "include_adult": False})
-    people_data = fetch_from_tmdb("search/person", params={"query": query, "include_adult": False})
+    # Using the helper function for consistency; the three searches run in parallel
+    upstream = FanOut()
+    upstream.submit('movies', fetch_from_tmdb, "search/movie", params={"query": query, "include_adult": False})
+    upstream.submit('tv', fetch_from_tmdb, "search/tv", params={"query": query, "include_adult": False})
+    upstream.submit('people', fetch_from_tmdb, "search/person", params={"query": query, "include_adult": False})
+    results = upstream.results()
+    movies_data, tv_data, people_data = results['movies'], results['tv'], results['people']
 
     return jsonify({
         "movies": movies_data.get("results", []) if movies_data else [],
@@ -449,12 +529,6 @@ def search():
 
 
 
-import random
-from sqlalchemy import or_
-from flask import Flask, request, jsonify
-
-
-
 @app.route('/mood-recommendations', methods=['POST'])
 def mood_recommendations():
     try:
@@ -467,82 +541,22 @@ def mood_recommendations():
         year_range = data.get('year', '').strip()
         watching_with = data.get('with_whom', '').strip()
         language = data.get('language', '').strip()
-        platform = data.get('platform', '').strip()
 
-        # --- 2. Define Mappings ---
-        mood_map = {
-            'Happy': ['Comedy', 'Romance', 'Adventure', 'Family', 'Animation', 'Musical'],
-            'Normal': ['Action', 'Horror', 'Thriller', 'Fantasy', 'Crime', 'Mystery'],
-            'Sad': ['Drama', 'History', 'War', 'Biography', 'Documentary']
-        }
-        lang_map = {'English': 'en', 'Hindi': 'hi', 'Marathi': 'mr', 'Korean': 'ko', 'Tamil': 'ta', 'Telugu': 'te', 'Japanese': 'ja', 'Other': None}
-        ALLOWED_CERTIFICATIONS = {
-            "With Family": ["G", "PG", "PG-13", "U", "U/A", "Not Rated", "NR", "12", "U/A 7+", "U/A 13+"],
-        }
-
-        # --- 3. Determine Target Genres and Language ---
+        # --- 2. Determine Target Genres, Language and Years ---
         # If the user specifically selects genres, we ONLY use those.
-        if user_genres:
-            target_genres = set(user_genres)
-        else:
-            # Otherwise, we use the mood as a backup.
-            target_genres = set(mood_map.get(mood, []))
-
-        preferred_lang = lang_map.get(language)
-
-        # --- 4. Query and Filter ---
-        base_query = MovieModel.query.filter(MovieModel.adult == False)
-
-        if watching_with == "With Family":
-            allowed_certs = ALLOWED_CERTIFICATIONS["With Family"]
-            family_filter = or_(MovieModel.certification.in_(allowed_certs), MovieModel.certification.is_(None), MovieModel.certification == '')
-            base_query = base_query.filter(family_filter)
-
-        if preferred_lang:
-            base_query = base_query.filter(MovieModel.language == preferred_lang)
-        
-        
-        if year_range:
-            year_filter = None
-            if '2020s' in year_range:
-                year_filter = MovieModel.release_date >= '2020-01-01'
-            elif '2010s' in year_range:
-                year_filter = MovieModel.release_date.between('2010-01-01', '2019-12-31')
-            elif '2000s' in year_range: # This part was added
-                year_filter = MovieModel.release_date.between('2000-01-01', '2009-12-31')
-            elif '1990s' in year_range: # This part was added
-                year_filter = MovieModel.release_date.between('1990-01-01', '1999-12-31')
-            
-            if year_filter is not None:
-                print(f"Applying year filter for: {year_range}")
-                base_query = base_query.filter(year_filter)
-
-        candidate_movies = base_query.limit(1000).all()
-
-        # --- 5. Score and Rank the movies ---
-        scored_movies = []
-        for movie in candidate_movies:
-            movie_genres = set(g.strip() for g in movie.genre.split(',')) if movie.genre else set()
-            if movie_genres.intersection(target_genres):
-                score = (movie.vote_average or 0) * 5 + min((movie.vote_count or 0) / 100, 30)
-                scored_movies.append((movie, score))
-        
-        scored_movies.sort(key=lambda x: x[1], reverse=True)
-
-        # --- CHANGE 3: Add Variety with a Shuffle ---
-        # Get the top 50 best candidates
-        top_candidates = [movie for movie, score in scored_movies[:50]]
-        # Shuffle that list randomly
-        random.shuffle(top_candidates)
-        # Pick the first 6 from the shuffled list
-        final_results = top_candidates[:6]
-
-        # --- 6. Format and Return the Response ---
-        recommended_movies = [{
-            'tmdb_id': movie.tmdb_id, 'title': movie.title, 'poster_path': movie.poster_path,
-            'vote_average': movie.vote_average, 'release_date': str(movie.release_date)[:4] if movie.release_date else 'N/A'
-        } for movie in final_results]
-        
+        # Otherwise, we use the mood as a backup.
+        target_genres = set(user_genres) if user_genres else set(MOOD_GENRES.get(mood, []))
+        preferred_lang = LANGUAGE_CODES.get(language)
+        years = next((span for decade, span in DECADES.items() if decade in year_range), None)
+
+        # --- 3. Filter, Score and Sample over the in-memory catalogue (no DB query) ---
+        catalogue = mood_catalogue.active
+        if catalogue is None:
+            return jsonify({"error": "Movie catalogue is not available yet"}), 503
+
+        recommended_movies = catalogue.recommend(
+            target_genres, language=preferred_lang, family=watching_with == "With Family", years=years
+        )
         return jsonify(recommended_movies)
 
     except Exception as e:
@@ -562,10 +576,13 @@ def person_details(person_id):
     if 'user_id' in session:
         user = db.session.get(User, session['user_id'])
 
-    # 2. Fetches all necessary data from TMDB
-    person_data = fetch_from_tmdb(f"person/{person_id}")
-    credits_data = fetch_from_tmdb(f"person/{person_id}/combined_credits")
-    images_data = fetch_from_tmdb(f"person/{person_id}/images")
+    # 2. Fetches all necessary data from TMDB (in parallel)
+    upstream = FanOut()
+    upstream.submit('person', fetch_from_tmdb, f"person/{person_id}")
+    upstream.submit('credits', fetch_from_tmdb, f"person/{person_id}/combined_credits")
+    upstream.submit('images', fetch_from_tmdb, f"person/{person_id}/images")
+    results = upstream.results()
+    person_data, credits_data, images_data = results['person'], results['credits'], results['images']
 
     # 3. Handles cases where the person isn't found
     if not person_data:
@@ -592,21 +609,15 @@ def get_trailer(media_type, media_id):
     if media_type not in ['movie', 'tv']:
         return None
 
-    url = f"https://api.themoviedb.org/3/{media_type}/{media_id}/videos"
-    params = {
-        "api_key": TMDB_API_KEY, # Use the global key you defined at the top
-        "language": "en-US"
-    }
+    # Goes through fetch_from_tmdb so trailers are cached and the request has a timeout
+    data = fetch_from_tmdb(f"{media_type}/{media_id}/videos", params={"language": "en-US"})
+    if not data:
+        print(f"Error fetching trailer for {media_type} ID {media_id}")
+        return None
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status() # Good practice to check for HTTP errors
-        data = response.json()
-        for video in data.get("results", []):
-            if video.get("site") == "YouTube" and video.get("type") == "Trailer":
-                return video.get("key")
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching trailer for {media_type} ID {media_id}: {e}")
+    for video in data.get("results", []):
+        if video.get("site") == "YouTube" and video.get("type") == "Trailer":
+            return video.get("key")
 
     return None
 
@@ -717,6 +728,7 @@ def add_to_watchlist():
     try:
         # Try to commit the new item to the database
         db.session.commit()
+        invalidate_recommendations(session['user_id'])
         return jsonify({'success': True, 'message': 'Added to watchlist'}), 201
     except IntegrityError:
         # If the commit fails due to a duplicate entry (race condition),
@@ -744,6 +756,7 @@ def remove_from_watchlist():
     if item_to_remove:
         db.session.delete(item_to_remove)
         db.session.commit()
+        invalidate_recommendations(session['user_id'])
         return jsonify({'success': True, 'message': 'Removed from watchlist'}), 200
     
     return jsonify({'error': 'Item not found in watchlist'}), 404
@@ -771,37 +784,25 @@ def movie_details(movie_id):
     if 'user_id' in session:
         user = db.session.get(User, session['user_id'])
     
-    movie_data = fetch_from_tmdb(f"movie/{movie_id}")
+    # Details and TMDB reviews are independent, so fetch them in parallel
+    upstream = FanOut()
+    upstream.submit('details', fetch_from_tmdb, f"movie/{movie_id}")
+    upstream.submit('reviews', fetch_from_tmdb, f"movie/{movie_id}/reviews")
+    tmdb_data = upstream.results()
+
+    movie_data = tmdb_data['details']
     if not movie_data:
         flash("Movie not found!", "danger")
         return redirect(url_for('dashboard'))
     
-    # --- START OF THE FIX ---
-
-    local_reviews_query = [] # Default to an empty list
-    
-    # 1. Find the movie in our local database using the TMDB ID from the URL
+    # Only the newest page of local reviews; the page loads further ones from /api/movie/<id>/reviews.
+    local_reviews, reviews_next_cursor = [], None
     movie_in_db = MovieModel.query.filter_by(tmdb_id=movie_id).first()
-
-    # 2. If the movie exists in our database, find all reviews linked to its LOCAL primary key
     if movie_in_db:
-        local_reviews_query = Review.query.filter_by(movie_id=movie_in_db.id).order_by(Review.timestamp.desc()).all()
-    
-    # --- END OF THE FIX ---
-    
-    local_reviews = []
-    for r in local_reviews_query:
-        if r.user: 
-            local_reviews.append({
-                'source': 'Flicksy',
-                'author': r.user.full_name,
-                'content': r.review_text,
-                'rating': r.rating,
-                'created_at': r.timestamp.isoformat()
-            })
+        local_reviews, reviews_next_cursor = review_page(movie_id=movie_in_db.id)
 
     # The rest of the function remains the same
-    api_reviews_data = fetch_from_tmdb(f"movie/{movie_id}/reviews")
+    api_reviews_data = tmdb_data['reviews']
     api_reviews = []
     if api_reviews_data and 'results' in api_reviews_data:
         for r in api_reviews_data['results']:
@@ -815,34 +816,31 @@ def movie_details(movie_id):
 
     all_reviews = local_reviews + api_reviews
     
-    return render_template('movie_details.html', movie=movie_data, reviews=all_reviews, current_user=user)
+    return render_template('movie_details.html', movie=movie_data, reviews=all_reviews,
+                           reviews_next_cursor=reviews_next_cursor, rating_stats=get_rating_stats('movie', movie_id),
+                           current_user=user)
 # In app.py
 
 
 
 @app.route('/tv/<int:tv_id>')
 def tv_details(tv_id):
-    tv_data = fetch_from_tmdb(f"tv/{tv_id}")
+    # Details and TMDB reviews are independent, so fetch them in parallel
+    upstream = FanOut()
+    upstream.submit('details', fetch_from_tmdb, f"tv/{tv_id}")
+    upstream.submit('reviews', fetch_from_tmdb, f"tv/{tv_id}/reviews")
+    tmdb_data = upstream.results()
+
+    tv_data = tmdb_data['details']
     
     if not tv_data:
         flash("TV Show not found!", "danger")
         return redirect(url_for('dashboard'))
 
-    # Fetch user if logged in
-    local_reviews_query = Review.query.filter_by(tv_id=tv_id).order_by(Review.timestamp.desc()).all()
-    
-    local_reviews = []
-    for r in local_reviews_query:
-        if r.user:
-            local_reviews.append({
-                'source': 'Flicksy',
-                'author': r.user.full_name,
-                'content': r.review_text,
-                'rating': r.rating,
-                'created_at': r.timestamp.isoformat()
-            })
+    # Newest page of local reviews; further pages come from /api/tv/<id>/reviews.
+    local_reviews, reviews_next_cursor = review_page(tv_id=tv_id)
 
-    api_reviews_data = fetch_from_tmdb(f"tv/{tv_id}/reviews")
+    api_reviews_data = tmdb_data['reviews']
     api_reviews = []
     if api_reviews_data and 'results' in api_reviews_data:
         for r in api_reviews_data['results']:
@@ -856,7 +854,31 @@ def tv_details(tv_id):
 
     all_reviews = local_reviews + api_reviews
     
-    return render_template('tv_details.html', tv=tv_data, reviews=all_reviews)
+    return render_template('tv_details.html', tv=tv_data, reviews=all_reviews,
+                           reviews_next_cursor=reviews_next_cursor, rating_stats=get_rating_stats('tv', tv_id))
+
+
+def _review_page_response(**title):
+    try:
+        reviews, next_cursor = review_page(before=request.args.get('before'), **title)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor.'}), 400
+    return jsonify({'reviews': reviews, 'next_cursor': next_cursor})
+
+
+@app.route('/api/movie/<int:movie_id>/flicksy-reviews')
+def get_flicksy_movie_reviews(movie_id):
+    """Further pages of a movie's Flicksy reviews: ?before=<next_cursor of the previous page>."""
+    movie_in_db = MovieModel.query.filter_by(tmdb_id=movie_id).first()
+    if not movie_in_db:
+        return jsonify({'reviews': [], 'next_cursor': None})
+    return _review_page_response(movie_id=movie_in_db.id)
+
+
+@app.route('/api/tv/<int:tv_id>/flicksy-reviews')
+def get_flicksy_tv_reviews(tv_id):
+    """Further pages of a TV show's Flicksy reviews: ?before=<next_cursor of the previous page>."""
+    return _review_page_response(tv_id=tv_id)
 
 # review route for movies
 @app.route('/movie/<int:movie_id>/review', methods=['POST'])
@@ -914,7 +936,14 @@ def post_movie_review(movie_id):
         rating=rating
     )
     db.session.add(new_review)
+    # Same transaction as the review, so the aggregate never drifts from the reviews table.
+    record_review('movie', movie_in_db.tmdb_id, rating)
     db.session.commit()
+    # The new rating counts as watched for this worker's recommender straight away.
+    models = model_registry.active
+    if models is not None:
+        models.ratings.append(user.user_id, movie_in_db.tmdb_id, rating)
+    invalidate_recommendations(user.user_id)
 
     review_data = {
         'author': user.full_name,
@@ -924,7 +953,8 @@ def post_movie_review(movie_id):
 
     return jsonify({
         'message': 'Review submitted successfully!',
-        'review': review_data
+        'review': review_data,
+        'rating_stats': get_rating_stats('movie', movie_in_db.tmdb_id)
     }), 201
 # review route for tv shoows
 
@@ -953,7 +983,10 @@ def post_tv_review(tv_id):
         rating=rating
     )
     db.session.add(new_review)
+    # Same transaction as the review, so the aggregate never drifts from the reviews table.
+    record_review('tv', tv_id, rating)
     db.session.commit()
+    invalidate_recommendations(user.user_id)
 
     # Create a dictionary to send back to the frontend, just like the movie endpoint
     review_data = {
@@ -964,7 +997,8 @@ def post_tv_review(tv_id):
 
     return jsonify({
         'message': 'Review submitted successfully!',
-        'review': review_data
+        'review': review_data,
+        'rating_stats': get_rating_stats('tv', tv_id)
     }), 201
 
 @app.route('/api/tv/<int:tv_id>/cast')
@@ -1021,6 +1055,9 @@ def terms():
     return render_static_page('terms.html')
 
 
+startup.mark_imported()
+
+
 # =================================================================
 # Main Execution Block
 # =================================================================
@@ -1033,10 +1070,10 @@ if __name__ == '__main__':
         os.makedirs(UPLOAD_FOLDER)
     # -----------------------------------------------------------
 
-    with app.app_context():
-        db.create_all()
-        # fetch_and_store_trending_movies(app)
-    
+    # Warm up in the background right away rather than on the first request.
+    startup.start()
+    # fetch_and_store_trending_movies(app)
+
     # Run the app AFTER all setup is complete
 
     app.run(debug=False, host="0.0.0.0", port=5501)
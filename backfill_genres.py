@@ -0,0 +1,51 @@
+# backfill_genres.py
+# One-off: fills the genres and movie_genres tables for movies stored before they existed,
+# from the comma-separated movies.genre column. New imports keep them up to date.
+#
+#   python backfill_genres.py
+import argparse
+from app import app
+from models import db, Movie, Genre
+from movie_store import replace_movie_genres, store_genres
+from tmdb_client import tmdb_client
+
+
+def backfill(batch_size=500):
+    genre_data = tmdb_client.get("genre/movie/list", {"language": "en-US"})
+    if genre_data:
+        store_genres({g['id']: g['name'] for g in genre_data.get('genres', [])})
+    genre_ids = {name.lower(): genre_id for genre_id, name in db.session.query(Genre.id, Genre.name).all()}
+    if not genre_ids:
+        print("No genres known: TMDB genre list unavailable and the genres table is empty.")
+        return 0
+
+    unknown, filled, last_id = set(), 0, 0
+    while True:
+        batch = db.session.query(Movie.id, Movie.genre).filter(Movie.id > last_id) \
+            .order_by(Movie.id).limit(batch_size).all()
+        if not batch:
+            break
+        by_movie = {}
+        for movie_id, genre in batch:
+            names = [name.strip() for name in (genre or '').split(',') if name.strip()]
+            unknown.update(name for name in names if name.lower() not in genre_ids)
+            by_movie[movie_id] = [genre_ids[name.lower()] for name in names if name.lower() in genre_ids]
+        replace_movie_genres(by_movie)
+        db.session.commit()
+        filled += len(batch)
+        last_id = batch[-1][0]
+        print(f"  {filled} movies done...")
+
+    if unknown:
+        print(f"Genre names with no TMDB id (skipped): {', '.join(sorted(unknown))}")
+    return filled
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fill movie_genres from the movies.genre column.")
+    parser.add_argument('--batch-size', type=int, default=500, help="movies per transaction")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()  # genres / movie_genres tables
+        print(f"Backfilled genres for {backfill(args.batch_size)} movies.")
@@ -1,32 +1,19 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import pickle
+import argparse
+from retrain_pipeline import run_content_stage
+
+# Full rebuild of the content-based model. This is the pipeline's content stage run with
+# --full, so retrain_pipeline.py can continue incrementally from the result.
+parser = argparse.ArgumentParser(description="Build the content-based movie model.")
+parser.add_argument("--top-k", type=int, default=0,
+                    help="Keep only the K nearest neighbours per movie instead of the dense N x N matrix.")
+parser.add_argument("--block-size", type=int, default=None,
+                    help="Rows per similarity block in top-K mode (default: sized to fit in ~256 MB).")
+args = parser.parse_args()
 
 print("Building the content-based model...")
 
-# Load movie data
-df = pd.read_csv("movies.csv")
+# Reads movies.csv, fits TF-IDF on the overview + genres "soup", computes the similarity
+# matrix (or top-K index) and saves it as memory-mappable arrays (see model_artifacts.py).
+run_content_stage(full=True, top_k=args.top_k, block_size=args.block_size)
 
-# Handle missing data
-df['overview'] = df['overview'].fillna('')
-df['genres'] = df['genres'].fillna('')
-
-# Create a "soup" of features for a richer model, weighting genres more heavily.
-df['soup'] = df['overview'] + ' ' + (df['genres'].str.replace(',', ' ') * 3)
-
-# TF-IDF Vectorization on the "soup"
-vectorizer = TfidfVectorizer(stop_words='english')
-tfidf_matrix = vectorizer.fit_transform(df['soup'])
-
-# Compute similarity matrix
-similarity_matrix = cosine_similarity(tfidf_matrix)
-
-# Create the title-to-index mapping and drop duplicates.
-indices = pd.Series(df.index, index=df['title']).drop_duplicates()
-
-# Save the DataFrame, similarity matrix, and indices together in one file.
-with open('movie_model.pkl', 'wb') as f:
-    pickle.dump((df, similarity_matrix, indices), f)
-
-print("Model built and saved as movie_model.pkl")
+print("Model built and saved to movie_model/")
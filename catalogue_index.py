@@ -0,0 +1,78 @@
+# catalogue_index.py
+import numpy as np
+import pandas as pd
+from ratings_store import RatingsStore
+
+
+class CatalogueIndex:
+    """
+    O(1) lookups over the recommender's movie catalogue, built once at load time.
+    - a dense tmdb_id -> row array (first row wins for repeated ids)
+    - the title of every row as a NumPy array
+    - per-user rated rows and top-rated movie, from a RatingsStore slice of that user only
+    """
+
+    def __init__(self, movies_df, ratings=None):
+        self.ids = movies_df['id'].to_numpy(dtype=np.int64)
+        self.titles = movies_df['title'].to_numpy(dtype=object)
+
+        size = int(self.ids.max()) + 1 if len(self.ids) else 0
+        self._row_of_id = np.full(size, -1, dtype=np.int32)
+        # Assign in reverse so the first row of a repeated id is the one kept.
+        self._row_of_id[self.ids[::-1]] = np.arange(len(self.ids), dtype=np.int32)[::-1]
+        self.duplicate_rows = self._row_of_id[self.ids] != np.arange(len(self.ids))
+
+        self.ratings = None
+        if ratings is not None:
+            self.set_ratings(ratings)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def set_ratings(self, ratings):
+        """ratings is a RatingsStore; a ratings DataFrame is grouped into one first."""
+        if isinstance(ratings, pd.DataFrame):
+            ratings = RatingsStore.from_dataframe(ratings)
+        self.ratings = ratings
+
+    def row_of(self, movie_id):
+        """Row of movie_id in the catalogue, or -1 if it is not there."""
+        movie_id = int(movie_id)
+        if 0 <= movie_id < len(self._row_of_id):
+            return int(self._row_of_id[movie_id])
+        return -1
+
+    def rows_of(self, movie_ids):
+        """Vectorized row_of(); unknown ids map to -1."""
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        rows = np.full(len(movie_ids), -1, dtype=np.int32)
+        in_range = (movie_ids >= 0) & (movie_ids < len(self._row_of_id))
+        rows[in_range] = self._row_of_id[movie_ids[in_range]]
+        return rows
+
+    def title_of(self, movie_id):
+        row = self.row_of(movie_id)
+        return self.titles[row] if row >= 0 else None
+
+    def watched_rows(self, user_id):
+        """Catalogue rows the user has rated."""
+        if self.ratings is None:
+            return np.empty(0, dtype=np.int32)
+        rows = self.rows_of(self.ratings.user_ratings(user_id)[0])
+        return np.unique(rows[rows >= 0])
+
+    def watched_mask(self, user_id):
+        """Boolean mask of rows the user has rated."""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[self.watched_rows(user_id)] = True
+        return mask
+
+    def top_rated_movie(self, user_id):
+        """tmdb id of the user's highest-rated movie, or None if they have no ratings."""
+        if self.ratings is None:
+            return None
+        movie_ids, ratings = self.ratings.user_ratings(user_id)
+        if len(ratings) == 0:
+            return None
+        # argmax returns the first maximum, so ties go to the earliest rating.
+        return int(movie_ids[np.argmax(ratings)])
@@ -0,0 +1,60 @@
+# collaborative_scoring.py
+import numpy as np
+from recommend import top_n_indices
+
+
+class SVDScorer:
+    """
+    Batch scorer for a trained surprise SVD model.
+    The user/item factors and biases are copied into NumPy arrays aligned with the
+    catalogue (item_ids, usually movies_df['id']), so all items can be scored for a
+    user with one matrix-vector product. Estimates match algo.predict(uid, iid).est,
+    including the fallbacks for unknown users/items and clipping to the rating scale.
+    """
+
+    def __init__(self, algo, item_ids):
+        trainset = algo.trainset
+        self.item_ids = np.asarray(item_ids)
+        self.biased = algo.biased
+        self.global_mean = trainset.global_mean
+        self.lower_bound, self.higher_bound = trainset.rating_scale
+
+        self._user_inner = trainset._raw2inner_id_users
+        self.pu = np.asarray(algo.pu, dtype=np.float64)
+        self.bu = np.asarray(algo.bu, dtype=np.float64)
+
+        inner = np.array([trainset._raw2inner_id_items.get(iid, -1) for iid in self.item_ids], dtype=np.int64)
+        self.known_items = inner >= 0
+
+        # Unknown items get zero factors/bias, which is exactly how predict() treats them.
+        self.qi = np.zeros((len(inner), algo.qi.shape[1]), dtype=np.float64)
+        self.qi[self.known_items] = algo.qi[inner[self.known_items]]
+        self.bi = np.zeros(len(inner), dtype=np.float64)
+        self.bi[self.known_items] = algo.bi[inner[self.known_items]]
+
+    def score_all(self, user_id):
+        """Returns the estimated rating of every catalogue item for user_id."""
+        u = self._user_inner.get(user_id)
+        est = np.full(len(self.item_ids), self.global_mean, dtype=np.float64)
+
+        if self.biased:
+            if u is not None:
+                est += self.bu[u]
+            est += self.bi
+            if u is not None:
+                est += self.qi @ self.pu[u]
+        elif u is not None:
+            # Unbiased SVD can only predict known (user, item) pairs; the rest
+            # get the default prediction (the global mean).
+            est[self.known_items] = self.qi[self.known_items] @ self.pu[u]
+
+        return np.clip(est, self.lower_bound, self.higher_bound)
+
+    def top_n(self, user_id, n=10, exclude=None):
+        """
+        Returns (positions, estimates) of the n best items for user_id, best first.
+        `exclude` is an optional boolean mask or array of positions to skip.
+        """
+        scores = self.score_all(user_id)
+        positions = top_n_indices(scores, n, exclude=exclude)
+        return positions, scores[positions]
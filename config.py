@@ -5,11 +5,38 @@
 #DB_NAME = 'movie_recommender'
 
 # config.py
+import os
+
 DB_USER = 'root'
 DB_PASSWORD = 'Student'  
 DB_HOST = '127.0.0.1'  # Use IP instead of 'localhost'
 DB_PORT = 3306
 DB_NAME = 'movie_recommender'
 
-SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# DATABASE_URL overrides the MySQL URI (e.g. 'sqlite://' for the startup profiler in CI)
+SQLALCHEMY_DATABASE_URI = os.environ.get(
+    'DATABASE_URL', f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}')
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Recommendation cache: 'memory' or 'sqlite' (shared local file). 'memory' is for a single
+# process only: another worker keeps serving a user's old results after they rate something.
+# Use 'sqlite' whenever the app runs more than one worker process on a machine.
+RECOMMENDATION_CACHE_BACKEND = os.environ.get('RECOMMENDATION_CACHE_BACKEND', 'memory')
+RECOMMENDATION_CACHE_PATH = 'recommendation_cache.sqlite3'
+RECOMMENDATION_CACHE_TTL = 6 * 60 * 60  # seconds
+RECOMMENDATION_CACHE_MAX_ENTRIES = 10000
+# Seconds between checks for retrained model files (picked up without a restart)
+MODEL_RELOAD_INTERVAL = 60
+# Re-hash the memory-mapped content model on every load (reads the whole file, slows startup)
+MODEL_VERIFY_CHECKSUMS = False
+# Seconds between rebuilds of the in-memory catalogue behind /mood-recommendations
+MOOD_CATALOGUE_REFRESH_INTERVAL = 10 * 60
+# On-disk snapshots of the TMDB genre/language lists; the startup warm-up re-fetches older ones
+REFERENCE_SNAPSHOT_DIR = os.environ.get('REFERENCE_SNAPSHOT_DIR', 'reference_data')
+REFERENCE_SNAPSHOT_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+
+# TMDB API (base URL can be pointed at a local fake server for testing)
+TMDB_API_KEY = "YOUR_API_KEY"
+TMDB_BASE_URL = os.environ.get('TMDB_BASE_URL', "https://api.themoviedb.org/3")
+# Requests per second for bulk jobs; TMDB throttles at roughly 50/s per IP.
+TMDB_RATE_LIMIT = 40
@@ -1,37 +1,219 @@
-
+# export_ratings.py
+# Exports every rated movie review as (user_id, movie_id = TMDB id, rating) for the
+# recommendation models. Rows are streamed from a server-side cursor in review-id order and
+# written chunk by chunk, so memory stays bounded by the chunk size however many ratings
+# there are.
+#
+# Next to the CSV, <csv>.export.json records the last exported review id and the file
+# sizes; --incremental appends only reviews with a higher id. Auto-increment ids can commit
+# out of order (a transaction holding a lower id may commit after a higher one was read), so
+# every export stops at the first review younger than --settle-seconds: by then any
+# transaction that took a lower id has committed, and nothing is skipped by the id mark.
+# Edited or deleted ratings are not picked up incrementally (the app never edits reviews);
+# run a full export after changing reviews by hand. The optional --npy directory holds the same rows as raw little-endian column files
+# (int32 user_id, int32 movie_id, int8 rating) plus a manifest; ratings_store.load_export_arrays
+# maps them with np.memmap. A full export writes new column files and swaps the manifest last,
+# so the live files are never truncated under a reader; incremental runs append past the row
+# count the manifest records.
+#
+#   python export_ratings.py                              # full export to ratings.csv
+#   python export_ratings.py --incremental                # append reviews since the last export
+#   python export_ratings.py --npy ratings_npy            # also write the binary columns
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+from itertools import islice
+import numpy as np
 import pandas as pd
-from app import app, db  
-from models import Review, Movie 
+from app import app, db
+from models import Review, Movie
+from ratings_store import load_export_manifest
+
+RATINGS_CSV = 'ratings.csv'
+EXPORT_CHUNK_SIZE = 50000
+# Reviews younger than this are left for the next run (longer than any review transaction).
+EXPORT_SETTLE_SECONDS = 10 * 60
+NPY_FORMAT_VERSION = 1
+NPY_COLUMNS = {'user_id': np.int32, 'movie_id': np.int32, 'rating': np.int8}
+CSV_COLUMNS = ['user_id', 'movie_id', 'rating']
+
+
+def state_path(csv_path):
+    return csv_path + '.export.json'
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_json(obj, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp_path, path)
 
-def export_ratings_to_csv():
+
+def _truncate(path, size):
+    """Drops anything an interrupted export appended after the last recorded state."""
+    with open(path, 'r+b') as f:
+        f.truncate(size)
+
+
+def iter_rating_chunks(after_id=0, chunk_size=EXPORT_CHUNK_SIZE, settled_before=None):
     """
-    Queries the database for all user reviews and exports them to a ratings.csv file.
-    It also ensures that the movie_id in the ratings maps to the tmdb_id required
-    by the recommendation models.
+    Yields (review_ids, user_ids, movie_ids, ratings) int64 arrays of at most chunk_size
+    rows, for rated movie reviews with id > after_id in id order. Stops at the first review
+    posted at or after settled_before, so the last yielded id is a safe high-water mark.
+    Needs an app context.
     """
-    with app.app_context():
-        print("Connecting to the database and fetching reviews...")
-        
-        # Query the reviews table to get user_id, movie_id (from our db), and rating
-        # We join with the Movie table to get the tmdb_id
-        reviews_query = db.session.query(
-            Review.user_id, 
-            Movie.tmdb_id, 
-            Review.rating
-        ).join(Movie, Review.movie_id == Movie.id).filter(Review.rating.isnot(None)).all()
-
-        if not reviews_query:
-            print("No reviews with ratings found in the database. Cannot create ratings.csv.")
+    query = db.session.query(Review.id, Review.user_id, Movie.tmdb_id, Review.rating, Review.timestamp) \
+        .join(Movie, Review.movie_id == Movie.id) \
+        .filter(Review.rating.isnot(None), Review.id > after_id) \
+        .order_by(Review.id) \
+        .execution_options(stream_results=True) \
+        .yield_per(chunk_size)
+    rows = iter(query)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        settled = len(chunk)
+        if settled_before is not None:
+            settled = next((i for i, row in enumerate(chunk) if row[4] is not None and row[4] >= settled_before),
+                           len(chunk))
+        if settled:
+            block = np.array([row[:4] for row in chunk[:settled]], dtype=np.int64)
+            yield block[:, 0], block[:, 1], block[:, 2], block[:, 3]
+        if settled < len(chunk) or not chunk:
             return
 
-        # Create a DataFrame with the correct column names for the model
-        # The model expects 'movie_id' to be the TMDB ID.
-        ratings_df = pd.DataFrame(reviews_query, columns=['user_id', 'movie_id', 'rating'])
-        
-        # Save the DataFrame to a CSV file, which will be used by the collaborative model
-        ratings_df.to_csv('ratings.csv', index=False)
-        
-        print(f"Successfully exported {len(ratings_df)} ratings to ratings.csv")
+
+class NpyRatingsWriter:
+    """
+    Writes rating chunks to the raw column files of an --npy directory. With append=True the
+    chunks go after the rows the manifest covers; otherwise into new files named for this
+    export, which become live only when close() swaps the manifest.
+    """
+
+    def __init__(self, directory, append):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.previous = load_export_manifest(directory)
+        manifest = self.previous if append else None
+        self.rows = manifest['rows'] if manifest else 0
+        if manifest:
+            self.file_names = {name: manifest['columns'][name]['file'] for name in NPY_COLUMNS}
+        else:
+            generation = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+            self.file_names = {name: f"{name}-{generation}.bin" for name in NPY_COLUMNS}
+        self.files = {}
+        for name, dtype in NPY_COLUMNS.items():
+            path = os.path.join(directory, self.file_names[name])
+            if manifest:
+                _truncate(path, self.rows * np.dtype(dtype).itemsize)
+            self.files[name] = open(path, 'ab' if manifest else 'xb')
+
+    def write(self, user_ids, movie_ids, ratings):
+        for name, values in (('user_id', user_ids), ('movie_id', movie_ids), ('rating', ratings)):
+            values.astype(np.dtype(NPY_COLUMNS[name]).newbyteorder('<')).tofile(self.files[name])
+        self.rows += len(ratings)
+
+    def close(self, last_review_id):
+        """Writes the manifest (the commit point), then removes column files two exports old."""
+        for f in self.files.values():
+            f.close()
+        _save_json({
+            'format': NPY_FORMAT_VERSION,
+            'rows': self.rows,
+            'last_review_id': last_review_id,
+            'columns': {name: {'file': self.file_names[name], 'dtype': np.dtype(dtype).newbyteorder('<').str}
+                        for name, dtype in NPY_COLUMNS.items()},
+        }, os.path.join(self.directory, 'manifest.json'))
+
+        # The previous export's files stay for readers that loaded its manifest just before the swap.
+        keep = set(self.file_names.values())
+        if self.previous:
+            keep.update(spec['file'] for spec in self.previous['columns'].values())
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith('.bin') and file_name not in keep:
+                os.remove(os.path.join(self.directory, file_name))
+
+
+def _resumable_state(path, npy_dir):
+    """The previous export's state if `path` (and npy_dir) can be appended to, else None."""
+    state = _load_json(state_path(path))
+    if not state or not os.path.exists(path) or state.get('npy_dir') != npy_dir:
+        return None
+    if npy_dir is not None:
+        manifest = load_export_manifest(npy_dir)
+        if not manifest or manifest['last_review_id'] != state['last_review_id']:
+            return None
+    return state
+
+
+def export_ratings_to_csv(path=RATINGS_CSV, incremental=False, npy_dir=None, chunk_size=EXPORT_CHUNK_SIZE,
+                          settle_seconds=EXPORT_SETTLE_SECONDS):
+    """
+    Exports rated reviews to `path` (and `npy_dir` if given), mapping movie_id to the TMDB id
+    the recommendation models use. With incremental=True only reviews newer than the last
+    export are appended; it falls back to a full export when there is no usable previous one.
+    Reviews posted in the last settle_seconds are left for the next run.
+    Returns a summary dict for the retrain manifest.
+    """
+    state = _resumable_state(path, npy_dir) if incremental else None
+    after_id = state['last_review_id'] if state else 0
+    mode = 'incremental' if state else 'full'
+    settled_before = datetime.utcnow() - timedelta(seconds=settle_seconds)
+
+    with app.app_context():
+        print(f"Exporting ratings ({mode}, after review id {after_id})...")
+        if state:
+            _truncate(path, state['csv_bytes'])
+            out_path = path
+            csv_file = open(path, 'a', newline='')
+        else:
+            # A full export goes to a temp file first, so readers never see a half-written CSV.
+            out_path = path + '.tmp'
+            csv_file = open(out_path, 'w', newline='')
+            csv_file.write(','.join(CSV_COLUMNS) + '\n')
+        npy = NpyRatingsWriter(npy_dir, append=bool(state)) if npy_dir else None
+
+        exported = 0
+        last_review_id = after_id
+        with csv_file:
+            for review_ids, user_ids, movie_ids, ratings in iter_rating_chunks(after_id, chunk_size, settled_before):
+                pd.DataFrame({'user_id': user_ids, 'movie_id': movie_ids, 'rating': ratings}) \
+                    .to_csv(csv_file, header=False, index=False)
+                if npy is not None:
+                    npy.write(user_ids, movie_ids, ratings)
+                exported += len(ratings)
+                last_review_id = int(review_ids[-1])
+            csv_file.flush()
+            csv_bytes = csv_file.tell()
+        if npy is not None:
+            npy.close(last_review_id)
+        if out_path != path:
+            os.replace(out_path, path)
+
+    total = (state['rows'] if state else 0) + exported
+    _save_json({'last_review_id': last_review_id, 'rows': total, 'csv_bytes': csv_bytes, 'npy_dir': npy_dir},
+               state_path(path))
+    if not total:
+        print(f"No reviews with ratings found in the database; {path} only has a header.")
+    print(f"Exported {exported} ratings to {path} ({total} in total).")
+    return {'mode': mode, 'exported': exported, 'ratings': total, 'last_review_id': last_review_id}
+
 
 if __name__ == '__main__':
-    export_ratings_to_csv()
+    parser = argparse.ArgumentParser(description="Export rated reviews for the recommendation models.")
+    parser.add_argument('--output', default=RATINGS_CSV, help="CSV file to write")
+    parser.add_argument('--incremental', action='store_true', help="append only reviews since the last export")
+    parser.add_argument('--npy', default=None, metavar='DIR', help="also write int32/int8 column files to DIR")
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="rows fetched and written per chunk")
+    parser.add_argument('--settle-seconds', type=int, default=EXPORT_SETTLE_SECONDS,
+                        help="leave reviews younger than this for the next run")
+    args = parser.parse_args()
+    export_ratings_to_csv(args.output, incremental=args.incremental, npy_dir=args.npy, chunk_size=args.chunk_size,
+                          settle_seconds=args.settle_seconds)
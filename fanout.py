@@ -0,0 +1,50 @@
+# fanout.py
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Overall budget for one handler's upstream calls, in seconds.
+DEFAULT_DEADLINE = 8.0
+
+# Shared by all requests in this process; sized below the TMDB client's connection pool.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fanout')
+
+
+class FanOut:
+    """
+    Request-scoped group of independent upstream calls that run in parallel.
+    Submit the calls, do any local work (e.g. DB queries) meanwhile, then collect
+    everything with results(). The whole group shares one deadline; calls that raise
+    or are still running when it passes come back as None, so a handler can render
+    with partial results instead of failing.
+
+        upstream = FanOut()
+        upstream.submit('details', fetch_from_tmdb, f"movie/{movie_id}")
+        upstream.submit('reviews', fetch_from_tmdb, f"movie/{movie_id}/reviews")
+        data = upstream.results()
+    """
+
+    def __init__(self, deadline=DEFAULT_DEADLINE):
+        self.deadline_at = time.monotonic() + deadline
+        self._futures = {}
+
+    def submit(self, name, fn, *args, **kwargs):
+        self._futures[name] = _executor.submit(fn, *args, **kwargs)
+        return self
+
+    def results(self):
+        """Waits (up to the remaining deadline) and returns {name: result or None}."""
+        remaining = max(0.0, self.deadline_at - time.monotonic())
+        done, _ = wait(self._futures.values(), timeout=remaining)
+
+        results = {}
+        for name, future in self._futures.items():
+            if future not in done:
+                # Still running: leave it to finish in the background (it may warm the cache).
+                print(f"Upstream call '{name}' missed the deadline; continuing without it.")
+                results[name] = None
+            elif future.exception() is not None:
+                print(f"Upstream call '{name}' failed: {future.exception()}")
+                results[name] = None
+            else:
+                results[name] = future.result()
+        return results
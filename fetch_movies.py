@@ -1,25 +1,17 @@
 import os
-import requests
 import csv
+from tmdb_client import tmdb_client
 
-API_KEY = "YOUR_API_KEY"
-
-
-BASE_URL = 'https://api.themoviedb.org/3/movie/popular'
-GENRE_URL = 'https://api.themoviedb.org/3/genre/movie/list'
 TOTAL_PAGES = 10 # Fetches 200 movies (20 per page)
 
 def get_genre_map():
     """Fetches the genre list and returns it as a dictionary for fast lookups."""
-    try:
-        response = requests.get(GENRE_URL, params={"api_key": API_KEY, "language": "en-US"})
-        response.raise_for_status() # Raises an exception for bad status codes (e.g., 401, 404)
-        genres_data = response.json()
-        # Creates a dictionary for efficient O(1) lookups.
-        return {genre['id']: genre['name'] for genre in genres_data['genres']}
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching genres: {e}")
+    genres_data = tmdb_client.get("genre/movie/list", {"language": "en-US"})
+    if not genres_data:
+        print("Error fetching genres.")
         return None
+    # Creates a dictionary for efficient O(1) lookups.
+    return {genre['id']: genre['name'] for genre in genres_data['genres']}
 
 def get_genre_names(genre_ids, genre_map):
     """Translates a list of genre IDs to a comma-separated string of genre names."""
@@ -35,21 +27,19 @@ movies = []
 if genre_map:
     for page in range(1, TOTAL_PAGES + 1):
         print(f"Fetching page {page}/{TOTAL_PAGES}...")
-        try:
-            response = requests.get(BASE_URL, params={"api_key": API_KEY, "page": page})
-            response.raise_for_status() # Adds error handling for each request.
-            data = response.json()
-
-            for movie in data.get('results', []):
-                movies.append({
-                    "id": movie["id"],
-                    "title": movie["title"],
-                    "overview": movie.get("overview", ""),
-                    "genres": get_genre_names(movie.get("genre_ids", []), genre_map),
-                    "language": movie.get("original_language", "")
-                })
-        except requests.exceptions.RequestException as e:
-            print(f"Could not fetch page {page}. Error: {e}")
+        data = tmdb_client.get("movie/popular", {"page": page})
+        if data is None:
+            print(f"Could not fetch page {page}.")
+            continue
+
+        for movie in data.get('results', []):
+            movies.append({
+                "id": movie["id"],
+                "title": movie["title"],
+                "overview": movie.get("overview", ""),
+                "genres": get_genre_names(movie.get("genre_ids", []), genre_map),
+                "language": movie.get("original_language", "")
+            })
 
 # Save to CSV
 if movies:
@@ -1,9 +1,25 @@
 import pandas as pd
-from recommend import get_recommendations
-
-def get_hybrid_recommendations(user_id, movies_df, ratings_df, similarity_matrix, indices, algo, n=10):
+from recommend import similar_indices
+from collaborative_scoring import SVDScorer
+from catalogue_index import CatalogueIndex
+
+# Bayesian average of Flicksy ratings: each title starts with PRIOR_WEIGHT ratings of PRIOR_MEAN,
+# so a single 5-star review barely moves it but a well-reviewed title climbs.
+PRIOR_MEAN = 3.0
+PRIOR_WEIGHT = 5
+FLICKSY_RATING_WEIGHT = 0.5
+
+def get_hybrid_recommendations(user_id, movies_df, ratings, similarity_matrix, indices, algo, n=10,
+                               scorer=None, catalogue=None, rating_stats=None):
     """
     Generates hybrid recommendations with specific reasons for each movie.
+    `scorer` (SVDScorer) and `catalogue` (CatalogueIndex) are normally built once at
+    load time; they are built on the fly if omitted. `ratings` is a RatingsStore or a
+    ratings DataFrame.
+    `rating_stats` ({TMDB id: (rating_count, rating_sum)}, or a function of the candidates'
+    TMDB ids returning that map, e.g. rating_stats.movie_rating_stats) nudges candidates up
+    or down by how Flicksy users have rated them.
+    Each result carries the movie's TMDB id as 'movie_id'.
     """
     print(f"Generating hybrid recommendations for User ID: {user_id}")
     
@@ -11,99 +27,64 @@ def get_hybrid_recommendations(user_id, movies_df, ratings_df, similarity_matrix
     recommendations = {}
 
     # --- 1. Collaborative Filtering Recommendations ---
-    all_movie_ids = movies_df['id'].unique()
-    watched_movie_ids = ratings_df[ratings_df['user_id'] == user_id]['movie_id'].unique()
-    unwatched_movie_ids = [mid for mid in all_movie_ids if mid not in watched_movie_ids]
-
-    collaborative_preds = [algo.predict(user_id, movie_id) for movie_id in unwatched_movie_ids]
-    collaborative_preds.sort(key=lambda x: x.est, reverse=True)
-
-    for pred in collaborative_preds[:n]:
-        movie_title = movies_df.loc[movies_df['id'] == pred.iid, 'title'].iloc[0]
-        # Initialize the movie in our dictionary
-        if movie_title not in recommendations:
-            recommendations[movie_title] = {'score': 0, 'reasons': set()}
-        # Add the score and the reason
-        recommendations[movie_title]['score'] += pred.est
-        recommendations[movie_title]['reasons'].add("Highly rated by users like you")
+    if scorer is None:
+        scorer = SVDScorer(algo, movies_df['id'].to_numpy())
+    if catalogue is None:
+        catalogue = CatalogueIndex(movies_df, ratings)
 
-    # --- 2. Content-Based Recommendations ---
-    try:
-        user_ratings = ratings_df[ratings_df['user_id'] == user_id]
-        if not user_ratings.empty:
-            top_movie_id = user_ratings.sort_values(by='rating', ascending=False).iloc[0]['movie_id']
-            top_movie_title = movies_df.loc[movies_df['id'] == top_movie_id, 'title'].iloc[0]
-            
-            print(f"Seed movie for content-based part: {top_movie_title}")
-            _, content_recs = get_recommendations(top_movie_title, similarity_matrix, movies_df, indices, top_n=n)
-
-            for i, title in enumerate(content_recs):
-                # Initialize the movie if it's not already there
-                if title not in recommendations:
-                    recommendations[title] = {'score': 0, 'reasons': set()}
-                # Add a content-based score and the specific reason
-                recommendations[title]['score'] += 4.0 - (i * 0.1)
-                recommendations[title]['reasons'].add(f"Because you liked '{top_movie_title}'")
+    # Skip movies the user has already rated (and repeated catalogue rows of the same id).
+    watched_mask = catalogue.watched_mask(user_id)
+    exclude = watched_mask | catalogue.duplicate_rows
 
-    except (IndexError, KeyError) as e:
-        print(f"Could not generate content-based part for User {user_id}. Reason: {e}")
+    # Score every movie with one dot product instead of algo.predict() per movie.
+    top_rows, top_estimates = scorer.top_n(user_id, n, exclude=exclude)
 
-    # --- 3. Combine and Rank ---
-    # Sort recommendations by the combined score
-    sorted_recommendations = sorted(recommendations.items(), key=lambda item: item[1]['score'], reverse=True)
-
-    # NEW: Return a list of dictionaries, each containing the title and the list of reasons
-    import pandas as pd
-from recommend import get_recommendations
-
-def get_hybrid_recommendations(user_id, movies_df, ratings_df, similarity_matrix, indices, algo, n=10):
-    """
-    Generates hybrid recommendations with specific reasons for each movie.
-    """
-    print(f"Generating hybrid recommendations for User ID: {user_id}")
-    
-    # NEW: The recommendations dictionary will now store scores and a set of reasons
-    recommendations = {}
-
-    # --- 1. Collaborative Filtering Recommendations ---
-    all_movie_ids = movies_df['id'].unique()
-    watched_movie_ids = ratings_df[ratings_df['user_id'] == user_id]['movie_id'].unique()
-    unwatched_movie_ids = [mid for mid in all_movie_ids if mid not in watched_movie_ids]
-
-    collaborative_preds = [algo.predict(user_id, movie_id) for movie_id in unwatched_movie_ids]
-    collaborative_preds.sort(key=lambda x: x.est, reverse=True)
-
-    for pred in collaborative_preds[:n]:
-        movie_title = movies_df.loc[movies_df['id'] == pred.iid, 'title'].iloc[0]
+    for row, est in zip(top_rows, top_estimates):
+        movie_title = catalogue.titles[row]
         # Initialize the movie in our dictionary
         if movie_title not in recommendations:
-            recommendations[movie_title] = {'score': 0, 'reasons': set()}
+            recommendations[movie_title] = {'score': 0, 'reasons': set(), 'movie_id': int(catalogue.ids[row])}
         # Add the score and the reason
-        recommendations[movie_title]['score'] += pred.est
+        recommendations[movie_title]['score'] += float(est)
         recommendations[movie_title]['reasons'].add("Highly rated by users like you")
 
     # --- 2. Content-Based Recommendations ---
-    try:
-        user_ratings = ratings_df[ratings_df['user_id'] == user_id]
-        if not user_ratings.empty:
-            top_movie_id = user_ratings.sort_values(by='rating', ascending=False).iloc[0]['movie_id']
-            top_movie_title = movies_df.loc[movies_df['id'] == top_movie_id, 'title'].iloc[0]
-            
-            print(f"Seed movie for content-based part: {top_movie_title}")
-            _, content_recs = get_recommendations(top_movie_title, similarity_matrix, movies_df, indices, top_n=n)
-
-            for i, title in enumerate(content_recs):
-                # Initialize the movie if it's not already there
-                if title not in recommendations:
-                    recommendations[title] = {'score': 0, 'reasons': set()}
-                # Add a content-based score and the specific reason
-                recommendations[title]['score'] += 4.0 - (i * 0.1)
-                recommendations[title]['reasons'].add(f"Because you liked '{top_movie_title}'")
-
-    except (IndexError, KeyError) as e:
-        print(f"Could not generate content-based part for User {user_id}. Reason: {e}")
-
-    # --- 3. Combine and Rank ---
+    top_movie_id = catalogue.top_rated_movie(user_id)
+    seed_row = catalogue.row_of(top_movie_id) if top_movie_id is not None else -1
+    if top_movie_id is not None and seed_row < 0:
+        print(f"Could not generate content-based part for User {user_id}. Reason: movie {top_movie_id} is not in the model.")
+
+    if seed_row >= 0:
+        top_movie_title = catalogue.titles[seed_row]
+        print(f"Seed movie for content-based part: {top_movie_title}")
+
+        # Don't suggest movies the user has already rated.
+        content_rows = similar_indices(seed_row, similarity_matrix, top_n=n, exclude=watched_mask)
+
+        for i, row in enumerate(content_rows):
+            title = catalogue.titles[row]
+            # Initialize the movie if it's not already there
+            if title not in recommendations:
+                recommendations[title] = {'score': 0, 'reasons': set(), 'movie_id': int(catalogue.ids[row])}
+            # Add a content-based score and the specific reason
+            recommendations[title]['score'] += 4.0 - (i * 0.1)
+            recommendations[title]['reasons'].add(f"Because you liked '{top_movie_title}'")
+
+    # --- 3. Flicksy rating feature ---
+    if callable(rating_stats):
+        # Only the candidates' stats, not the whole table.
+        rating_stats = rating_stats([data['movie_id'] for data in recommendations.values()])
+    if rating_stats:
+        for data in recommendations.values():
+            count, total = rating_stats.get(data['movie_id'], (0, 0))
+            if not count:
+                continue
+            bayes_mean = (total + PRIOR_MEAN * PRIOR_WEIGHT) / (count + PRIOR_WEIGHT)
+            data['score'] += FLICKSY_RATING_WEIGHT * (bayes_mean - PRIOR_MEAN)
+            if count >= 3 and total / count >= 4:
+                data['reasons'].add(f"Rated {total / count:.1f}\u2605 by Flicksy users")
+
+    # --- 4. Combine and Rank ---
     # Sort recommendations by the combined score
     sorted_recommendations = sorted(recommendations.items(), key=lambda item: item[1]['score'], reverse=True)
 
@@ -116,6 +97,7 @@ def get_hybrid_recommendations(user_id, movies_df, ratings_df, similarity_matrix
         
         final_recs.append({
             'title': title,
+            'movie_id': data['movie_id'],
             'reasons': list(data['reasons']),
             'match_score': match_percentage  # Add the new key here
         })
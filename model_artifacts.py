@@ -0,0 +1,246 @@
+# model_artifacts.py
+# Pickle-free, memory-mapped storage for the content model. A model is a directory of
+# plain .npy arrays plus a JSON manifest:
+#
+#   movie_model/
+#     manifest.json                  format, similarity kind, columns, array files + sha256
+#     similarity-<digest>.npy        dense N x N matrix, or
+#     neighbors-<digest>.npy / scores-<digest>.npy   top-K index
+#     col-<name>-<digest>.npy        numeric movie columns
+#     col-<name>-data/offsets/valid-<digest>.npy     text columns as UTF-8 bytes + offsets
+#
+# The similarity arrays are opened with np.load(mmap_mode='r'), so every worker maps the
+# same file and shares its pages through the OS page cache instead of holding a private
+# unpickled copy. Array file names carry their checksum, so a rebuild writes new files next
+# to the old ones and then swaps manifest.json; workers still mapping the old files keep
+# reading them until they reload. The previous generation's files are kept until the next
+# save, so a worker that read the old manifest just before the swap can still open them.
+#
+#   python model_artifacts.py convert movie_model.pkl movie_model
+#   python model_artifacts.py verify movie_model
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from similarity_index import TopKSimilarity, load_pickled_content_model
+from title_index import TitleIndex
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def manifest_path(path):
+    return os.path.join(path, MANIFEST_NAME)
+
+
+def is_model_dir(path):
+    return os.path.isfile(manifest_path(path))
+
+
+def title_indices(movies_df):
+    """title -> row Series that get_recommendations expects (first row wins for repeated titles)."""
+    return pd.Series(movies_df.index, index=movies_df['title']).drop_duplicates()
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_array(directory, name, array):
+    """Saves one array as <name>-<sha256 prefix>.npy and returns its manifest entry."""
+    array = np.ascontiguousarray(array)
+    tmp_path = os.path.join(directory, f"{name}.npy.tmp")
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    sha256 = _file_sha256(tmp_path)
+    file_name = f"{name}-{sha256[:12]}.npy"
+    os.replace(tmp_path, os.path.join(directory, file_name))
+    return {'file': file_name, 'dtype': array.dtype.str, 'shape': list(array.shape), 'sha256': sha256}
+
+
+def _encode_text(values, name):
+    """
+    Object column -> (UTF-8 bytes, int64 offsets, validity mask); NaN/None become invalid.
+    Any other non-string value raises TypeError rather than being silently dropped.
+    """
+    for value in values:
+        if not isinstance(value, str) and not (value is None or (isinstance(value, float) and np.isnan(value))):
+            raise TypeError(f"Column '{name}' holds a {type(value).__name__} ({value!r}); "
+                            f"text columns must contain only str or missing values")
+    valid = np.array([isinstance(v, str) for v in values], dtype=bool)
+    encoded = [v.encode('utf-8') if ok else b'' for v, ok in zip(values, valid)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return data, offsets, valid
+
+
+def _decode_text(data, offsets, valid):
+    raw = data.tobytes()
+    values = np.empty(len(valid), dtype=object)
+    for i in range(len(valid)):
+        values[i] = raw[offsets[i]:offsets[i + 1]].decode('utf-8') if valid[i] else np.nan
+    return values
+
+
+def save_content_model(path, movies_df, similarity):
+    """
+    Writes (movies_df, similarity) as a model directory. similarity is the dense matrix or a
+    TopKSimilarity. Arrays are written first and manifest.json is replaced last, so a reader
+    sees either the previous model or the complete new one. Files referenced by neither the
+    new manifest nor the one it replaces (i.e. two generations old) are removed afterwards.
+    """
+    os.makedirs(path, exist_ok=True)
+    movies_df = movies_df.reset_index(drop=True)
+    arrays = {}
+
+    if isinstance(similarity, TopKSimilarity):
+        kind = 'topk'
+        arrays['neighbors'] = write_array(path, 'neighbors', similarity.neighbors)
+        arrays['scores'] = write_array(path, 'scores', similarity.scores)
+    else:
+        kind = 'dense'
+        arrays['similarity'] = write_array(path, 'similarity', np.asarray(similarity))
+
+    columns = []
+    for name in movies_df.columns:
+        series = movies_df[name]
+        key = f"col-{name}"
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            arrays[key] = write_array(path, key, series.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric'})
+        else:
+            data, offsets, valid = _encode_text(series.to_numpy(dtype=object), name)
+            arrays[f"{key}-data"] = write_array(path, f"{key}-data", data)
+            arrays[f"{key}-offsets"] = write_array(path, f"{key}-offsets", offsets)
+            arrays[f"{key}-valid"] = write_array(path, f"{key}-valid", valid)
+            columns.append({'name': name, 'kind': 'text'})
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'similarity': kind,
+        'rows': len(movies_df),
+        'columns': columns,
+        'arrays': arrays,
+    }
+    commit_manifest(path, manifest)
+    return manifest
+
+
+def _manifest_files(manifest):
+    return {entry['file'] for entry in manifest.get('arrays', {}).values()}
+
+
+def commit_manifest(path, manifest):
+    """
+    Swaps in manifest.json, the single commit point of a save, then prunes array files that
+    neither it nor the manifest it replaced reference. Shared with ratings_store, whose
+    manifest lists write_array entries the same way. The replaced generation stays on disk
+    for a reader that loaded the old manifest just before the swap; it goes on the next save.
+    """
+    previous = set()
+    if os.path.exists(manifest_path(path)):
+        try:
+            with open(manifest_path(path)) as f:
+                previous = _manifest_files(json.load(f))
+        except (ValueError, KeyError, TypeError):
+            pass  # unreadable or older-format manifest: keep only the new generation
+    tmp_path = manifest_path(path) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path(path))
+
+    # Unlinking is safe for workers that still map an old file: the pages stay valid until they unmap.
+    keep = _manifest_files(manifest) | previous
+    for file_name in os.listdir(path):
+        if file_name.endswith('.npy') and file_name not in keep:
+            os.remove(os.path.join(path, file_name))
+
+
+def load_manifest(path):
+    with open(manifest_path(path)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format {manifest.get('format')!r} in {path}")
+    return manifest
+
+
+def verify_content_model(path, manifest=None):
+    """Re-hashes every array file; raises ValueError naming the first one that does not match."""
+    manifest = manifest or load_manifest(path)
+    for name, entry in manifest['arrays'].items():
+        if _file_sha256(os.path.join(path, entry['file'])) != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for '{name}' ({entry['file']}) in {path}")
+
+
+def _open_array(path, entry, mmap=True):
+    array = np.load(os.path.join(path, entry['file']), mmap_mode='r' if mmap else None, allow_pickle=False)
+    # Header check only; the full checksum is verify_content_model's job.
+    if array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']:
+        raise ValueError(f"{entry['file']} holds {array.dtype.str}{list(array.shape)}, "
+                         f"manifest says {entry['dtype']}{entry['shape']}")
+    return array
+
+
+def open_content_model(path, verify=False):
+    """
+    Opens a model directory. Returns (movies_df, similarity, indices, title_index) like
+    load_content_model; the similarity arrays stay memory-mapped and read-only. The movie
+    columns and title index are small and are rebuilt in memory. Pass verify=True to check
+    every file against its sha256 first (reads every byte, so it is off by default).
+    """
+    manifest = load_manifest(path)
+    if verify:
+        verify_content_model(path, manifest)
+    arrays = manifest['arrays']
+
+    columns = {}
+    for column in manifest['columns']:
+        key = f"col-{column['name']}"
+        if column['kind'] == 'numeric':
+            columns[column['name']] = _open_array(path, arrays[key], mmap=False)
+        else:
+            columns[column['name']] = _decode_text(_open_array(path, arrays[f"{key}-data"], mmap=False),
+                                                   _open_array(path, arrays[f"{key}-offsets"], mmap=False),
+                                                   _open_array(path, arrays[f"{key}-valid"], mmap=False))
+    movies_df = pd.DataFrame(columns, columns=[c['name'] for c in manifest['columns']])
+
+    if manifest['similarity'] == 'topk':
+        similarity = TopKSimilarity(_open_array(path, arrays['neighbors']), _open_array(path, arrays['scores']))
+    else:
+        similarity = _open_array(path, arrays['similarity'])
+
+    if len(similarity) != manifest['rows'] or len(movies_df) != manifest['rows']:
+        raise ValueError(f"{path}: manifest says {manifest['rows']} rows, "
+                         f"found {len(movies_df)} movies and {len(similarity)} similarity rows")
+    return movies_df, similarity, title_indices(movies_df), TitleIndex(movies_df['title'])
+
+
+def convert_pickle(pickle_path, path):
+    """Converts a movie_model.pkl written by the old build_model.py into a model directory."""
+    movies_df, similarity, _, _ = load_pickled_content_model(pickle_path)
+    return save_content_model(path, movies_df, similarity)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert or verify memory-mapped content model artifacts.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help="convert a pickled content model")
+    convert.add_argument('source', nargs='?', default='movie_model.pkl')
+    convert.add_argument('target', nargs='?', default='movie_model')
+    verify = subparsers.add_parser('verify', help="check every array file against the manifest checksums")
+    verify.add_argument('path', nargs='?', default='movie_model')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        manifest = convert_pickle(args.source, args.target)
+        print(f"Converted {args.source} -> {args.target} ({manifest['rows']} movies, {manifest['similarity']} similarity)")
+    else:
+        verify_content_model(args.path)
+        print(f"{args.path}: all checksums match")
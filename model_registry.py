@@ -0,0 +1,191 @@
+# model_registry.py
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from catalogue_index import CatalogueIndex
+from collaborative_scoring import SVDScorer
+from recommend import similar_indices
+from model_artifacts import is_model_dir, manifest_path
+from ratings_store import load_ratings_store
+from similarity_index import load_content_model
+
+DEFAULT_PATHS = {
+    'content': "movie_model",
+    'collaborative': "collaborative_model.pkl",
+    'ratings': "ratings.csv",  # or a ratings_store.py directory, which is memory-mapped
+}
+
+
+def _artifact_file(path):
+    """The file whose replacement marks a new version: a model directory's manifest, else the file itself."""
+    return manifest_path(path) if is_model_dir(path) else path
+
+
+def artifact_signature(paths):
+    """(mtime, size) of every artifact; None if one is missing. Changes whenever a file is replaced."""
+    try:
+        stats = [os.stat(_artifact_file(p)) for p in paths.values()]
+    except OSError:
+        return None
+    return tuple((int(st.st_mtime), st.st_size) for st in stats)
+
+
+class ModelBundle:
+    """
+    One fully loaded, immutable set of recommender artifacts. Request handlers read
+    registry.active once and use that bundle throughout, so a swap mid-request never
+    mixes two model versions.
+    """
+
+    def __init__(self, version, movies_df, similarity_matrix, indices, title_index, algo, ratings):
+        self.version = version
+        self.movies_df = movies_df
+        self.similarity_matrix = similarity_matrix
+        self.indices = indices
+        self.title_index = title_index
+        self.algo = algo
+        # RatingsStore: each user's history is an O(1) slice, not a scan of a ratings DataFrame.
+        self.ratings = ratings
+        # Pull the SVD factors into NumPy arrays once so a user is scored with a single dot product.
+        self.scorer = SVDScorer(algo, movies_df['id'].to_numpy())
+        # id -> row / title arrays; per-user rated rows come from the ratings store.
+        self.catalogue = CatalogueIndex(movies_df, ratings)
+        self.loaded_at = datetime.utcnow()
+
+
+def load_model_bundle(paths=None, verify=False):
+    """
+    Loads and indexes all artifacts; the version is derived from the files' mtimes.
+    verify=True checks the content model's array checksums before using it.
+    """
+    paths = paths or DEFAULT_PATHS
+    signature = artifact_signature(paths)
+    if signature is None:
+        raise FileNotFoundError(f"Missing model artifacts: {[p for p in paths.values() if not os.path.exists(_artifact_file(p))]}")
+
+    movies_df, similarity_matrix, indices, title_index = load_content_model(paths['content'], verify=verify)
+    with open(paths['collaborative'], "rb") as f:
+        algo = pickle.load(f)
+    ratings = load_ratings_store(paths['ratings'])
+
+    version = "-".join(str(mtime) for mtime, _ in signature)
+    return ModelBundle(version, movies_df, similarity_matrix, indices, title_index, algo, ratings)
+
+
+def validate_bundle(bundle):
+    """Raises ValueError if the artifacts are inconsistent or produce unusable scores."""
+    n_movies = len(bundle.movies_df)
+    if n_movies == 0:
+        raise ValueError("content model has no movies")
+    if bundle.similarity_matrix.shape != (n_movies, n_movies):
+        raise ValueError(f"similarity shape {bundle.similarity_matrix.shape} does not match {n_movies} movies")
+    if len(bundle.ratings.offsets) == 0 or bundle.ratings.offsets[-1] != len(bundle.ratings.items):
+        raise ValueError("ratings store offsets do not match its ratings")
+
+    # Smoke-test both halves of the hybrid recommender.
+    similar_indices(0, bundle.similarity_matrix, top_n=5)
+    user_id = bundle.ratings.first_user()
+    if user_id is not None:
+        estimates = bundle.scorer.score_all(user_id)
+        if len(estimates) != n_movies or not np.all(np.isfinite(estimates)):
+            raise ValueError("collaborative model produced invalid scores")
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelBundle and replaces it without a restart.
+    New artifacts are loaded and validated on a background thread while requests keep
+    using the current bundle; the swap itself is a single reference assignment. A bundle
+    that fails to load or validate is discarded and the previous one stays active.
+    """
+
+    def __init__(self, paths=None, verify_checksums=False):
+        self.paths = dict(paths or DEFAULT_PATHS)
+        self.verify_checksums = verify_checksums
+        self._active = None
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.last_error = None
+
+    @property
+    def active(self):
+        """The current bundle, or None if no model has loaded yet."""
+        return self._active
+
+    @property
+    def version(self):
+        bundle = self._active
+        return bundle.version if bundle is not None else None
+
+    def reload(self):
+        """Loads, validates and swaps in the artifacts on disk. Returns True if a new bundle went live."""
+        if not self._reload_lock.acquire(blocking=False):
+            return False  # a reload is already running
+        try:
+            signature = artifact_signature(self.paths)
+            started = time.perf_counter()
+            try:
+                bundle = load_model_bundle(self.paths, verify=self.verify_checksums)
+                validate_bundle(bundle)
+            except Exception as e:
+                self.last_error = str(e)
+                self._signature = signature  # do not retry the same broken files every poll
+                print(f"Model reload failed, keeping version {self.version}: {e}")
+                return False
+
+            previous_bundle = self._active
+            previous = self.version
+            if previous_bundle is not None:
+                # Ratings posted since the last export live only in the old bundle's overlay.
+                bundle.ratings.adopt_appended(previous_bundle.ratings)
+            self._active = bundle
+            if previous_bundle is not None:
+                # ...plus any posted to the old bundle while the swap happened.
+                bundle.ratings.adopt_appended(previous_bundle.ratings)
+            self._signature = signature
+            self.last_error = None
+            print(f"Model version {bundle.version} active (was {previous}); "
+                  f"loaded in {time.perf_counter() - started:.1f}s.")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self):
+        thread = threading.Thread(target=self.reload, name='model-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def start_watching(self, interval=60):
+        """Polls the artifacts and reloads once a changed set has stayed unchanged for one interval."""
+        if self._watcher is not None:
+            return
+
+        def watch():
+            pending = None
+            while True:
+                time.sleep(interval)
+                signature = artifact_signature(self.paths)
+                if signature is None or signature == self._signature:
+                    pending = None
+                elif signature == pending:
+                    # Unchanged since the last poll, so the retrain has finished writing.
+                    self.reload()
+                    pending = None
+                else:
+                    pending = signature
+
+        self._watcher = threading.Thread(target=watch, name='model-watch', daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        bundle = self._active
+        return {
+            'version': bundle.version if bundle is not None else None,
+            'loaded_at': bundle.loaded_at.isoformat() if bundle is not None else None,
+            'movies': len(bundle.movies_df) if bundle is not None else 0,
+            'last_error': self.last_error,
+        }
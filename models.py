@@ -56,6 +56,32 @@ class Movie(db.Model):
         return f'<Movie {self.title}>'
 
 
+# TMDB genres, keyed by TMDB's own genre id
+class Genre(db.Model):
+    __tablename__ = 'genres'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<Genre {self.name}>'
+
+
+# One row per (movie, genre); replaces LIKE scans over movies.genre.
+# language and vote_count are copied from the movie so the dashboard's
+# "genre IN (...) AND language IN (...) ORDER BY vote_count" is served from one index.
+class MovieGenre(db.Model):
+    __tablename__ = 'movie_genres'
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True)
+    genre_id = db.Column(db.Integer, db.ForeignKey('genres.id'), primary_key=True)
+    language = db.Column(db.String(50))
+    vote_count = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index('ix_movie_genres_genre_votes', 'genre_id', 'vote_count', 'movie_id'),
+        db.Index('ix_movie_genres_genre_language_votes', 'genre_id', 'language', 'vote_count', 'movie_id'),
+    )
+
+
 # =====================================================================
 # === NEW & CORRECTED WATCHLIST MODEL ===
 # Replace your old WatchedMovie model with this one.
@@ -117,4 +143,71 @@ class Review(db.Model):
     rating = db.Column(db.Integer, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
-    user = db.relationship('User', backref='user_reviews')
\ No newline at end of file
+    user = db.relationship('User', backref='user_reviews')
+
+    # Keyset pagination of a title's reviews, newest first (see review_feed.py)
+    __table_args__ = (
+        db.Index('ix_reviews_movie_timestamp', 'movie_id', 'timestamp', 'id'),
+        db.Index('ix_reviews_tv_timestamp', 'tv_id', 'timestamp', 'id'),
+    )
+
+
+# Per-title aggregate of Flicksy reviews, kept in step with the reviews table (see rating_stats.py)
+class TitleRatingStats(db.Model):
+    __tablename__ = 'title_rating_stats'
+
+    media_type = db.Column(db.String(10), primary_key=True)  # 'movie' or 'tv'
+    tmdb_id = db.Column(db.Integer, primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    # Histogram of 1-5 star ratings
+    rating_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_5 = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def mean(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    def to_dict(self):
+        return {
+            'review_count': self.review_count,
+            'rating_count': self.rating_count,
+            'mean': round(self.mean, 2) if self.mean is not None else None,
+            'histogram': {stars: getattr(self, f'rating_{stars}') for stars in range(1, 6)},
+        }
+
+
+# Hybrid recommendations computed ahead of time by precompute_recommendations.py
+class UserRecommendation(db.Model):
+    __tablename__ = 'user_recommendations'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
+    model_version = db.Column(db.String(255), nullable=False)
+    n = db.Column(db.Integer, nullable=False)
+    recommendations = db.Column(db.JSON, nullable=False)  # get_hybrid_recommendations() output
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Progress markers for background jobs, e.g. the TMDB changes sync
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    synced_until = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Movies a sync run could not refresh; the next run retries them before reading new changes
+class SyncRetry(db.Model):
+    __tablename__ = 'sync_retries'
+
+    name = db.Column(db.String(50), primary_key=True)  # SyncState.name of the job
+    tmdb_id = db.Column(db.Integer, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=1)  # runs that failed to refresh it
+    first_failed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_failed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
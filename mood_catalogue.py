@@ -0,0 +1,187 @@
+# mood_catalogue.py
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from models import db, Movie
+from recommend import top_n_indices
+
+MOOD_GENRES = {
+    'Happy': ['Comedy', 'Romance', 'Adventure', 'Family', 'Animation', 'Musical'],
+    'Normal': ['Action', 'Horror', 'Thriller', 'Fantasy', 'Crime', 'Mystery'],
+    'Sad': ['Drama', 'History', 'War', 'Biography', 'Documentary'],
+}
+LANGUAGE_CODES = {'English': 'en', 'Hindi': 'hi', 'Marathi': 'mr', 'Korean': 'ko', 'Tamil': 'ta',
+                  'Telugu': 'te', 'Japanese': 'ja', 'Other': None}
+FAMILY_CERTIFICATIONS = {"G", "PG", "PG-13", "U", "U/A", "Not Rated", "NR", "12", "U/A 7+", "U/A 13+"}
+DECADES = {'2020s': (2020, 9999), '2010s': (2010, 2019), '2000s': (2000, 2009), '1990s': (1990, 1999)}
+
+# Genre bitmasks are uint64, so at most 64 distinct genre names (TMDB has 19).
+MAX_GENRES = 64
+
+
+def _release_year(value):
+    """Year from a 'YYYY-MM-DD' string or datetime; 0 when unknown."""
+    text = str(value)[:4] if value else ''
+    return int(text) if text.isdigit() else 0
+
+
+class MoodCatalogue:
+    """
+    Columnar snapshot of every non-adult movie for /mood-recommendations:
+    a genre bitmask, language code, family-safe flag, release year and the precomputed
+    popularity score per row. A request is a handful of vectorized masks over the whole
+    catalogue, with no database round trip.
+    """
+
+    def __init__(self, rows):
+        self.built_at = datetime.utcnow()
+        n = len(rows)
+        self.genre_bits = {}
+        self.genre_mask = np.zeros(n, dtype=np.uint64)
+        self.languages = {}
+        self.language = np.zeros(n, dtype=np.int16)
+        self.family_safe = np.zeros(n, dtype=bool)
+        self.year = np.zeros(n, dtype=np.int16)
+        self.score = np.zeros(n, dtype=np.float32)
+        self.tmdb_id = np.zeros(n, dtype=np.int64)
+        self.title = np.empty(n, dtype=object)
+        self.poster_path = np.empty(n, dtype=object)
+        self.vote_average = np.empty(n, dtype=object)
+
+        for i, (tmdb_id, title, poster_path, genre, language, certification,
+                release_date, vote_average, vote_count) in enumerate(rows):
+            mask = 0
+            for name in (g.strip() for g in (genre or '').split(',')):
+                bit = self._genre_bit(name) if name else None
+                if bit is not None:
+                    mask |= 1 << bit
+            self.genre_mask[i] = mask
+            # Code 0 is "no language"; known languages start at 1.
+            self.language[i] = self.languages.setdefault(language, len(self.languages) + 1) if language else 0
+            self.family_safe[i] = not certification or certification in FAMILY_CERTIFICATIONS
+            self.year[i] = _release_year(release_date)
+            self.score[i] = (vote_average or 0) * 5 + min((vote_count or 0) / 100, 30)
+            self.tmdb_id[i] = tmdb_id
+            self.title[i] = title
+            self.poster_path[i] = poster_path
+            self.vote_average[i] = vote_average
+
+    def _genre_bit(self, name):
+        bit = self.genre_bits.get(name)
+        if bit is None and len(self.genre_bits) < MAX_GENRES:
+            bit = self.genre_bits[name] = len(self.genre_bits)
+        return bit
+
+    def __len__(self):
+        return len(self.tmdb_id)
+
+    def genres_mask(self, names):
+        mask = 0
+        for name in names:
+            if name in self.genre_bits:
+                mask |= 1 << self.genre_bits[name]
+        return np.uint64(mask)
+
+    def candidates(self, genres, language=None, family=False, years=None):
+        """Row positions matching any of `genres` and the optional language, family and year filters."""
+        target = self.genres_mask(genres)
+        if not target:
+            return np.empty(0, dtype=np.int64)
+        keep = (self.genre_mask & target) != 0
+        if language:
+            code = self.languages.get(language)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            keep &= self.language == code
+        if family:
+            keep &= self.family_safe
+        if years:
+            keep &= (self.year >= years[0]) & (self.year <= years[1])
+        return np.flatnonzero(keep)
+
+    def recommend(self, genres, language=None, family=False, years=None, pool=50, n=6, rng=None):
+        """
+        Takes the `pool` best-scoring matches (ties broken by row, so results are stable) and
+        draws n of them at random, weighted by score, so repeat requests vary. Returns dicts
+        ready for the JSON response.
+        """
+        rows = self.candidates(genres, language, family, years)
+        if len(rows) == 0:
+            return []
+        top = rows[top_n_indices(self.score[rows], pool)]
+        # The small floor keeps unrated movies drawable, so there are always n non-zero weights.
+        weights = self.score[top].astype(np.float64) + 1e-3
+        weights /= weights.sum()
+        rng = rng or np.random.default_rng()
+        picked = rng.choice(top, size=min(n, len(top)), replace=False, p=weights)
+        return [{
+            'tmdb_id': int(self.tmdb_id[i]), 'title': self.title[i], 'poster_path': self.poster_path[i],
+            'vote_average': self.vote_average[i],
+            'release_date': str(self.year[i]) if self.year[i] else 'N/A',
+        } for i in picked]
+
+
+def load_mood_catalogue(batch_size=10000):
+    """Reads the catalogue columns (not ORM objects) in batches. Needs an app context."""
+    query = db.session.query(
+        Movie.tmdb_id, Movie.title, Movie.poster_path, Movie.genre, Movie.language, Movie.certification,
+        Movie.release_date, Movie.vote_average, Movie.vote_count
+    ).filter(Movie.adult.is_(False)).order_by(Movie.id)
+    return MoodCatalogue(query.yield_per(batch_size).all())
+
+
+class MoodCatalogueRefresher:
+    """
+    Holds the active MoodCatalogue and rebuilds it from the database every `interval`
+    seconds on a background thread; requests keep using the previous snapshot meanwhile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._active = None
+        self._load_lock = threading.Lock()
+        self._thread = None
+        self.last_error = None
+
+    @property
+    def active(self):
+        """The current catalogue, loading it on this thread if nothing has loaded yet."""
+        if self._active is None:
+            self.refresh()
+        return self._active
+
+    def refresh(self):
+        with self._load_lock:
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    catalogue = load_mood_catalogue()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Mood catalogue refresh failed: {e}")
+                return False
+            self._active = catalogue
+            self.last_error = None
+            print(f"Mood catalogue: {len(catalogue)} movies loaded in {time.perf_counter() - started:.1f}s.")
+            return True
+
+    def start_refreshing(self, interval=600):
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.refresh()
+
+        self._thread = threading.Thread(target=loop, name='mood-catalogue', daemon=True)
+        self._thread.start()
+
+    def status(self):
+        catalogue = self._active
+        return {
+            'movies': len(catalogue) if catalogue is not None else 0,
+            'built_at': catalogue.built_at.isoformat() if catalogue is not None else None,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,191 @@
+# movie_store.py
+from sqlalchemy import select
+from models import db, Movie, Genre, MovieGenre
+
+# Keeps IN (...) lists and multi-row INSERTs well under MySQL's max_allowed_packet.
+DEFAULT_CHUNK_SIZE = 500
+
+# Movie dicts may carry TMDB genre ids under this key; they are written to movie_genres.
+GENRE_IDS = 'genre_ids'
+
+# Profile form labels that differ from TMDB's genre names.
+GENRE_ALIASES = {'sci-fi': 'science fiction', 'musical': 'music'}
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def stored_movie_ids(tmdb_ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """{tmdb_id: movies.id} for the tmdb_ids already stored, with one IN query per chunk."""
+    tmdb_ids = list(dict.fromkeys(tmdb_ids))
+    found = {}
+    for chunk in _chunks(tmdb_ids, chunk_size):
+        rows = db.session.query(Movie.tmdb_id, Movie.id).filter(Movie.tmdb_id.in_(chunk)).all()
+        found.update(rows)
+    return found
+
+
+def existing_tmdb_ids(tmdb_ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """The subset of tmdb_ids already in the movies table."""
+    return set(stored_movie_ids(tmdb_ids, chunk_size))
+
+
+# --- Genres ---
+def store_genres(genre_map):
+    """Inserts or renames genres from a {tmdb genre id: name} map."""
+    if not genre_map:
+        return
+    stored = dict(db.session.query(Genre.id, Genre.name).filter(Genre.id.in_(list(genre_map))).all())
+    for genre_id, name in genre_map.items():
+        if genre_id not in stored:
+            db.session.add(Genre(id=genre_id, name=name))
+        elif stored[genre_id] != name:
+            db.session.query(Genre).filter_by(id=genre_id).update({'name': name})
+    db.session.commit()
+
+
+def genre_ids_for_names(names):
+    """TMDB genre ids for genre names (case-insensitive, profile aliases such as 'Sci-Fi' included)."""
+    wanted = {GENRE_ALIASES.get(n.strip().lower(), n.strip().lower()) for n in names if n and n.strip()}
+    if not wanted:
+        return []
+    return [genre_id for genre_id, name in db.session.query(Genre.id, Genre.name).all()
+            if name.lower() in wanted]
+
+
+def _pop_genre_ids(rows):
+    """Removes GENRE_IDS from each row; returns {tmdb_id or id: genre ids} for the rows that had it."""
+    genre_ids = {}
+    for row in rows:
+        if GENRE_IDS in row:
+            genre_ids[row.get('tmdb_id', row.get('id'))] = row.pop(GENRE_IDS)
+    return genre_ids
+
+
+def replace_movie_genres(genre_ids_by_movie):
+    """
+    Rewrites movie_genres for {movies.id: [genre ids]}, copying each movie's language and
+    vote_count. Genre ids that are not in the genres table are skipped. Caller commits.
+    """
+    if not genre_ids_by_movie:
+        return
+    movie_ids = list(genre_ids_by_movie)
+    known = {genre_id for (genre_id,) in db.session.query(Genre.id).all()}
+    movies = db.session.query(Movie.id, Movie.language, Movie.vote_count).filter(Movie.id.in_(movie_ids)).all()
+    db.session.query(MovieGenre).filter(MovieGenre.movie_id.in_(movie_ids)).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(MovieGenre, [
+        {'movie_id': movie_id, 'genre_id': genre_id, 'language': language, 'vote_count': vote_count}
+        for movie_id, language, vote_count in movies
+        for genre_id in dict.fromkeys(genre_ids_by_movie[movie_id]) if genre_id in known
+    ])
+
+
+def _from_movie(column):
+    """Correlated subquery: the movie's value of column, for an UPDATE of movie_genres."""
+    return select(column).where(Movie.__table__.c.id == MovieGenre.__table__.c.movie_id).scalar_subquery()
+
+
+def refresh_movie_genre_columns(movie_ids):
+    """Copies language and vote_count from movies into their movie_genres rows. Caller commits."""
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return
+    movie_genres = MovieGenre.__table__
+    db.session.execute(
+        movie_genres.update()
+        .where(movie_genres.c.movie_id.in_(movie_ids))
+        .values(language=_from_movie(Movie.__table__.c.language),
+                vote_count=_from_movie(Movie.__table__.c.vote_count))
+    )
+
+
+# --- Movies ---
+def bulk_insert_movies(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Inserts movie dicts (column name -> value) with one multi-row INSERT and one commit
+    per chunk. A failing chunk is rolled back and skipped; returns the number inserted.
+    Rows may carry GENRE_IDS, which are written to movie_genres in the same transaction.
+    """
+    inserted = 0
+    for chunk in _chunks(list(rows), chunk_size):
+        try:
+            genre_ids = _pop_genre_ids(chunk)
+            db.session.bulk_insert_mappings(Movie, chunk)
+            if genre_ids:
+                stored = stored_movie_ids(genre_ids)
+                replace_movie_genres({stored[t]: ids for t, ids in genre_ids.items() if t in stored})
+            db.session.commit()
+            inserted += len(chunk)
+        except Exception as e:
+            db.session.rollback()
+            print(f"  --- DATABASE ERROR while inserting {len(chunk)} movies: {e} ---")
+    return inserted
+
+
+def _upsert_statement(rows, update_columns):
+    """Multi-row INSERT that updates update_columns when tmdb_id already exists."""
+    dialect = db.session.get_bind().dialect.name
+    table = Movie.__table__
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_columns})
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(index_elements=[table.c.tmdb_id],
+                                          set_={col: stmt.excluded[col] for col in update_columns})
+    raise ValueError(f"Upsert is not supported for the '{dialect}' dialect")
+
+
+def upsert_movies(rows, update_columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Inserts movie dicts keyed on tmdb_id; rows whose tmdb_id is already stored get only
+    update_columns overwritten. Every dict must have the same keys. Runs one statement and
+    one commit per chunk, so a duplicate (or any other failure) costs at most its own chunk.
+    Rows may carry GENRE_IDS, which replace the movie's movie_genres rows.
+    Returns the number of rows written.
+    """
+    # Last row wins for repeated tmdb_ids; one statement may not touch a row twice.
+    rows = list({row['tmdb_id']: row for row in rows}.values())
+    written = 0
+    for chunk in _chunks(rows, chunk_size):
+        try:
+            genre_ids = _pop_genre_ids(chunk)
+            db.session.execute(_upsert_statement(chunk, update_columns))
+            stored = stored_movie_ids([row['tmdb_id'] for row in chunk])
+            if genre_ids:
+                replace_movie_genres({stored[t]: ids for t, ids in genre_ids.items() if t in stored})
+            refresh_movie_genre_columns(stored.values())
+            db.session.commit()
+            written += len(chunk)
+        except Exception as e:
+            db.session.rollback()
+            print(f"  --- DATABASE ERROR while upserting {len(chunk)} movies: {e} ---")
+    return written
+
+
+def bulk_update_movies(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Updates stored movies from dicts that carry their primary key ('id'); one commit per chunk.
+    GENRE_IDS replace a movie's genres; a changed language or vote_count is copied to movie_genres.
+    """
+    updated = 0
+    for chunk in _chunks(list(rows), chunk_size):
+        try:
+            genre_ids = _pop_genre_ids(chunk)
+            db.session.bulk_update_mappings(Movie, chunk)
+            replace_movie_genres(genre_ids)
+            refresh_movie_genre_columns([row['id'] for row in chunk if row['id'] not in genre_ids
+                                         and ('language' in row or 'vote_count' in row)])
+            db.session.commit()
+            updated += len(chunk)
+        except Exception as e:
+            db.session.rollback()
+            print(f"  --- DATABASE ERROR while updating {len(chunk)} movies: {e} ---")
+    return updated
@@ -2,126 +2,144 @@
 # ===== THE ULTIMATE populate_db.py SCRIPT ==========================
 # ===================================================================
 
-from app import app, db, MovieModel as Movie
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app import app
+from models import db
+from movie_store import GENRE_IDS, existing_tmdb_ids, bulk_insert_movies, store_genres
+from tmdb_client import BULK_MAX_RETRY_WAIT, TMDBClient, RateLimiter
+from tmdb_parsers import DETAIL_APPENDS, certification, trailer_key, watch_providers
 
-TMDB_API_KEY = "YOUR_API_KEY"
- 
-GENRE_MAP = {}
+# Dedicated client for bulk population: a pool as large as the worker count and a
+# rate limiter so concurrent workers stay within TMDB's limits.
+# Set TMDB_BASE_URL to point it at a local fake server.
+MAX_WORKERS = 16
+tmdb_client = TMDBClient(pool_maxsize=MAX_WORKERS, rate_limiter=RateLimiter(), max_retry_wait=BULK_MAX_RETRY_WAIT)
 
-# --- Session with retries (no changes) ---
-session = requests.Session()
-retry_strategy = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-adapter = HTTPAdapter(max_retries=retry_strategy)
-session.mount("https://", adapter)
-session.mount("http://", adapter)
+GENRE_MAP = {}
 
-# --- Helper functions (no changes) ---
+# --- Helper functions ---
+# All requests go through tmdb_client (pooled session, retries with backoff, caching, rate limit).
 def fetch_genre_map():
     global GENRE_MAP
     if GENRE_MAP: return
-    url = f"https://api.themoviedb.org/3/genre/movie/list?api_key={TMDB_API_KEY}&language=en-US"
-    try:
-        response = session.get(url, timeout=15)
-        response.raise_for_status()
-        genres = response.json().get('genres', [])
+    data = tmdb_client.get("genre/movie/list", {"language": "en-US"})
+    if data:
+        genres = data.get('genres', [])
         GENRE_MAP = {genre['id']: genre['name'] for genre in genres}
         print("Successfully fetched genre map.")
-    except requests.exceptions.RequestException as e:
-        print(f"Could not fetch genre map: {e}. Genres will be incorrect.")
-
-def get_certification(tmdb_id, region="US"):
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}/release_dates?api_key={TMDB_API_KEY}"
-    try:
-        resp = session.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        for entry in data.get("results", []):
-            if entry.get("iso_3166_1") == region:
-                for rd in entry.get("release_dates", []):
-                    cert = rd.get("certification")
-                    if cert and cert.strip(): return cert.strip().upper(), region
-        for entry in data.get("results", []):
-             for rd in entry.get("release_dates", []):
-                cert = rd.get("certification")
-                if cert and cert.strip(): return cert.strip().upper(), entry.get("iso_3166_1")
-    except requests.exceptions.RequestException: pass
-    return None, None
-
-def get_watch_providers(tmdb_id, region="US"):
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}/watch/providers?api_key={TMDB_API_KEY}"
-    try:
-        resp = session.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        providers = data.get("results", {}).get(region, {}).get("flatrate", [])
-        if providers:
-            provider_names = [p.get("provider_name") for p in providers if p.get("provider_name")]
-            return ", ".join(sorted(provider_names))
-    except requests.exceptions.RequestException: pass
-    return None
-
-# --- Main fetching function (reusable for any query) ---
-def fetch_and_save_movies(api_url, description):
-    print(f"\nFetching: {description}")
-    movies_added_total = 0
-    
-    for page_num in range(1, 4): # Fetch 3 pages for each combination
-        try:
-            response = session.get(f"{api_url}&page={page_num}", timeout=15)
-            response.raise_for_status()
-            movie_list = response.json().get('results', [])
-            if not movie_list:
-                print(f"  -> No more movies found for this query.")
-                break
-        except requests.exceptions.RequestException as e:
-            print(f"  -> Error fetching page {page_num}: {e}. Stopping.")
-            break
-        
-        movies_added_on_this_page = 0
-        for movie_data in movie_list:
-            exists = Movie.query.filter_by(tmdb_id=movie_data['id']).first()
-            if not exists and movie_data.get('poster_path') and movie_data.get('genre_ids'):
-                genre_names = [GENRE_MAP.get(gid) for gid in movie_data['genre_ids'] if GENRE_MAP.get(gid)]
-                genre_str = ", ".join(genre_names)
-                if not genre_str: continue
-
-                new_movie = Movie(
-                    tmdb_id=movie_data['id'],
-                    title=movie_data['title'],
-                    poster_path=f"https://image.tmdb.org/t/p/w500{movie_data['poster_path']}",
-                    genre=genre_str,
-                    release_date=movie_data.get('release_date', ''),
-                    language=movie_data.get('original_language', ''),
-                    vote_count=movie_data.get('vote_count', 0),
-                    rating=movie_data.get('vote_average', 0.0),
-                    overview=movie_data.get('overview', ''),
-                    adult=movie_data.get('adult', False),
-                    certification=get_certification(movie_data['id'])[0],
-                    platform=get_watch_providers(movie_data['id'])
-                )
-                db.session.add(new_movie)
-                movies_added_on_this_page += 1
-        
-        if movies_added_on_this_page > 0:
+    else:
+        print("Could not fetch genre map. Genres will be incorrect.")
+
+def fetch_movie_extras(tmdb_id, region="US"):
+    """Certification, providers, trailer and runtime from one append_to_response detail call."""
+    details = tmdb_client.get(f"movie/{tmdb_id}", {'append_to_response': DETAIL_APPENDS}) or {}
+    return {
+        'certification': certification(details.get('release_dates'), regions=(region,), any_region=True)[0],
+        'platform': watch_providers(details.get('watch/providers'), region),
+        'trailer_key': trailer_key(details.get('videos')),
+        'runtime': details.get('runtime'),
+    }
+
+# --- Ingestion pipeline ---
+# 1. listing pages for every query, fetched concurrently
+# 2. batched dedup: within the run, then one IN query per chunk against the movies table
+# 3. per-movie enrichment (one detail call: certification, providers, trailer), fetched concurrently
+# 4. bulk insert in chunks as enriched movies come in
+# Every TMDB call goes through the rate limiter, so with enough workers a full run is
+# bounded by TMDB's rate limit rather than by round-trip latency.
+def movie_row(movie_data):
+    """Movie columns from a discover/list result, or None if it should not be stored."""
+    if not movie_data.get('poster_path') or not movie_data.get('genre_ids'):
+        return None
+    genre_names = [GENRE_MAP.get(gid) for gid in movie_data['genre_ids'] if GENRE_MAP.get(gid)]
+    genre_str = ", ".join(genre_names)
+    if not genre_str:
+        return None
+    return {
+        'tmdb_id': movie_data['id'],
+        'title': movie_data['title'],
+        'poster_path': f"https://image.tmdb.org/t/p/w500{movie_data['poster_path']}",
+        'genre': genre_str,
+        GENRE_IDS: [gid for gid in movie_data['genre_ids'] if gid in GENRE_MAP],
+        'release_date': movie_data.get('release_date', ''),
+        'language': movie_data.get('original_language', ''),
+        'vote_count': movie_data.get('vote_count', 0),
+        'rating': movie_data.get('vote_average', 0.0),
+        'overview': movie_data.get('overview', ''),
+        'adult': movie_data.get('adult', False),
+    }
+
+def enrich_movie(row):
+    row.update(fetch_movie_extras(row['tmdb_id']))
+    return row
+
+def run_ingestion(queries, pages_per_query=3, concurrency=8, batch_size=200):
+    """
+    Runs the pipeline for a list of (description, endpoint_path, params) queries.
+    Returns the number of movies inserted and prints throughput.
+    """
+    started = time.perf_counter()
+    candidates = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ingest') as pool:
+        # Stage 1: listing pages
+        page_futures = [
+            (description, page_num, pool.submit(tmdb_client.get, endpoint_path, {**params, 'page': page_num}))
+            for description, endpoint_path, params in queries
+            for page_num in range(1, pages_per_query + 1)
+        ]
+        for description, page_num, future in page_futures:
+            data = future.result()
+            if data is None:
+                print(f"  -> Error fetching page {page_num} of {description}.")
+                continue
+            for movie_data in data.get('results', []):
+                if movie_data.get('id') not in candidates:
+                    row = movie_row(movie_data)
+                    if row is not None:
+                        candidates[row['tmdb_id']] = row
+        listed_at = time.perf_counter()
+
+        # Stage 2: batched dedup against the database
+        existing = existing_tmdb_ids(candidates.keys())
+        new_rows = [row for tmdb_id, row in candidates.items() if tmdb_id not in existing]
+        print(f"Listed {len(candidates)} movies in {listed_at - started:.1f}s; "
+              f"{len(existing)} already stored, {len(new_rows)} new.")
+
+        # Stages 3 + 4: enrichment workers feed bulk inserts on this thread (the DB session is not shared)
+        inserted, batch = 0, []
+        for future in as_completed([pool.submit(enrich_movie, row) for row in new_rows]):
             try:
-                db.session.commit()
-                print(f"  -> Added {movies_added_on_this_page} movies from page {page_num}.")
-                movies_added_total += movies_added_on_this_page
+                batch.append(future.result())
             except Exception as e:
-                db.session.rollback()
-                print(f"  --- DATABASE ERROR: {e} ---")
+                print(f"  -> Error enriching movie: {e}")
+            if len(batch) >= batch_size:
+                inserted += bulk_insert_movies(batch)
+                batch = []
+        if batch:
+            inserted += bulk_insert_movies(batch)
 
-    if movies_added_total == 0:
-        print("  -> No new movies to add for this combination.")
+    elapsed = time.perf_counter() - started
+    rate = inserted / elapsed if elapsed > 0 else 0.0
+    print(f"Inserted {inserted} movies in {elapsed:.1f}s ({rate:.1f} movies/sec).")
+    return inserted
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Populate the movies table from TMDB discover queries.")
+    parser.add_argument('--workers', type=int, default=8,
+                        help=f"concurrent TMDB requests (max {MAX_WORKERS})")
+    parser.add_argument('--pages', type=int, default=3, help="pages to fetch per language/genre query")
+    parser.add_argument('--batch-size', type=int, default=200, help="movies per bulk insert")
+    args = parser.parse_args()
+
     with app.app_context():
         print("Starting comprehensive database population...")
+        db.create_all()  # genre tables on first run
         fetch_genre_map()
+        store_genres(GENRE_MAP)
         
         # --- DEFINE THE SCOPE OF YOUR QUIZ ---
         # Match these to the options in your HTML file
@@ -131,19 +149,23 @@ if __name__ == '__main__':
         GENRES_TO_FETCH = {'Action': 28, 'Comedy': 35, 'Drama': 18, 'Horror': 27, 'Romance': 10749}
 
         # --- SYSTEMATICALLY POPULATE THE DATABASE ---
+        queries = []
         for lang_name, lang_code in LANGUAGES_TO_FETCH.items():
             for genre_name, genre_id in GENRES_TO_FETCH.items():
                 
-                # Construct the specific API URL for this combination
-                discover_url = (
-                    f"https://api.themoviedb.org/3/discover/movie?api_key={TMDB_API_KEY}"
-                    f"&with_genres={genre_id}"
-                    f"&with_original_language={lang_code}"
-                    f"&sort_by=popularity.desc"
-                )
+                # Construct the specific API query for this combination
+                discover_params = {
+                    'with_genres': genre_id,
+                    'with_original_language': lang_code,
+                    'sort_by': 'popularity.desc',
+                }
                 
                 description = f"{lang_name} '{genre_name}' movies"
-                fetch_and_save_movies(discover_url, description)
-            
+                queries.append((description, "discover/movie", discover_params))
+
+        run_ingestion(queries, pages_per_query=args.pages,
+                      concurrency=max(1, min(args.workers, MAX_WORKERS)), batch_size=args.batch_size)
 
         print("\nDatabase population script finished!")
+        print("TMDB request stats:")
+        tmdb_client.print_stats()
@@ -0,0 +1,187 @@
+# precompute_recommendations.py
+# Nightly batch that runs the hybrid recommender for every active user ahead of time and
+# stores the top-N (with reasons and match scores) in user_recommendations. /dashboard
+# serves a user's stored row while it matches the live model version and computes on
+# demand otherwise (new users, users whose reviews or watchlist changed since the batch).
+#
+# Users are split into chunks and scored on a process pool. Each worker loads the model
+# bundle once; the content model and a ratings_store directory are memory-mapped, so the
+# workers share those pages instead of holding private copies.
+#
+#   python precompute_recommendations.py                       # users active in the last 30 days
+#   python precompute_recommendations.py --all --workers 8     # every user
+#   python precompute_recommendations.py --limit 2000          # time a sample to size the window
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from models import db, User, Review, WatchlistItem, UserRecommendation
+from hybrid_recommend import get_hybrid_recommendations
+from model_registry import DEFAULT_PATHS, load_model_bundle
+from rating_stats import movie_rating_stats
+
+DEFAULT_TOP_N = 8  # what the dashboard shows
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_ACTIVE_DAYS = 30
+
+
+def precomputed_recommendations(user_id, model_version, n):
+    """The user's stored recommendations if they were computed with model_version, else None."""
+    row = db.session.get(UserRecommendation, user_id)
+    if row is None or row.model_version != str(model_version) or row.n < n:
+        return None
+    return row.recommendations[:n]
+
+
+def discard_precomputed(user_id):
+    """Drops the user's stored row, so the dashboard recomputes after their ratings change."""
+    UserRecommendation.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+
+
+def active_user_ids(days=DEFAULT_ACTIVE_DAYS):
+    """Users with a review or watchlist change in the last `days` days; every user if days is None."""
+    if days is None:
+        return [user_id for user_id, in db.session.query(User.user_id).order_by(User.user_id)]
+    since = datetime.utcnow() - timedelta(days=days)
+    reviewers = db.session.query(Review.user_id).filter(Review.timestamp >= since)
+    watchers = db.session.query(WatchlistItem.user_id).filter(WatchlistItem.added_on >= since)
+    return sorted(user_id for user_id, in reviewers.union(watchers))
+
+
+def _upsert_statement(rows):
+    dialect = db.session.get_bind().dialect.name
+    table = UserRecommendation.__table__
+    columns = ['model_version', 'n', 'recommendations', 'computed_at']
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in columns})
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(index_elements=[table.c.user_id],
+                                          set_={col: stmt.excluded[col] for col in columns})
+    raise ValueError(f"Upsert is not supported for the '{dialect}' dialect")
+
+
+def store_recommendations(results, model_version, n, computed_at):
+    """Writes {user_id: recommendations} in one statement and commit."""
+    rows = [{'user_id': user_id, 'model_version': str(model_version), 'n': n,
+             'recommendations': recommendations, 'computed_at': computed_at}
+            for user_id, recommendations in results.items()]
+    if rows:
+        db.session.execute(_upsert_statement(rows))
+        db.session.commit()
+
+
+# --- Worker process ---
+_worker = {}
+
+
+def _init_worker(paths, rating_stats, n):
+    _worker['bundle'] = load_model_bundle(paths)
+    _worker['rating_stats'] = rating_stats
+    _worker['n'] = n
+
+
+def _recommend_chunk(user_ids):
+    """(model version, {user_id: recommendations}, failed user ids) for one chunk."""
+    bundle = _worker['bundle']
+    results, failed = {}, []
+    # get_hybrid_recommendations logs every user; keep the batch output to the progress lines.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in user_ids:
+            try:
+                results[user_id] = get_hybrid_recommendations(
+                    user_id=user_id, movies_df=bundle.movies_df, ratings=bundle.ratings,
+                    similarity_matrix=bundle.similarity_matrix, indices=bundle.indices, algo=bundle.algo,
+                    n=_worker['n'], scorer=bundle.scorer, catalogue=bundle.catalogue,
+                    rating_stats=_worker['rating_stats'])
+            except Exception:
+                # stderr is not redirected, so the job log shows who failed and why.
+                print(f"Recommendations failed for user {user_id}:\n{traceback.format_exc()}", file=sys.stderr)
+                failed.append(user_id)
+    return bundle.version, results, failed
+
+
+def precompute(user_ids, n=DEFAULT_TOP_N, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, paths=None):
+    """
+    Computes and stores recommendations for user_ids on a pool of `workers` processes.
+    Needs an app context (results are written from this process). Returns a summary dict
+    with users/sec and wall time.
+    """
+    started = time.perf_counter()
+    computed_at = datetime.utcnow()
+    rating_stats = movie_rating_stats()
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    failed = []
+    versions = set()
+    write_seconds = 0.0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(paths or DEFAULT_PATHS, rating_stats, n)) as pool:
+        futures = [pool.submit(_recommend_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            version, results, chunk_failed = future.result()
+            versions.add(version)
+            write_started = time.perf_counter()
+            store_recommendations(results, version, n, computed_at)
+            write_seconds += time.perf_counter() - write_started
+            done += len(results)
+            failed.extend(chunk_failed)
+            elapsed = time.perf_counter() - started
+            print(f"  {done + len(failed)}/{len(user_ids)} users, {done / elapsed:.1f} users/sec")
+
+    wall_seconds = time.perf_counter() - started
+    if len(versions) > 1:
+        print(f"Warning: the model changed during the batch ({sorted(versions)}); "
+              f"rows for older versions will be ignored by the dashboard.")
+    if failed:
+        print(f"{len(failed)} users failed (tracebacks above): {sorted(failed)[:50]}", file=sys.stderr)
+    return {
+        'users': done,
+        'failed': len(failed),
+        'failed_user_ids': sorted(failed),
+        'workers': workers,
+        'wall_seconds': round(wall_seconds, 2),
+        'write_seconds': round(write_seconds, 2),
+        'users_per_second': round(done / wall_seconds, 1) if wall_seconds else None,
+        'model_versions': sorted(versions),
+    }
+
+
+if __name__ == '__main__':
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Precompute hybrid recommendations for active users.")
+    parser.add_argument('--all', action='store_true', help="every user, not only recently active ones")
+    parser.add_argument('--active-days', type=int, default=DEFAULT_ACTIVE_DAYS,
+                        help="users with a review or watchlist change in this many days")
+    parser.add_argument('--limit', type=int, default=None, help="only the first N users (for timing runs)")
+    parser.add_argument('--top-n', type=int, default=DEFAULT_TOP_N, help="recommendations stored per user")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="users per task")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()  # user_recommendations on first run
+        user_ids = active_user_ids(None if args.all else args.active_days)
+        if args.limit:
+            user_ids = user_ids[:args.limit]
+        print(f"Precomputing top {args.top_n} recommendations for {len(user_ids)} users...")
+        summary = precompute(user_ids, n=args.top_n, workers=args.workers, chunk_size=args.chunk_size)
+
+    print(f"Done: {summary['users']} users ({summary['failed']} failed) in {summary['wall_seconds']}s wall time "
+          f"on {summary['workers']} workers; {summary['users_per_second']} users/sec, "
+          f"{summary['write_seconds']}s writing results.")
@@ -0,0 +1,240 @@
+# profile_startup.py
+# Measures where app.py's cold start goes: wall time and peak RSS after every heavy import,
+# the import of app itself, each warm-up phase (database, models, genres, languages) and
+# the first request. Only the standard library is imported before measuring starts, so run
+# it in a fresh interpreter.
+#
+#   python profile_startup.py                                   # against the real setup
+#   python profile_startup.py make-fixtures ci_fixtures         # tiny models + TMDB payloads
+#   python profile_startup.py --fixtures ci_fixtures --budget startup_budget.json
+#   python profile_startup.py --fixtures ci_fixtures --write-budget startup_budget.json
+#
+# With --fixtures the models are loaded from the fixture directory, TMDB calls are answered
+# from its JSON files (nothing reaches the network), the database is in-memory SQLite and
+# genre/language snapshots go to a temp directory. With --budget the run exits with status 1
+# if any phase, the total or the peak RSS exceeds its budget, so CI catches regressions.
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from startup import peak_rss_mb
+
+# Imported one by one before app, in this order, so each line is that library's own cost.
+HEAVY_IMPORTS = [
+    'numpy', 'pandas', 'scipy.sparse', 'sklearn.metrics.pairwise', 'sklearn.feature_extraction.text',
+    'surprise', 'requests', 'sqlalchemy', 'flask', 'flask_sqlalchemy', 'tmdbv3api',
+]
+
+FIXTURE_ENDPOINTS = {
+    'genre/movie/list': {'genres': [{'id': 28, 'name': 'Action'}, {'id': 35, 'name': 'Comedy'},
+                                    {'id': 18, 'name': 'Drama'}, {'id': 27, 'name': 'Horror'}]},
+    'configuration/languages': [{'iso_639_1': 'en', 'english_name': 'English'},
+                                {'iso_639_1': 'hi', 'english_name': 'Hindi'},
+                                {'iso_639_1': 'fr', 'english_name': 'French'}],
+}
+
+
+def _fixture_file(fixtures, endpoint_path):
+    return os.path.join(fixtures, 'tmdb', endpoint_path.strip('/').replace('/', '_') + '.json')
+
+
+def make_fixtures(path, n_movies=500, n_users=50, top_k=20, seed=0):
+    """Writes a small, deterministic content model, SVD model, ratings.csv and TMDB payloads to path."""
+    import pickle
+    import numpy as np
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from surprise import Dataset, Reader, SVD
+    from model_artifacts import save_content_model
+    from retrain_pipeline import prepare_movies
+    from similarity_index import build_topk_similarity
+
+    rng = np.random.RandomState(seed)
+    words = [f"word{i}" for i in range(300)]
+    genres = [g['name'] for g in FIXTURE_ENDPOINTS['genre/movie/list']['genres']]
+    movies = pd.DataFrame({
+        'id': np.arange(1, n_movies + 1),
+        'title': [f"Fixture Movie {i}" for i in range(1, n_movies + 1)],
+        'overview': [' '.join(rng.choice(words, 30)) for _ in range(n_movies)],
+        'genres': [', '.join(rng.choice(genres, 2, replace=False)) for _ in range(n_movies)],
+        'language': rng.choice(['en', 'hi', 'fr'], n_movies),
+    })
+    movies = prepare_movies(movies)
+    tfidf_matrix = TfidfVectorizer(stop_words='english').fit_transform(movies['soup'])
+    os.makedirs(path, exist_ok=True)
+    save_content_model(os.path.join(path, 'movie_model'), movies,
+                       build_topk_similarity(tfidf_matrix, k=top_k))
+
+    ratings = pd.DataFrame({
+        'user_id': rng.randint(1, n_users + 1, n_users * 20),
+        'movie_id': rng.randint(1, n_movies + 1, n_users * 20),
+        'rating': rng.randint(1, 6, n_users * 20),
+    }).drop_duplicates(['user_id', 'movie_id'])
+    ratings.to_csv(os.path.join(path, 'ratings.csv'), index=False)
+    algo = SVD(random_state=seed)
+    algo.fit(Dataset.load_from_df(ratings, Reader(rating_scale=(1, 5))).build_full_trainset())
+    with open(os.path.join(path, 'collaborative_model.pkl'), 'wb') as f:
+        pickle.dump(algo, f)
+
+    for endpoint_path, payload in FIXTURE_ENDPOINTS.items():
+        os.makedirs(os.path.dirname(_fixture_file(path, endpoint_path)), exist_ok=True)
+        with open(_fixture_file(path, endpoint_path), 'w') as f:
+            json.dump(payload, f)
+
+
+def use_fixtures(fixtures):
+    """Points config at fixtures before anything reads it. Must run before app is imported."""
+    os.environ['DATABASE_URL'] = 'sqlite://'
+    os.environ['REFERENCE_SNAPSHOT_DIR'] = tempfile.mkdtemp(prefix='flicksy-snapshots-')
+    # Anything that bypasses the stub below fails fast instead of reaching TMDB.
+    os.environ['TMDB_BASE_URL'] = 'http://127.0.0.1:9'
+
+
+def stub_tmdb(fixtures):
+    """Answers tmdb_client.get from the fixture JSON files (None when there is no file)."""
+    from tmdb_client import tmdb_client
+
+    def get(endpoint_path, params=None, timeout=None, use_cache=True):
+        try:
+            with open(_fixture_file(fixtures, endpoint_path)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    tmdb_client.get = get
+
+
+class StartupProfile:
+    """Collects (phase, seconds, peak RSS) rows in the order they ran."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    def measure(self, name, func):
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            func()
+        except ImportError:
+            status = 'missing'
+        seconds = time.perf_counter() - started
+        self.phases.append({'phase': name, 'seconds': round(seconds, 3), 'peak_rss_mb': peak_rss_mb(),
+                            'status': status})
+
+    def add(self, name, state):
+        self.phases.append({'phase': name, 'seconds': state['seconds'], 'peak_rss_mb': state['peak_rss_mb'],
+                            'status': 'ok' if state['state'] == 'ready' else state['state']})
+
+    def report(self):
+        return {
+            'total_seconds': round(time.perf_counter() - self.started, 3),
+            'peak_rss_mb': peak_rss_mb(),
+            'phases': self.phases,
+        }
+
+
+def profile(fixtures=None):
+    startup_profile = StartupProfile()
+    if fixtures:
+        use_fixtures(fixtures)
+
+    for module in HEAVY_IMPORTS:
+        startup_profile.measure(f"import {module}", lambda: importlib.import_module(module))
+    if fixtures:
+        stub_tmdb(fixtures)
+
+    startup_profile.measure('import app', lambda: importlib.import_module('app'))
+    app_module = sys.modules['app']
+    if fixtures:
+        app_module.model_registry.paths = {
+            'content': os.path.join(fixtures, 'movie_model'),
+            'collaborative': os.path.join(fixtures, 'collaborative_model.pkl'),
+            'ratings': os.path.join(fixtures, 'ratings.csv'),
+        }
+
+    for name, state in app_module.startup.run_in_foreground().items():
+        startup_profile.add(f"warm-up {name}", state)
+
+    client = app_module.app.test_client()
+    startup_profile.measure('first request (/ready)', lambda: client.get('/ready'))
+
+    report = startup_profile.report()
+    report['app_module_seconds'] = app_module.startup.import_seconds
+    report['import_to_first_response_seconds'] = app_module.startup.first_response_seconds
+    return report
+
+
+def print_report(report):
+    print(f"{'phase':<40} {'seconds':>9} {'peak RSS MB':>12}  status")
+    for phase in report['phases']:
+        seconds = '-' if phase['seconds'] is None else f"{phase['seconds']:.3f}"
+        rss = '-' if phase['peak_rss_mb'] is None else f"{phase['peak_rss_mb']:.1f}"
+        print(f"{phase['phase']:<40} {seconds:>9} {rss:>12}  {phase['status']}")
+    print(f"{'total':<40} {report['total_seconds']:>9.3f} {report['peak_rss_mb'] or 0:>12.1f}")
+    print(f"app.py module body: {report['app_module_seconds']}s, "
+          f"import to first response: {report['import_to_first_response_seconds']}s")
+
+
+def check_budget(report, budget):
+    """Returns a list of human-readable budget violations (empty if within budget)."""
+    violations = []
+    for phase in report['phases']:
+        limit = budget.get('phases', {}).get(phase['phase'])
+        if phase['status'] not in ('ok', 'missing'):
+            violations.append(f"{phase['phase']}: {phase['status']}")
+        elif limit is not None and phase['seconds'] is not None and phase['seconds'] > limit:
+            violations.append(f"{phase['phase']}: {phase['seconds']:.3f}s > budget {limit}s")
+    for key, unit in (('total_seconds', 's'), ('peak_rss_mb', ' MB')):
+        limit = budget.get(key)
+        if limit is not None and report[key] is not None and report[key] > limit:
+            violations.append(f"{key}: {report[key]}{unit} > budget {limit}{unit}")
+    return violations
+
+
+def budget_from(report, headroom):
+    """A budget that allows every measured number to grow by the `headroom` factor."""
+    return {
+        'phases': {p['phase']: round(max(p['seconds'] or 0, 0.05) * headroom, 2)
+                   for p in report['phases'] if p['status'] == 'ok'},
+        'total_seconds': round(report['total_seconds'] * headroom, 2),
+        'peak_rss_mb': round((report['peak_rss_mb'] or 0) * headroom, 1),
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'make-fixtures':
+        target = sys.argv[2] if len(sys.argv) > 2 else 'startup_fixtures'
+        make_fixtures(target)
+        print(f"Startup fixtures written to {target}/")
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Profile app.py's cold start phase by phase.")
+    parser.add_argument('--fixtures', help="directory from `make-fixtures`; stubs TMDB and uses fixture models")
+    parser.add_argument('--json', help="also write the report to this file")
+    parser.add_argument('--budget', help="JSON budget file; exit 1 if any number exceeds it")
+    parser.add_argument('--write-budget', help="write a budget from this run (with --headroom) to this file")
+    parser.add_argument('--headroom', type=float, default=1.5, help="growth allowed by --write-budget")
+    args = parser.parse_args()
+
+    report = profile(args.fixtures)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.write_budget:
+        with open(args.write_budget, 'w') as f:
+            json.dump(budget_from(report, args.headroom), f, indent=2)
+        print(f"Budget written to {args.write_budget}")
+    if args.budget:
+        with open(args.budget) as f:
+            violations = check_budget(report, json.load(f))
+        if violations:
+            print("Startup budget exceeded:")
+            for violation in violations:
+                print(f"  {violation}")
+            sys.exit(1)
+        print("Startup within budget.")
@@ -0,0 +1,120 @@
+# rating_stats.py
+# Per-title aggregates of Flicksy reviews (count, sum, mean, 1-5 star histogram) in
+# title_rating_stats, keyed by ('movie' | 'tv', tmdb id).
+#
+#   python rating_stats.py --rebuild     # recompute every row from the reviews table
+import argparse
+from datetime import datetime
+from sqlalchemy import case, func, literal, select
+from models import db, Movie, Review, TitleRatingStats
+
+HISTOGRAM_COLUMNS = [f'rating_{stars}' for stars in range(1, 6)]
+COUNTER_COLUMNS = ['review_count', 'rating_count', 'rating_sum'] + HISTOGRAM_COLUMNS
+
+
+def _increment_statement(row):
+    """INSERT of row that adds its counters to the existing ones when the title already has stats."""
+    dialect = db.session.get_bind().dialect.name
+    table = TitleRatingStats.__table__
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(row)
+        updates = {col: table.c[col] + stmt.inserted[col] for col in COUNTER_COLUMNS}
+        updates['updated_at'] = stmt.inserted['updated_at']
+        return stmt.on_duplicate_key_update(updates)
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(row)
+        updates = {col: table.c[col] + stmt.excluded[col] for col in COUNTER_COLUMNS}
+        updates['updated_at'] = stmt.excluded['updated_at']
+        return stmt.on_conflict_do_update(index_elements=[table.c.media_type, table.c.tmdb_id], set_=updates)
+    raise ValueError(f"Rating stats are not supported for the '{dialect}' dialect")
+
+
+def record_review(media_type, tmdb_id, rating):
+    """
+    Adds one review to the title's stats. The increment happens in the database, in one
+    statement, so concurrent posts never lose an update; call it before committing the
+    review so both land in the same transaction.
+    """
+    rating = int(rating) if rating else None
+    row = {col: 0 for col in COUNTER_COLUMNS}
+    row.update(media_type=media_type, tmdb_id=tmdb_id, review_count=1, updated_at=datetime.utcnow())
+    if rating is not None:
+        row['rating_count'] = 1
+        row['rating_sum'] = rating
+        if 1 <= rating <= 5:
+            row[f'rating_{rating}'] = 1
+    db.session.execute(_increment_statement(row))
+
+
+def get_rating_stats(media_type, tmdb_id):
+    """Stats dict (see TitleRatingStats.to_dict) or None if the title has no Flicksy reviews."""
+    stats = db.session.get(TitleRatingStats, (media_type, tmdb_id))
+    return stats.to_dict() if stats is not None else None
+
+
+def movie_rating_stats(tmdb_ids=None):
+    """
+    {tmdb id: (rating_count, rating_sum)} of rated movies, for the recommender. With tmdb_ids
+    only those movies are read (primary-key lookups); without, the whole table (batch jobs).
+    """
+    query = db.session.query(TitleRatingStats.tmdb_id, TitleRatingStats.rating_count, TitleRatingStats.rating_sum) \
+        .filter(TitleRatingStats.media_type == 'movie', TitleRatingStats.rating_count > 0)
+    if tmdb_ids is not None:
+        tmdb_ids = [int(tmdb_id) for tmdb_id in tmdb_ids]
+        if not tmdb_ids:
+            return {}
+        query = query.filter(TitleRatingStats.tmdb_id.in_(tmdb_ids))
+    rows = query.all()
+    return {tmdb_id: (count, total) for tmdb_id, count, total in rows}
+
+
+def _aggregate(media_type, tmdb_id_column):
+    """SELECT of title_rating_stats columns over reviews; the caller adds FROM/WHERE/GROUP BY."""
+    rated = Review.rating.isnot(None)
+    return select(
+        literal(media_type).label('media_type'),
+        tmdb_id_column.label('tmdb_id'),
+        func.count(Review.id).label('review_count'),
+        func.sum(case((rated, 1), else_=0)).label('rating_count'),
+        func.coalesce(func.sum(Review.rating), 0).label('rating_sum'),
+        *[func.sum(case((Review.rating == stars, 1), else_=0)).label(f'rating_{stars}') for stars in range(1, 6)],
+        literal(datetime.utcnow()).label('updated_at'),
+    )
+
+
+def rebuild_rating_stats():
+    """Recomputes every title's stats from the reviews table in one transaction. Returns the row count."""
+    table = TitleRatingStats.__table__
+    columns = ['media_type', 'tmdb_id'] + COUNTER_COLUMNS + ['updated_at']
+    movie_reviews = _aggregate('movie', Movie.tmdb_id).select_from(Review) \
+        .join(Movie, Review.movie_id == Movie.id).group_by(Movie.tmdb_id)
+    tv_reviews = _aggregate('tv', Review.tv_id).where(Review.tv_id.isnot(None)).group_by(Review.tv_id)
+    try:
+        db.session.execute(table.delete())
+        db.session.execute(table.insert().from_select(columns, movie_reviews))
+        db.session.execute(table.insert().from_select(columns, tv_reviews))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return db.session.query(func.count()).select_from(table).scalar()
+
+
+if __name__ == '__main__':
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Maintain the per-title Flicksy rating aggregates.")
+    parser.add_argument('--rebuild', action='store_true', help="recompute all stats from the reviews table")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()  # title_rating_stats on first run
+        if args.rebuild:
+            print(f"Rebuilt rating stats for {rebuild_rating_stats()} titles.")
+        else:
+            parser.print_help()
@@ -0,0 +1,223 @@
+# ratings_store.py
+# Compact user -> ratings store for the recommender, in CSR layout:
+#
+#   offsets[user_id] : offsets[user_id + 1]   slice of `items` / `ratings` for that user
+#   items                                     int32 TMDB movie ids, in the order they were rated
+#   ratings                                   int8 ratings
+#
+# offsets is indexed by the user id itself (ids are small autoincrement integers), so a
+# user's history is two array reads and a slice, with no scan over everyone's ratings.
+# Saved as a directory of .npy files plus manifest.json and opened with mmap_mode='r', so
+# every worker shares the same pages. As with model_artifacts, file names carry their
+# checksum and manifest.json is swapped last, so a rebuild never overwrites a file another
+# worker has mapped. Ratings posted while the app runs are appended to a
+# small per-user overlay on top of the read-only arrays. The overlay belongs to the worker
+# that handled the post; on a model reload the registry copies it onto the new store
+# (adopt_appended), so it is lost only when the worker restarts. Other workers see a rating
+# once export_ratings.py has exported it and the store has been rebuilt from that export.
+#
+#   python ratings_store.py build ratings.csv ratings_store      # from the CSV export
+#   python ratings_store.py build ratings_npy ratings_store      # from export_ratings.py --npy
+import argparse
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from model_artifacts import commit_manifest, write_array
+
+FORMAT_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+ARRAYS = ('offsets', 'items', 'ratings')
+CSV_CHUNK_SIZE = 1000000
+
+
+def is_store_dir(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+class RatingsStore:
+    """
+    Every user's ratings as three flat arrays (see the module comment). The arrays are never
+    modified; append() adds to an in-memory overlay and compacted()/save() fold it in.
+    """
+
+    def __init__(self, offsets, items, ratings):
+        self.offsets = offsets
+        self.items = items
+        self.ratings = ratings
+        self._appended = {}
+        self._append_lock = threading.Lock()
+
+    @classmethod
+    def from_columns(cls, user_ids, movie_ids, ratings):
+        """Groups parallel user/movie/rating arrays by user, keeping each user's ratings in input order."""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        if len(user_ids) and user_ids.min() < 0:
+            raise ValueError("user ids must be non-negative")
+        order = np.argsort(user_ids, kind='stable')
+        counts = np.bincount(user_ids, minlength=1)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(offsets,
+                   np.asarray(movie_ids, dtype=np.int32)[order],
+                   np.asarray(ratings, dtype=np.int8)[order])
+
+    @classmethod
+    def from_dataframe(cls, ratings_df):
+        return cls.from_columns(ratings_df['user_id'].to_numpy(), ratings_df['movie_id'].to_numpy(),
+                                ratings_df['rating'].to_numpy())
+
+    @classmethod
+    def from_csv(cls, path, chunk_size=CSV_CHUNK_SIZE):
+        """Reads ratings.csv in chunks straight into compact columns, never holding the whole DataFrame."""
+        columns = {'user_id': [], 'movie_id': [], 'rating': []}
+        dtypes = {'user_id': np.int64, 'movie_id': np.int32, 'rating': np.int8}
+        for chunk in pd.read_csv(path, usecols=list(columns), dtype=dtypes, chunksize=chunk_size):
+            for name in columns:
+                columns[name].append(chunk[name].to_numpy())
+        return cls.from_columns(*(np.concatenate(columns[name]) if columns[name] else np.empty(0, dtype=dtypes[name])
+                                  for name in ('user_id', 'movie_id', 'rating')))
+
+    @classmethod
+    def from_export(cls, directory):
+        """Builds from the int32/int8 column files written by export_ratings.py --npy."""
+        arrays = load_export_arrays(directory)
+        return cls.from_columns(arrays['user_id'], arrays['movie_id'], arrays['rating'])
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Opens a saved store; with mmap=True the arrays stay on disk and are paged in on demand."""
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported ratings store format {manifest.get('format')} in {path}")
+        arrays = [np.load(os.path.join(path, manifest['arrays'][name]['file']), mmap_mode='r' if mmap else None,
+                          allow_pickle=False) for name in ARRAYS]
+        return cls(*arrays)
+
+    def save(self, path):
+        """
+        Writes the arrays (including appended ratings) as new checksum-named files, then swaps
+        manifest.json. The swap is the only commit point: a reader sees either the previous
+        store or the complete new one, and files two saves old are removed only after it.
+        """
+        store = self.compacted()
+        os.makedirs(path, exist_ok=True)
+        arrays = {name: write_array(path, name, getattr(store, name)) for name in ARRAYS}
+        commit_manifest(path, {'format': FORMAT_VERSION, 'users': store.num_users, 'ratings': len(store),
+                               'arrays': arrays})
+
+    def __len__(self):
+        with self._append_lock:
+            appended = sum(len(items) for items, _ in self._appended.values())
+        return len(self.items) + appended
+
+    @property
+    def num_users(self):
+        """Size of the user id range (highest user id + 1), including ids without ratings."""
+        with self._append_lock:
+            highest = max(self._appended, default=-1)
+        return max(len(self.offsets) - 1, highest + 1)
+
+    def user_ratings(self, user_id):
+        """(int32 movie ids, int8 ratings) the user has rated, oldest first; empty arrays for unknown users."""
+        user_id = int(user_id)
+        if 0 <= user_id < len(self.offsets) - 1:
+            start, end = self.offsets[user_id], self.offsets[user_id + 1]
+            items, ratings = self.items[start:end], self.ratings[start:end]
+        else:
+            items, ratings = self.items[:0], self.ratings[:0]
+        appended = self._appended.get(user_id)
+        if appended:
+            with self._append_lock:
+                extra_items, extra_ratings = list(appended[0]), list(appended[1])
+            items = np.concatenate([items, np.array(extra_items, dtype=np.int32)])
+            ratings = np.concatenate([ratings, np.array(extra_ratings, dtype=np.int8)])
+        return items, ratings
+
+    def append(self, user_id, movie_id, rating):
+        """Adds one newly posted rating. It is visible to user_ratings() at once, in this process only."""
+        with self._append_lock:
+            items, ratings = self._appended.setdefault(int(user_id), ([], []))
+            items.append(int(movie_id))
+            ratings.append(int(rating))
+
+    def adopt_appended(self, previous):
+        """
+        Copies `previous`'s appended ratings onto this store, skipping ones its arrays or
+        overlay already hold (e.g. because the new store was built from a later export).
+        """
+        with previous._append_lock:
+            appended = {user_id: (list(items), list(ratings)) for user_id, (items, ratings) in previous._appended.items()}
+        for user_id, (items, ratings) in appended.items():
+            known = set(self.user_ratings(user_id)[0].tolist())
+            for movie_id, rating in zip(items, ratings):
+                if movie_id not in known:
+                    self.append(user_id, movie_id, rating)
+                    known.add(movie_id)
+
+    def first_user(self):
+        """Lowest user id with any ratings, or None if the store is empty."""
+        users = np.flatnonzero(np.diff(self.offsets))
+        if len(users):
+            return int(users[0])
+        with self._append_lock:
+            return min(self._appended, default=None)
+
+    def compacted(self):
+        """A new store with appended ratings merged into the arrays."""
+        with self._append_lock:
+            appended = {user_id: (list(items), list(ratings)) for user_id, (items, ratings) in self._appended.items()}
+        if not appended:
+            return self
+        users = np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int64), np.diff(self.offsets))
+        extra_users = np.concatenate([np.full(len(items), user_id, dtype=np.int64)
+                                      for user_id, (items, _) in appended.items()])
+        extra_items = np.concatenate([np.array(items, dtype=np.int32) for items, _ in appended.values()])
+        extra_ratings = np.concatenate([np.array(ratings, dtype=np.int8) for _, ratings in appended.values()])
+        return RatingsStore.from_columns(np.concatenate([users, extra_users]),
+                                         np.concatenate([self.items, extra_items]),
+                                         np.concatenate([self.ratings, extra_ratings]))
+
+
+def load_export_manifest(directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_export_arrays(directory):
+    """{'user_id', 'movie_id', 'rating'} read-only memory-mapped arrays from an export_ratings.py --npy directory."""
+    manifest = load_export_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"{directory} has no ratings manifest")
+    rows = manifest['rows']
+    return {name: np.memmap(os.path.join(directory, spec['file']), dtype=np.dtype(spec['dtype']), mode='r',
+                            shape=(rows,)) if rows else np.empty(0, dtype=np.dtype(spec['dtype']))
+            for name, spec in manifest['columns'].items()}
+
+
+def load_ratings_store(path):
+    """A saved store directory is memory-mapped; a ratings CSV is read and converted once."""
+    if is_store_dir(path):
+        return RatingsStore.load(path)
+    return RatingsStore.from_csv(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the memory-mappable ratings store for the recommender.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="build a store from ratings.csv or an export_ratings.py --npy directory")
+    build.add_argument('source')
+    build.add_argument('destination')
+    args = parser.parse_args()
+
+    if os.path.isdir(args.source):
+        store = RatingsStore.from_export(args.source)
+    else:
+        store = RatingsStore.from_csv(args.source)
+    store.save(args.destination)
+    print(f"Wrote {len(store)} ratings for {store.num_users} user ids to {args.destination}.")
@@ -1,30 +1,124 @@
 from difflib import get_close_matches
+import numpy as np
+from similarity_index import TopKSimilarity
 
-def get_recommendations(title, cosine_sim, df, indices, top_n=5):
+
+def _exclusion_mask(size, exclude=None):
+    """Turns an optional boolean mask or array of positions into a boolean mask of length size."""
+    mask = np.zeros(size, dtype=bool)
+    if exclude is not None:
+        exclude = np.asarray(exclude)
+        if exclude.dtype == bool:
+            mask |= exclude
+        else:
+            mask[exclude.astype(np.int64)] = True
+    return mask
+
+
+def top_n_indices(scores, n, exclude=None):
     """
-    Finds movies similar to a given title using cosine similarity.
-    Returns a tuple of (matched_title, recommendations_list).
+    Returns the positions of the n highest scores, best first.
+    Uses argpartition instead of sorting the whole row, and sorts only the n it selects:
+    equal scores are ordered by position. Which of several entries tied with the n-th
+    score make the cut is left to argpartition, so a row of mostly equal scores (e.g.
+    zeros) still costs O(len + n log n).
+    `exclude` is an optional boolean mask or array of positions that must not be returned.
     """
-    # Get a list of all movie titles from the indices Series
+    scores = np.asarray(scores, dtype=np.float64)
+    if exclude is not None:
+        mask = _exclusion_mask(len(scores), exclude)
+        scores = np.where(mask, -np.inf, scores)
+        n = min(n, int(len(scores) - mask.sum()))
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    candidates = np.argpartition(-scores, n - 1)[:n]
+    # Score descending, then position, within the partitioned slice only.
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def _match_title(title, indices, title_index=None):
+    """Returns (matched_title, row_position) for the closest known title, or (None, None)."""
+    if title_index is not None:
+        return title_index.resolve(title)
+
+    # Without a prebuilt TitleIndex, fall back to scanning every title.
     all_titles = indices.index.tolist()
+    matches = get_close_matches(title, all_titles, n=1, cutoff=0.6)
+    if not matches:
+        return None, None
+
+    idx = indices[matches[0]]
+    # Duplicate titles map to several rows; use the first one.
+    if hasattr(idx, 'iloc'):
+        idx = idx.iloc[0]
+    return matches[0], int(idx)
+
 
+def _titles_at(df, rows, catalogue=None):
+    if catalogue is not None:
+        return catalogue.titles[rows].tolist()
+    return df['title'].iloc[rows].tolist()
+
+
+def get_recommendations(title, cosine_sim, df, indices, top_n=5, exclude=None, title_index=None, catalogue=None):
+    """
+    Finds movies similar to a given title using cosine similarity.
+    Returns a tuple of (matched_title, recommendations_list).
+    `exclude` optionally masks out rows (e.g. already watched movies).
+    `title_index` is the TitleIndex saved with the model, used for fast fuzzy lookup.
+    `catalogue` is an optional CatalogueIndex used for row -> title lookups.
+    """
     # Find the best match for the user's input title
-    matches = get_close_matches(title, all_titles, n=1, cutoff=0.6)
+    matched_title, idx = _match_title(title, indices, title_index)
 
     # If no match is found, return an error message and an empty list
-    if not matches:
+    if matched_title is None:
         return "Movie not found in our database.", []
 
-    matched_title = matches[0]
-    idx = indices[matched_title]
+    movie_indices = similar_indices(idx, cosine_sim, top_n=top_n, exclude=exclude)
 
-    # Get similarity scores for the matched movie
-    sim_scores = list(enumerate(cosine_sim[idx]))
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+    # Return the title that was matched and the list of recommended movie titles
+    return matched_title, _titles_at(df, movie_indices, catalogue)
 
-    # Get the scores of the top_n most similar movies, excluding the movie itself (index 1)
-    sim_scores = sim_scores[1:top_n+1]
-    movie_indices = [i[0] for i in sim_scores]
 
-    # Return the title that was matched and the list of recommended movie titles
-    return matched_title, df['title'].iloc[movie_indices].tolist()
\ No newline at end of file
+def similar_indices(idx, cosine_sim, top_n=5, exclude=None):
+    """
+    Returns the row positions of the top_n movies most similar to row idx,
+    never including idx itself.
+    """
+    mask = _exclusion_mask(cosine_sim.shape[0], exclude)
+    mask[idx] = True
+
+    if isinstance(cosine_sim, TopKSimilarity):
+        # The neighbour list is already sorted, so just drop the excluded entries.
+        neighbors, _ = cosine_sim.top_neighbors(idx)
+        return neighbors[~mask[neighbors]][:top_n]
+
+    return top_n_indices(cosine_sim[idx], top_n, exclude=mask)
+
+
+def get_multi_seed_recommendations(seed_indices, cosine_sim, df, top_n=5, weights=None, exclude=None, catalogue=None):
+    """
+    Scores several seed movies in one matrix operation: the similarity rows of all
+    seeds are combined (weighted mean) and the top_n movies are picked from the result.
+    Seeds themselves are never recommended.
+    Returns a tuple of (titles_list, scores_array).
+    """
+    seed_indices = np.asarray(seed_indices, dtype=np.int64)
+    if len(seed_indices) == 0:
+        return [], np.empty(0)
+
+    rows = np.asarray(cosine_sim[seed_indices], dtype=np.float64)
+    if weights is None:
+        scores = rows.mean(axis=0)
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+        scores = weights @ rows / weights.sum()
+
+    mask = _exclusion_mask(len(scores), exclude)
+    mask[seed_indices] = True
+
+    top = top_n_indices(scores, top_n, exclude=mask)
+    return _titles_at(df, top, catalogue), scores[top]
@@ -0,0 +1,224 @@
+# recommendation_cache.py
+# Each backend keeps a per-user generation that invalidation bumps. get_or_compute reads it
+# before computing and the write is dropped if it changed meanwhile, so a result computed
+# from data older than the invalidation is never cached after it.
+import itertools
+import json
+import sqlite3
+from contextlib import closing, contextmanager
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """
+    In-process LRU store for single-process deployments. Each worker process has its own
+    copy and invalidations only reach the worker that handled the request, so use
+    SQLiteBackend when the app runs several workers.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._keys_by_user = {}
+        self._counter = itertools.count(1)
+        self._generations = {}  # user_id -> generation set by their last invalidation
+        self._base_generation = 0  # generation of users not invalidated since the last clear()
+        self._lock = threading.Lock()
+
+    def generation(self, user_id):
+        with self._lock:
+            return self._generations.get(user_id, self._base_generation)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[0], self._base_generation):
+                return
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            self._generations[user_id] = next(self._counter)
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._base_generation = next(self._counter)
+            self._generations.clear()
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        user_keys = self._keys_by_user.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[key[0]]
+
+
+class SQLiteBackend:
+    """
+    Local-file store shared by every worker on the same machine.
+    Values are stored as JSON; least recently used rows are evicted past max_entries.
+    """
+
+    ALL_USERS = -1
+    _GENERATION = ("(SELECT COALESCE(MAX(generation), 0) FROM recommendation_cache_generations WHERE user_id = ?)"
+                   " || ':' || "
+                   "(SELECT COALESCE(MAX(generation), 0) FROM recommendation_cache_generations WHERE user_id = ?)")
+
+    def __init__(self, path='recommendation_cache.sqlite3', max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS recommendation_cache ("
+                " user_id INTEGER NOT NULL, model_version TEXT NOT NULL, n INTEGER NOT NULL,"
+                " payload TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL,"
+                " PRIMARY KEY (user_id, model_version, n))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_recommendation_cache_last_used"
+                         " ON recommendation_cache (last_used)")
+            # user_id ALL_USERS holds the generation clear() bumps.
+            conn.execute("CREATE TABLE IF NOT EXISTS recommendation_cache_generations ("
+                         " user_id INTEGER PRIMARY KEY, generation INTEGER NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        """One transaction on a fresh connection, which is closed afterwards (sqlite3's own
+        context manager only commits or rolls back)."""
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM recommendation_cache"
+                " WHERE user_id = ? AND model_version = ? AND n = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM recommendation_cache"
+                             " WHERE user_id = ? AND model_version = ? AND n = ?", key)
+                return None
+            conn.execute("UPDATE recommendation_cache SET last_used = ?"
+                         " WHERE user_id = ? AND model_version = ? AND n = ?", (now, *key))
+        return json.loads(row[0])
+
+    def generation(self, user_id):
+        with self._connect() as conn:
+            return conn.execute(f"SELECT {self._GENERATION}", (self.ALL_USERS, user_id)).fetchone()[0]
+
+    def set(self, key, value, expires_at, generation=None):
+        row = (*key, json.dumps(value), expires_at, time.time())
+        with self._connect() as conn:
+            if generation is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO recommendation_cache"
+                    " (user_id, model_version, n, payload, expires_at, last_used) VALUES (?, ?, ?, ?, ?, ?)", row
+                )
+            else:
+                # Checked in the same statement, so an invalidation cannot slip in between.
+                conn.execute(
+                    "INSERT OR REPLACE INTO recommendation_cache"
+                    " (user_id, model_version, n, payload, expires_at, last_used)"
+                    f" SELECT ?, ?, ?, ?, ?, ? WHERE {self._GENERATION} = ?",
+                    (*row, self.ALL_USERS, key[0], generation)
+                )
+            conn.execute(
+                "DELETE FROM recommendation_cache WHERE rowid IN ("
+                " SELECT rowid FROM recommendation_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def _bump_generation(self, conn, user_id):
+        conn.execute("INSERT INTO recommendation_cache_generations (user_id, generation) VALUES (?, 1)"
+                     " ON CONFLICT (user_id) DO UPDATE SET generation = generation + 1", (user_id,))
+
+    def delete_user(self, user_id):
+        with self._connect() as conn:
+            self._bump_generation(conn, user_id)
+            conn.execute("DELETE FROM recommendation_cache WHERE user_id = ?", (user_id,))
+
+    def clear(self):
+        with self._connect() as conn:
+            self._bump_generation(conn, self.ALL_USERS)
+            conn.execute("DELETE FROM recommendation_cache")
+
+
+class RecommendationCache:
+    """
+    Per-user cache of hybrid recommendation results keyed by (user_id, model_version, n).
+    Entries expire after ttl_seconds, and invalidate_user() drops everything cached for a
+    user when their reviews or watchlist change. A new model version never sees old entries.
+    A result computed while the user was being invalidated is returned but not cached.
+    """
+
+    def __init__(self, backend=None, ttl_seconds=6 * 60 * 60):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, user_id, model_version, n):
+        return self.backend.get((user_id, str(model_version), n))
+
+    def generation(self, user_id):
+        """Opaque token that changes whenever the user's entries are invalidated."""
+        return self.backend.generation(user_id)
+
+    def set(self, user_id, model_version, n, recommendations, generation=None):
+        """Caches recommendations; with `generation`, only if the user was not invalidated since it was read."""
+        self.backend.set((user_id, str(model_version), n), recommendations, time.time() + self.ttl_seconds,
+                         generation=generation)
+
+    def get_or_compute(self, user_id, model_version, n, compute):
+        """
+        Returns the cached result, or calls compute() and caches what it returns, unless the
+        user was invalidated while it ran.
+        """
+        generation = self.generation(user_id)
+        cached = self.get(user_id, model_version, n)
+        if cached is not None:
+            return cached
+        recommendations = compute()
+        self.set(user_id, model_version, n, recommendations, generation=generation)
+        return recommendations
+
+    def invalidate_user(self, user_id):
+        self.backend.delete_user(user_id)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def create_recommendation_cache(backend='memory', path='recommendation_cache.sqlite3', ttl_seconds=6 * 60 * 60,
+                                max_entries=10000):
+    """Builds a RecommendationCache with the named backend ('memory' or 'sqlite')."""
+    if backend == 'sqlite':
+        return RecommendationCache(SQLiteBackend(path, max_entries=max_entries), ttl_seconds=ttl_seconds)
+    if backend == 'memory':
+        return RecommendationCache(MemoryBackend(max_entries=max_entries), ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown recommendation cache backend: {backend}")
@@ -0,0 +1,96 @@
+# reference_maps.py
+import json
+import os
+import threading
+import time
+from tmdb_client import tmdb_client
+
+
+class ReferenceMap:
+    """
+    A small TMDB lookup table (genre ids, language names) that never blocks a request on
+    the network. The raw TMDB payload is snapshotted to disk: the first lookup reads the
+    snapshot, and refresh() (run by the startup warm-up) re-fetches it from TMDB once it is
+    older than max_age. Until either has produced data, lookups return the default.
+    """
+
+    def __init__(self, name, endpoint, build, snapshot_dir, max_age):
+        self.name = name
+        self.endpoint = endpoint
+        self._build = build  # raw TMDB payload -> dict
+        self.snapshot_path = os.path.join(snapshot_dir, f"{name}.json")
+        self.max_age = max_age
+        self.source = None  # 'snapshot' or 'tmdb' once loaded
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _read_snapshot(self):
+        """Returns (payload, age in seconds), or (None, None) if there is no usable snapshot."""
+        try:
+            with open(self.snapshot_path) as f:
+                payload = json.load(f)
+            return payload, time.time() - os.path.getmtime(self.snapshot_path)
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_snapshot(self, payload):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _ensure_loaded(self):
+        if self._data is not None:
+            return self._data
+        with self._lock:
+            if self._data is None:
+                payload, _ = self._read_snapshot()
+                if payload is not None:
+                    self._data = self._build(payload)
+                    self.source = 'snapshot'
+        return self._data or {}
+
+    def get(self, key, default=None):
+        return self._ensure_loaded().get(key, default)
+
+    def __len__(self):
+        return len(self._ensure_loaded())
+
+    def refresh(self):
+        """Uses a fresh snapshot as is, otherwise fetches from TMDB and rewrites it. Returns the source."""
+        payload, age = self._read_snapshot()
+        if payload is not None and age < self.max_age:
+            with self._lock:
+                self._data = self._build(payload)
+                self.source = 'snapshot'
+            return self.source
+
+        fresh = tmdb_client.get(self.endpoint)
+        if fresh:
+            data = self._build(fresh)
+            self._write_snapshot(fresh)
+            with self._lock:
+                self._data = data
+                self.source = 'tmdb'
+            return self.source
+        if payload is not None:
+            # TMDB is unreachable; a stale snapshot beats an empty map.
+            print(f"Could not refresh {self.name} from TMDB; using a snapshot {age / 3600:.0f}h old.")
+            with self._lock:
+                self._data = self._build(payload)
+                self.source = 'snapshot'
+            return self.source
+        raise RuntimeError(f"No {self.name} data: TMDB request failed and there is no snapshot")
+
+    def status(self):
+        return {'entries': len(self._data or {}), 'source': self.source}
+
+
+def build_genre_map(payload):
+    return {genre['id']: genre['name'] for genre in payload.get('genres', [])}
+
+
+def build_language_map(payload):
+    # 'english_name' -> 'iso_639_1'
+    return {lang['english_name']: lang['iso_639_1'] for lang in payload}
@@ -0,0 +1,324 @@
+# retrain_pipeline.py
+# One command for the nightly model rebuild. Each stage works out what changed since the
+# last run (kept under model_state/) and only redoes the affected work:
+#
+#   export         - ratings.csv from the reviews table (export_ratings.py)
+#   content        - TF-IDF of new/edited movies with the persisted vectorizer, then a
+#                    partial similarity update; full refit once the delta grows too large
+#   collaborative  - SVD warm-started from the previous model, trained on the ratings of
+#                    users whose ratings changed; full refit past a threshold
+#
+#   python retrain_pipeline.py                    # all stages, incremental where possible
+#   python retrain_pipeline.py --skip-export      # ratings.csv already up to date
+#   python retrain_pipeline.py --full --top-k 50  # rebuild everything from scratch
+import argparse
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from surprise import Dataset, Reader, SVD
+from surprise.prediction_algorithms.algo_base import AlgoBase
+from similarity_index import (TopKSimilarity, build_topk_similarity, update_topk_similarity,
+                              update_dense_similarity, load_content_model)
+from model_artifacts import is_model_dir, save_content_model
+
+MOVIES_CSV = 'movies.csv'
+RATINGS_CSV = 'ratings.csv'
+CONTENT_MODEL = 'movie_model'  # directory, see model_artifacts.py
+COLLABORATIVE_MODEL = 'collaborative_model.pkl'
+STATE_DIR = 'model_state'
+
+# Refit the vectorizer once this fraction of the catalogue has changed since the last fit
+# (new words are missing from the vocabulary and the IDF weights drift).
+CONTENT_REFIT_FRACTION = 0.2
+# Refit SVD from scratch once this fraction of users has changed ratings.
+COLLABORATIVE_REFIT_FRACTION = 0.5
+WARM_START_EPOCHS = 5
+
+
+# --- State helpers ---
+def _state_path(name):
+    return os.path.join(STATE_DIR, name)
+
+
+def _load_pickle(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _save_pickle(obj, path):
+    """Writes to a temp file and renames it, so readers never see a half-written model."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def load_manifest():
+    path = _state_path('manifest.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp_path = _state_path('manifest.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, _state_path('manifest.json'))
+
+
+# --- Content stage ---
+def prepare_movies(df):
+    """Adds the 'soup' the vectorizer reads (same recipe as build_model.py always used)."""
+    df = df.copy()
+    df['overview'] = df['overview'].fillna('')
+    df['genres'] = df['genres'].fillna('')
+    df['soup'] = df['overview'] + ' ' + (df['genres'].str.replace(',', ' ') * 3)
+    return df
+
+
+def _row_keys(df):
+    """Stable key per row: tmdb id plus occurrence number, so repeated ids stay distinct."""
+    return (df['id'].astype(str) + '#' + df.groupby('id').cumcount().astype(str)).to_numpy()
+
+
+def _save_content_model(df, similarity):
+    save_content_model(CONTENT_MODEL, df, similarity)
+
+
+def _build_similarity(tfidf_matrix, top_k, block_size):
+    if top_k > 0:
+        return build_topk_similarity(tfidf_matrix, k=top_k, block_size=block_size)
+    return cosine_similarity(tfidf_matrix)
+
+
+def run_content_stage(full=False, top_k=None, block_size=None):
+    """Updates the movie_model/ directory from movies.csv. Returns a summary dict for the manifest."""
+    df = prepare_movies(pd.read_csv(MOVIES_CSV))
+    keys = _row_keys(df)
+    hashes = pd.util.hash_pandas_object(df['soup'], index=False).to_numpy()
+
+    state = _load_pickle(_state_path('content.pkl'))
+    vectorizer = _load_pickle(_state_path('vectorizer.pkl'))
+    if top_k is None:
+        top_k = state['top_k'] if state else 0
+
+    previous_similarity = None
+    if (not full and state is not None and vectorizer is not None and state['top_k'] == top_k
+            and is_model_dir(CONTENT_MODEL)):
+        previous_df, previous_similarity, _, _ = load_content_model(CONTENT_MODEL)
+        if len(previous_df) != len(state['keys']):
+            previous_similarity = None  # model was rebuilt outside the pipeline
+
+    if previous_similarity is not None:
+        old_pos = {key: pos for pos, key in enumerate(state['keys'])}
+        old_rows_csv = np.array([old_pos.get(key, -1) for key in keys], dtype=np.int64)
+
+        # Survivors stay in their previous order and new movies go at the end, so unchanged
+        # rows keep their vectors and most of their similarity rows.
+        survivors = np.flatnonzero(old_rows_csv >= 0)
+        order = np.concatenate([survivors[np.argsort(old_rows_csv[survivors], kind='stable')],
+                                np.flatnonzero(old_rows_csv < 0)])
+        df = df.iloc[order].reset_index(drop=True)
+        keys, hashes, old_rows = keys[order], hashes[order], old_rows_csv[order]
+
+        changed = (old_rows < 0) | (hashes != state['hashes'][np.maximum(old_rows, 0)])
+        removed = len(state['keys']) - int((old_rows >= 0).sum())
+        changed_rows = np.flatnonzero(changed)
+
+        if len(changed_rows) == 0 and removed == 0:
+            print("Content: movies.csv unchanged, nothing to do.")
+            return {'mode': 'unchanged', 'rows': len(df)}
+
+        delta = state['changed_since_fit'] + len(changed_rows) + removed
+        if delta <= CONTENT_REFIT_FRACTION * max(state['rows_at_fit'], 1):
+            print(f"Content: {len(changed_rows)} new or edited movies, {removed} removed; updating incrementally...")
+            previous_tfidf = sp.load_npz(_state_path('tfidf.npz'))
+
+            # Unchanged rows reuse their stored vectors; changed rows are transformed with the
+            # persisted vocabulary.
+            carried = np.flatnonzero(~changed)
+            tfidf_matrix = sp.vstack([
+                previous_tfidf[old_rows[carried]],
+                vectorizer.transform(df['soup'].iloc[changed_rows]),
+            ]).tocsr()
+            # vstack put the carried rows first; restore catalogue order.
+            tfidf_matrix = tfidf_matrix[np.argsort(np.concatenate([carried, changed_rows]), kind='stable')]
+
+            if isinstance(previous_similarity, TopKSimilarity):
+                similarity = update_topk_similarity(previous_similarity, tfidf_matrix, old_rows, changed_rows,
+                                                    block_size=block_size)
+            else:
+                similarity = update_dense_similarity(previous_similarity, tfidf_matrix, old_rows, changed_rows)
+
+            _save_content_model(df, similarity)
+            sp.save_npz(_state_path('tfidf.npz'), tfidf_matrix)
+            _save_pickle({'keys': keys, 'hashes': hashes, 'top_k': top_k,
+                          'rows_at_fit': state['rows_at_fit'], 'changed_since_fit': delta},
+                         _state_path('content.pkl'))
+            return {'mode': 'incremental', 'rows': len(df), 'changed': len(changed_rows), 'removed': removed}
+
+        print(f"Content: {delta} movies changed since the vectorizer was fitted; refitting.")
+
+    print(f"Content: full rebuild of {len(df)} movies...")
+    os.makedirs(STATE_DIR, exist_ok=True)
+    vectorizer = TfidfVectorizer(stop_words='english')
+    tfidf_matrix = vectorizer.fit_transform(df['soup'])
+    similarity = _build_similarity(tfidf_matrix, top_k, block_size)
+
+    _save_content_model(df, similarity)
+    _save_pickle(vectorizer, _state_path('vectorizer.pkl'))
+    sp.save_npz(_state_path('tfidf.npz'), tfidf_matrix)
+    _save_pickle({'keys': keys, 'hashes': hashes, 'top_k': top_k, 'rows_at_fit': len(df), 'changed_since_fit': 0},
+                 _state_path('content.pkl'))
+    return {'mode': 'full', 'rows': len(df)}
+
+
+# --- Collaborative stage ---
+def load_ratings(path=RATINGS_CSV):
+    return pd.read_csv(path)[['user_id', 'movie_id', 'rating']]
+
+
+def changed_users(previous_ratings, ratings_df):
+    """Users with any rating added, removed or changed between the two snapshots."""
+    merged = previous_ratings.drop_duplicates().merge(ratings_df.drop_duplicates(), how='outer', indicator=True)
+    return set(merged.loc[merged['_merge'] != 'both', 'user_id'].tolist())
+
+
+def warm_start_svd(previous, trainset, users, n_epochs=WARM_START_EPOCHS, random_state=0):
+    """
+    An SVD fitted on `trainset` that starts from `previous`'s factors and runs n_epochs of
+    the same SGD updates as surprise's SVD, but only over the ratings of `users` (raw ids).
+    Everyone else keeps their previous factors. New users/items start like a fresh SVD.
+    Returns a plain surprise SVD, so it pickles and predicts exactly like a fully fitted one.
+    """
+    algo = SVD(n_factors=previous.n_factors, n_epochs=n_epochs, biased=previous.biased,
+               init_mean=previous.init_mean, init_std_dev=previous.init_std_dev,
+               lr_bu=previous.lr_bu, lr_bi=previous.lr_bi, lr_pu=previous.lr_pu, lr_qi=previous.lr_qi,
+               reg_bu=previous.reg_bu, reg_bi=previous.reg_bi, reg_pu=previous.reg_pu, reg_qi=previous.reg_qi,
+               random_state=random_state)
+    AlgoBase.fit(algo, trainset)
+
+    rng = np.random.RandomState(random_state)
+    n_factors = algo.n_factors
+    pu = rng.normal(algo.init_mean, algo.init_std_dev, (trainset.n_users, n_factors))
+    qi = rng.normal(algo.init_mean, algo.init_std_dev, (trainset.n_items, n_factors))
+    bu = np.zeros(trainset.n_users)
+    bi = np.zeros(trainset.n_items)
+
+    # Carry over everything the previous model knew, matched by raw id.
+    previous_users = previous.trainset._raw2inner_id_users
+    previous_items = previous.trainset._raw2inner_id_items
+    for raw_uid, inner_uid in trainset._raw2inner_id_users.items():
+        old_uid = previous_users.get(raw_uid)
+        if old_uid is not None:
+            pu[inner_uid] = previous.pu[old_uid]
+            bu[inner_uid] = previous.bu[old_uid]
+    for raw_iid, inner_iid in trainset._raw2inner_id_items.items():
+        old_iid = previous_items.get(raw_iid)
+        if old_iid is not None:
+            qi[inner_iid] = previous.qi[old_iid]
+            bi[inner_iid] = previous.bi[old_iid]
+
+    # Users whose ratings were all removed are simply no longer in the trainset.
+    inner_users = [trainset._raw2inner_id_users[raw_uid] for raw_uid in sorted(users)
+                   if raw_uid in trainset._raw2inner_id_users]
+    ratings = [(u, i, r) for u in inner_users for i, r in trainset.ur[u]]
+    global_mean = trainset.global_mean if algo.biased else 0
+
+    for _ in range(n_epochs):
+        for u, i, r in ratings:
+            err = r - (global_mean + bu[u] + bi[i] + np.dot(qi[i], pu[u]))
+            if algo.biased:
+                bu[u] += algo.lr_bu * (err - algo.reg_bu * bu[u])
+                bi[i] += algo.lr_bi * (err - algo.reg_bi * bi[i])
+            puf = pu[u].copy()
+            pu[u] += algo.lr_pu * (err * qi[i] - algo.reg_pu * puf)
+            qi[i] += algo.lr_qi * (err * puf - algo.reg_qi * qi[i])
+
+    algo.pu, algo.qi, algo.bu, algo.bi = pu, qi, bu, bi
+    return algo
+
+
+def run_collaborative_stage(full=False):
+    """Updates collaborative_model.pkl from ratings.csv. Returns a summary dict for the manifest."""
+    ratings_df = load_ratings()
+    previous_ratings = _load_pickle(_state_path('ratings.pkl'))
+    previous = _load_pickle(COLLABORATIVE_MODEL) if os.path.exists(COLLABORATIVE_MODEL) else None
+
+    data = Dataset.load_from_df(ratings_df, Reader(rating_scale=(1, 5)))
+    trainset = data.build_full_trainset()
+    os.makedirs(STATE_DIR, exist_ok=True)
+
+    if not full and previous is not None and previous_ratings is not None:
+        users = changed_users(previous_ratings, ratings_df)
+        if not users:
+            print("Collaborative: ratings.csv unchanged, nothing to do.")
+            return {'mode': 'unchanged', 'ratings': len(ratings_df)}
+        if len(users) <= COLLABORATIVE_REFIT_FRACTION * max(trainset.n_users, 1):
+            print(f"Collaborative: {len(users)} users with changed ratings; warm-starting SVD...")
+            algo = warm_start_svd(previous, trainset, users)
+            _save_pickle(algo, COLLABORATIVE_MODEL)
+            _save_pickle(ratings_df, _state_path('ratings.pkl'))
+            return {'mode': 'incremental', 'ratings': len(ratings_df), 'users_changed': len(users)}
+        print(f"Collaborative: {len(users)} of {trainset.n_users} users changed; refitting.")
+
+    print(f"Collaborative: full fit on {len(ratings_df)} ratings...")
+    algo = SVD()
+    algo.fit(trainset)
+    _save_pickle(algo, COLLABORATIVE_MODEL)
+    _save_pickle(ratings_df, _state_path('ratings.pkl'))
+    return {'mode': 'full', 'ratings': len(ratings_df)}
+
+
+# --- Pipeline ---
+def run_export_stage(full=False):
+    from export_ratings import export_ratings_to_csv
+    return export_ratings_to_csv(RATINGS_CSV, incremental=not full)
+
+
+def run_pipeline(stages=('export', 'content', 'collaborative'), full=False, top_k=None, block_size=None):
+    manifest = load_manifest()
+    runners = {
+        'export': lambda: run_export_stage(full=full),
+        'content': lambda: run_content_stage(full=full, top_k=top_k, block_size=block_size),
+        'collaborative': lambda: run_collaborative_stage(full=full),
+    }
+    for stage in stages:
+        started = time.perf_counter()
+        summary = runners[stage]()
+        summary['seconds'] = round(time.perf_counter() - started, 2)
+        summary['finished_at'] = datetime.utcnow().isoformat()
+        manifest[stage] = summary
+        save_manifest(manifest)
+        print(f"  -> {stage}: {summary['mode']} in {summary['seconds']}s")
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild the recommendation models, redoing only what changed.")
+    parser.add_argument('--full', action='store_true', help="ignore saved state and rebuild every stage from scratch")
+    parser.add_argument('--skip-export', action='store_true', help="use the existing ratings.csv")
+    parser.add_argument('--stages', default='export,content,collaborative',
+                        help="comma-separated subset of: export, content, collaborative")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="neighbours kept per movie (0 = dense matrix); defaults to the previous build's setting")
+    parser.add_argument("--block-size", type=int, default=None, help="rows per similarity block")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    if args.skip_export and 'export' in stages:
+        stages.remove('export')
+    run_pipeline(stages, full=args.full, top_k=args.top_k, block_size=args.block_size)
+    print("Retrain pipeline finished.")
@@ -0,0 +1,49 @@
+# review_feed.py
+from datetime import datetime
+from sqlalchemy import and_, or_
+from models import db, Review, User
+
+REVIEW_PAGE_SIZE = 20
+
+
+def encode_cursor(timestamp, review_id):
+    return f"{timestamp.isoformat()}_{review_id}"
+
+
+def decode_cursor(cursor):
+    """(timestamp, review id) from encode_cursor's output; raises ValueError if malformed."""
+    timestamp, _, review_id = cursor.rpartition('_')
+    return datetime.fromisoformat(timestamp), int(review_id)
+
+
+def review_page(movie_id=None, tv_id=None, before=None, limit=REVIEW_PAGE_SIZE):
+    """
+    One page of a title's reviews, newest first, as dicts ready for the templates and JSON.
+    Authors come from a single join rather than one users query per review, and paging is
+    keyset-based on (timestamp, id) via the (movie_id|tv_id, timestamp, id) indexes, so a
+    page costs the same however many reviews the title has.
+    `before` is the cursor returned with the previous page. Returns (reviews, next_cursor);
+    next_cursor is None on the last page.
+    """
+    query = db.session.query(Review.id, Review.timestamp, Review.review_text, Review.rating, User.full_name) \
+        .join(User, Review.user_id == User.user_id)
+    if movie_id is not None:
+        query = query.filter(Review.movie_id == movie_id)
+    else:
+        query = query.filter(Review.tv_id == tv_id)
+
+    if before:
+        timestamp, review_id = decode_cursor(before)
+        query = query.filter(or_(Review.timestamp < timestamp,
+                                 and_(Review.timestamp == timestamp, Review.id < review_id)))
+
+    rows = query.order_by(Review.timestamp.desc(), Review.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1].timestamp, rows[limit - 1].id) if len(rows) > limit else None
+    reviews = [{
+        'source': 'Flicksy',
+        'author': full_name,
+        'content': review_text,
+        'rating': rating,
+        'created_at': timestamp.isoformat(),
+    } for _, timestamp, review_text, rating, full_name in rows[:limit]]
+    return reviews, next_cursor
@@ -0,0 +1,201 @@
+# similarity_index.py
+import pickle
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from title_index import TitleIndex
+
+# Upper bound for the temporary (block_size x N) float64 similarity block.
+DEFAULT_MAX_BLOCK_BYTES = 256 * 1024 * 1024
+
+
+class TopKSimilarity:
+    """
+    Compact stand-in for the dense N x N cosine similarity matrix.
+    Only the K most similar movies of every row are kept, as an int32 array of
+    neighbour positions and a float32 array of scores (both N x K, best first).
+
+    Indexing it like the dense matrix (sim[idx]) returns a dense row in which every
+    movie outside the top K scores 0.0, so existing callers keep working unchanged.
+    """
+
+    def __init__(self, neighbors, scores):
+        self.neighbors = np.ascontiguousarray(neighbors, dtype=np.int32)
+        self.scores = np.ascontiguousarray(scores, dtype=np.float32)
+
+    @property
+    def shape(self):
+        n = self.neighbors.shape[0]
+        return (n, n)
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    def __len__(self):
+        return self.neighbors.shape[0]
+
+    def __getitem__(self, idx):
+        n = len(self)
+        if np.ndim(idx) == 0:
+            idx = int(idx)
+            row = np.zeros(n, dtype=np.float32)
+            row[self.neighbors[idx]] = self.scores[idx]
+            row[idx] = 1.0
+            return row
+
+        idx = np.asarray(idx, dtype=np.int64)
+        rows = np.zeros((len(idx), n), dtype=np.float32)
+        positions = np.arange(len(idx))[:, None]
+        rows[positions, self.neighbors[idx]] = self.scores[idx]
+        rows[np.arange(len(idx)), idx] = 1.0
+        return rows
+
+    def top_neighbors(self, idx, n=None):
+        """Returns (positions, scores) of the n nearest neighbours of row idx, best first."""
+        n = self.k if n is None else min(n, self.k)
+        return self.neighbors[idx, :n], self.scores[idx, :n]
+
+
+def _block_rows(n_cols, block_size, max_block_bytes):
+    return block_size or max(1, int(max_block_bytes // (8 * max(n_cols, 1))))
+
+
+def _topk_rows(tfidf_matrix, rows, k, block_size):
+    """Top-K neighbours (positions, scores) of the given rows against every row, self excluded."""
+    neighbors = np.zeros((len(rows), k), dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        block = cosine_similarity(tfidf_matrix[block_rows], tfidf_matrix, dense_output=True)
+
+        # A movie is never its own neighbour.
+        block[np.arange(len(block_rows)), block_rows] = -np.inf
+
+        candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(block, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+
+        neighbors[start:start + len(block_rows)] = np.take_along_axis(candidates, order, axis=1)
+        scores[start:start + len(block_rows)] = np.take_along_axis(candidate_scores, order, axis=1)
+
+    return neighbors, scores
+
+
+def build_topk_similarity(tfidf_matrix, k=50, block_size=None, max_block_bytes=DEFAULT_MAX_BLOCK_BYTES):
+    """
+    Computes the top-K cosine neighbours of every row of tfidf_matrix, one block of
+    rows at a time, so the full N x N similarity matrix never exists in memory.
+    Each row's own entry is excluded from its neighbour list.
+    """
+    n_rows = tfidf_matrix.shape[0]
+    k = max(0, min(k, n_rows - 1))
+
+    if k == 0:
+        return TopKSimilarity(np.zeros((n_rows, 0), dtype=np.int32), np.zeros((n_rows, 0), dtype=np.float32))
+
+    block_size = _block_rows(n_rows, block_size, max_block_bytes)
+    return TopKSimilarity(*_topk_rows(tfidf_matrix, np.arange(n_rows), k, block_size))
+
+
+def update_topk_similarity(previous, tfidf_matrix, old_rows, changed_rows, block_size=None,
+                           max_block_bytes=DEFAULT_MAX_BLOCK_BYTES):
+    """
+    Brings a TopKSimilarity up to date after part of the catalogue changed, without
+    recomputing every row. tfidf_matrix is the new catalogue; old_rows[i] is row i's
+    position in `previous` (-1 for new movies) and changed_rows are the new or re-vectorized
+    rows. Vectors of the other rows must be unchanged (same fitted vectorizer).
+
+    - changed rows, and rows whose neighbour list pointed at a changed or removed movie,
+      are recomputed against the whole catalogue
+    - every other row keeps its list and only merges in its scores against changed rows
+    The result equals a full rebuild up to the order of tied scores.
+    """
+    n_rows = tfidf_matrix.shape[0]
+    k = max(0, min(previous.k, n_rows - 1))
+    old_rows = np.asarray(old_rows, dtype=np.int64)
+    changed = np.zeros(n_rows, dtype=bool)
+    changed[changed_rows] = True
+
+    # Old positions whose movie is gone or has a new vector.
+    carried = ~changed & (old_rows >= 0)
+    stale_old = np.ones(len(previous), dtype=bool)
+    stale_old[old_rows[carried]] = False
+    new_pos_of_old = np.full(len(previous), -1, dtype=np.int64)
+    new_pos_of_old[old_rows[carried]] = np.flatnonzero(carried)
+
+    neighbors = np.zeros((n_rows, k), dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return TopKSimilarity(neighbors, scores)
+
+    carried_rows = np.flatnonzero(carried)
+    old_lists = previous.neighbors[old_rows[carried_rows], :k]
+    needs_recompute = stale_old[old_lists].any(axis=1) | (old_lists.shape[1] < k)
+    recompute = np.concatenate([np.flatnonzero(changed), carried_rows[needs_recompute]])
+    keep = carried_rows[~needs_recompute]
+
+    block_size = _block_rows(n_rows, block_size, max_block_bytes)
+    neighbors[recompute], scores[recompute] = _topk_rows(tfidf_matrix, recompute, k, block_size)
+
+    changed_idx = np.flatnonzero(changed)
+    for start in range(0, len(keep), block_size):
+        rows = keep[start:start + block_size]
+        kept_neighbors = new_pos_of_old[previous.neighbors[old_rows[rows], :k]]
+        kept_scores = previous.scores[old_rows[rows], :k]
+        if len(changed_idx):
+            fresh = cosine_similarity(tfidf_matrix[rows], tfidf_matrix[changed_idx], dense_output=True)
+            kept_neighbors = np.hstack([kept_neighbors, np.broadcast_to(changed_idx, fresh.shape)])
+            kept_scores = np.hstack([kept_scores, fresh.astype(np.float32)])
+        order = np.argsort(-kept_scores, axis=1, kind='stable')[:, :k]
+        neighbors[rows] = np.take_along_axis(kept_neighbors, order, axis=1)
+        scores[rows] = np.take_along_axis(kept_scores, order, axis=1)
+
+    return TopKSimilarity(neighbors, scores)
+
+
+def update_dense_similarity(previous, tfidf_matrix, old_rows, changed_rows):
+    """Dense counterpart of update_topk_similarity: copies unchanged pairs, recomputes changed rows/columns."""
+    n_rows = tfidf_matrix.shape[0]
+    old_rows = np.asarray(old_rows, dtype=np.int64)
+    changed = np.zeros(n_rows, dtype=bool)
+    changed[changed_rows] = True
+
+    similarity = np.empty((n_rows, n_rows), dtype=previous.dtype)
+    carried_rows = np.flatnonzero(~changed & (old_rows >= 0))
+    similarity[np.ix_(carried_rows, carried_rows)] = previous[np.ix_(old_rows[carried_rows], old_rows[carried_rows])]
+
+    changed_idx = np.flatnonzero(changed)
+    if len(changed_idx):
+        fresh = cosine_similarity(tfidf_matrix[changed_idx], tfidf_matrix)
+        similarity[changed_idx, :] = fresh
+        similarity[:, changed_idx] = fresh.T
+    return similarity
+
+
+def load_pickled_content_model(path="movie_model.pkl"):
+    """Loads a content model pickled by the old build_model.py (three or four parts)."""
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+
+    # Models built before the title index existed only hold three parts.
+    if len(model) == 3:
+        movies_df, similarity, indices = model
+        title_index = TitleIndex(movies_df['title'])
+    else:
+        movies_df, similarity, indices, title_index = model
+    return movies_df, similarity, indices, title_index
+
+
+def load_content_model(path="movie_model", verify=False):
+    """
+    Loads the content-based model written by build_model.py.
+    Returns (movies_df, similarity, indices, title_index); similarity is either the
+    dense NumPy matrix or a TopKSimilarity, and both can be passed straight to
+    get_recommendations / get_hybrid_recommendations.
+    `path` is a model directory (memory-mapped, see model_artifacts.py) or a legacy .pkl file.
+    """
+    from model_artifacts import is_model_dir, open_content_model
+    if is_model_dir(path):
+        return open_content_model(path, verify=verify)
+    return load_pickled_content_model(path)
@@ -0,0 +1,105 @@
+# startup.py
+import os
+import sys
+import threading
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class StartupTracker:
+    """
+    Runs the slow startup phases (database schema, model load, TMDB reference data) on
+    background threads instead of at import time, so importing app.py stays cheap for
+    scripts and workers can answer requests while they warm up.
+
+    start() is idempotent per process: a forked worker that inherited the tracker starts
+    its own warm-up once. Per-component state and the time from import to the first
+    response are reported by status() for the readiness endpoint.
+    """
+
+    def __init__(self, imported_at=None):
+        self.imported_at = imported_at if imported_at is not None else time.perf_counter()
+        self.import_seconds = None
+        self.first_response_seconds = None
+        self._components = {}  # name -> (func, required)
+        self._state = {}
+        self._started_pid = None
+        self._lock = threading.Lock()
+
+    def register(self, name, func, required=True):
+        """Adds a warm-up phase. Components that are not required do not hold back readiness."""
+        self._components[name] = (func, required)
+        self._state[name] = {'state': 'pending', 'seconds': None, 'peak_rss_mb': None, 'error': None}
+
+    def mark_imported(self):
+        self.import_seconds = round(time.perf_counter() - self.imported_at, 3)
+
+    def start(self):
+        """Starts every registered phase on its own daemon thread, once per process."""
+        pid = os.getpid()
+        if self._started_pid == pid:
+            return
+        with self._lock:
+            if self._started_pid == pid:
+                return
+            self._started_pid = pid
+            for name in self._components:
+                self._state[name] = {'state': 'warming', 'seconds': None, 'peak_rss_mb': None, 'error': None}
+                threading.Thread(target=self._run, args=(name,), name=f'warmup-{name}', daemon=True).start()
+
+    def run_in_foreground(self):
+        """Runs the phases one after another on this thread (for profiling); returns their states."""
+        with self._lock:
+            self._started_pid = os.getpid()
+        for name in self._components:
+            self._state[name] = {'state': 'warming', 'seconds': None, 'peak_rss_mb': None, 'error': None}
+            self._run(name)
+        return {name: dict(state) for name, state in self._state.items()}
+
+    def _run(self, name):
+        func, _ = self._components[name]
+        started = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            traceback.print_exc()
+            self._state[name] = {'state': 'failed', 'seconds': round(time.perf_counter() - started, 3),
+                                 'peak_rss_mb': peak_rss_mb(), 'error': str(e)}
+            return
+        state = 'failed' if result is False else 'ready'
+        self._state[name] = {'state': state, 'seconds': round(time.perf_counter() - started, 3),
+                             'peak_rss_mb': peak_rss_mb(),
+                             'error': None if state == 'ready' else f"{name} did not load"}
+
+    def record_response(self):
+        if self.first_response_seconds is None:
+            self.first_response_seconds = round(time.perf_counter() - self.imported_at, 3)
+
+    @property
+    def ready(self):
+        return all(self._state[name]['state'] == 'ready'
+                   for name, (_, required) in self._components.items() if required)
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'pid': os.getpid(),
+            'import_seconds': self.import_seconds,
+            'peak_rss_mb': peak_rss_mb(),
+            'import_to_first_response_seconds': self.first_response_seconds,
+            'components': {name: dict(state) for name, state in self._state.items()},
+        }
@@ -145,39 +145,87 @@ async function submitTvReview() {
 }
 
 /**
- * Creates the HTML for a new review and prepends it to the reviews container.
- * @param {object} review - The review object returned from the server.
+ * Escapes text from other users before it is put into innerHTML.
  */
-function addNewReviewToDOM(review) {
-    const reviewsContainer = document.getElementById('reviews-container');
-    const placeholder = reviewsContainer.querySelector('p');
-    if (placeholder) {
-        placeholder.remove();
-    }
+function escapeHTML(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
 
+/**
+ * Builds the card element for one Flicksy review.
+ * @param {object} review - A review object returned from the server.
+ */
+function buildReviewElement(review) {
     let starsHTML = '';
     for (let i = 1; i <= 5; i++) {
         starsHTML += `<i class="ri-star-fill ${i <= review.rating ? 'text-yellow-400' : 'text-gray-600'}"></i>`;
     }
 
-    const newReviewElement = document.createElement('div');
-    newReviewElement.className = 'glass-panel p-4 flex items-start space-x-4 w-96 flex-shrink-0';
-    newReviewElement.innerHTML = `
+    const reviewElement = document.createElement('div');
+    reviewElement.className = 'glass-panel p-4 flex items-start space-x-4 w-96 flex-shrink-0';
+    reviewElement.dataset.source = 'Flicksy';
+    reviewElement.innerHTML = `
         <div class="flex-shrink-0">
             <div class="w-12 h-12 rounded-full bg-purple-800 flex items-center justify-center font-bold text-xl">
-                ${review.author[0]}
+                ${escapeHTML(review.author[0])}
             </div>
         </div>
         <div class="flex-1 min-w-0">
             <div class="flex items-center space-x-3">
-                <span class="font-semibold">${review.author}</span>
+                <span class="font-semibold">${escapeHTML(review.author)}</span>
                 <span class="text-sm text-gray-400">via Flicksy</span>
             </div>
             <div class="flex text-yellow-400 mt-1">${starsHTML}</div>
-            <p class="text-gray-300 mt-2 text-sm leading-relaxed break-words">${review.content}</p>
+            <p class="text-gray-300 mt-2 text-sm leading-relaxed break-words">${escapeHTML(review.content)}</p>
         </div>
     `;
-    reviewsContainer.prepend(newReviewElement);
+    return reviewElement;
+}
+
+/**
+ * Creates the HTML for a new review and prepends it to the reviews container.
+ * @param {object} review - The review object returned from the server.
+ */
+function addNewReviewToDOM(review) {
+    const reviewsContainer = document.getElementById('reviews-container');
+    const placeholder = reviewsContainer.querySelector('p');
+    if (placeholder) {
+        placeholder.remove();
+    }
+    reviewsContainer.prepend(buildReviewElement(review));
+}
+
+/**
+ * Fetches the next page of Flicksy reviews and adds it after the ones already shown
+ * (and before the TMDB reviews). The cursor for the page lives on the container.
+ * @param {string} reviewsUrl - The JSON endpoint for this title's reviews.
+ */
+let loadingReviews = false;
+async function loadMoreReviews(reviewsUrl) {
+    const reviewsContainer = document.getElementById('reviews-container');
+    const cursor = reviewsContainer.dataset.nextCursor;
+    if (!cursor || loadingReviews) {
+        return;
+    }
+
+    loadingReviews = true;
+    try {
+        const response = await fetch(`${reviewsUrl}?before=${encodeURIComponent(cursor)}`);
+        if (!response.ok) throw new Error('Network response was not ok');
+        const page = await response.json();
+
+        const firstTmdbReview = reviewsContainer.querySelector('[data-source="TMDB"]');
+        page.reviews.forEach(review => {
+            reviewsContainer.insertBefore(buildReviewElement(review), firstTmdbReview);
+        });
+        reviewsContainer.dataset.nextCursor = page.next_cursor || '';
+    } catch (error) {
+        console.error('Error loading more reviews:', error);
+    } finally {
+        loadingReviews = false;
+    }
 }
 
 
@@ -188,8 +236,9 @@ function addNewReviewToDOM(review) {
 
 /**
  * Sets up arrow button controls for the horizontal review scroller.
+ * Older reviews are loaded from reviewsUrl as the scroller nears its end.
  */
-function setupReviewScroller() {
+function setupReviewScroller(reviewsUrl) {
     const reviewsContainer = document.getElementById('reviews-container');
     const scrollLeftBtn = document.getElementById('scroll-left-btn');
     const scrollRightBtn = document.getElementById('scroll-right-btn');
@@ -204,6 +253,11 @@ function setupReviewScroller() {
         scrollLeftBtn.disabled = reviewsContainer.scrollLeft < 1;
         const maxScrollLeft = reviewsContainer.scrollWidth - reviewsContainer.clientWidth;
         scrollRightBtn.disabled = reviewsContainer.scrollLeft >= (maxScrollLeft - 1);
+        if (reviewsContainer.scrollLeft >= maxScrollLeft - 2 * scrollAmount) {
+            loadMoreReviews(reviewsUrl).then(() => {
+                scrollRightBtn.disabled = reviewsContainer.scrollLeft >= (reviewsContainer.scrollWidth - reviewsContainer.clientWidth - 1);
+            });
+        }
     };
 
     scrollRightBtn.addEventListener('click', () => {
@@ -233,7 +287,7 @@ document.addEventListener('DOMContentLoaded', () => {
         displayWatchProviders(tvId);
         
         // 2. Set up the interactive horizontal review scroller.
-        setupReviewScroller();
+        setupReviewScroller(`/api/tv/${tvId}/flicksy-reviews`);
         
         // 3. Add the event listener for the review submit button.
         const submitBtn = document.getElementById('submitReviewBtn');
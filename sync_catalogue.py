@@ -0,0 +1,245 @@
+# sync_catalogue.py
+# Incremental refresh of the movies table from TMDB's changes feed.
+# Only movies TMDB reports as changed since the last run are re-fetched, and their rows
+# are updated in place (votes, certification, providers, trailer, ...), with fetched_at set.
+# Movies that still fail after the in-run retries go to the sync_retries table and the
+# high-water mark moves on; each run retries that list first, dropping a movie after
+# MAX_RETRY_RUNS failed runs, so one broken movie cannot hold the mark back.
+#
+#   python sync_catalogue.py                      # since the stored high-water mark
+#   python sync_catalogue.py --since 2024-05-01   # explicit start date
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app import app
+from models import db, Movie, SyncState, SyncRetry
+from movie_store import GENRE_IDS, stored_movie_ids, bulk_update_movies, store_genres
+from tmdb_client import BULK_MAX_RETRY_WAIT, TMDBClient, RateLimiter
+from tmdb_parsers import DETAIL_APPENDS, certification, trailer_key, watch_providers
+
+SYNC_NAME = 'tmdb_movie_changes'
+# TMDB's changes endpoints accept at most 14 days per query.
+MAX_WINDOW = timedelta(days=14)
+MAX_WORKERS = 16
+# Extra passes over movies whose refetch failed (timeouts, 5xx, retries exhausted) before
+# the window is given up on; the client already retries each request on its own.
+FAILED_FETCH_PASSES = 2
+FAILED_FETCH_BACKOFF = 5  # seconds before the first extra pass, doubled after each
+# Runs a movie may stay on the retry list before it is dropped (it is fetched again when it next changes).
+MAX_RETRY_RUNS = 10
+
+# Uncached on purpose: the point of the job is fresh data. Set TMDB_BASE_URL to point it at a fake server.
+tmdb_client = TMDBClient(pool_maxsize=MAX_WORKERS, rate_limiter=RateLimiter(), cache=None,
+                         max_retry_wait=BULK_MAX_RETRY_WAIT)
+
+
+# --- High-water mark ---
+def get_high_water_mark():
+    """Where the last run stopped; falls back to the newest fetched_at, then to one window ago."""
+    state = db.session.get(SyncState, SYNC_NAME)
+    if state is not None:
+        return state.synced_until
+    newest = db.session.query(db.func.max(Movie.fetched_at)).scalar()
+    return newest or datetime.utcnow() - MAX_WINDOW
+
+
+def set_high_water_mark(synced_until):
+    state = db.session.get(SyncState, SYNC_NAME)
+    if state is None:
+        db.session.add(SyncState(name=SYNC_NAME, synced_until=synced_until))
+    else:
+        state.synced_until = synced_until
+    db.session.commit()
+
+
+# --- Retry list ---
+def pending_retries():
+    """{tmdb_id: row id} of movies earlier runs could not refresh; ids no longer stored are dropped."""
+    retries = SyncRetry.query.filter_by(name=SYNC_NAME).all()
+    stored = stored_movie_ids([retry.tmdb_id for retry in retries])
+    for retry in retries:
+        if retry.tmdb_id not in stored:
+            db.session.delete(retry)
+    db.session.commit()
+    return stored
+
+
+def record_retries(attempted, failed):
+    """
+    Updates the retry list after refreshing `attempted` tmdb ids: ids in `failed` are added or
+    have their attempt count raised, the rest are removed. Returns the ids dropped for good
+    after MAX_RETRY_RUNS failed runs.
+    """
+    existing = {retry.tmdb_id: retry for retry in SyncRetry.query.filter_by(name=SYNC_NAME)}
+    dropped = []
+    for tmdb_id in attempted:
+        retry = existing.get(tmdb_id)
+        if tmdb_id not in failed:
+            if retry is not None:
+                db.session.delete(retry)
+        elif retry is None:
+            db.session.add(SyncRetry(name=SYNC_NAME, tmdb_id=tmdb_id, attempts=1))
+        elif retry.attempts + 1 >= MAX_RETRY_RUNS:
+            db.session.delete(retry)
+            dropped.append(tmdb_id)
+        else:
+            retry.attempts += 1
+    db.session.commit()
+    return sorted(dropped)
+
+
+def _report_failures(failed, dropped):
+    if failed:
+        print(f"Could not refresh TMDB ids {sorted(failed)[:20]}{' ...' if len(failed) > 20 else ''}; "
+              f"they are retried on the next run.")
+    if dropped:
+        print(f"Giving up on TMDB ids {dropped[:20]}{' ...' if len(dropped) > 20 else ''} "
+              f"after {MAX_RETRY_RUNS} failed runs.")
+
+
+# --- Changes feed ---
+def changed_movie_ids(start, end, pool):
+    """tmdb ids of movies changed between start and end (at most MAX_WINDOW apart)."""
+    params = {'start_date': start.strftime('%Y-%m-%d'), 'end_date': end.strftime('%Y-%m-%d')}
+    first = tmdb_client.get("movie/changes", {**params, 'page': 1})
+    if first is None:
+        return None
+
+    pages = [first] + list(pool.map(
+        lambda page_num: tmdb_client.get("movie/changes", {**params, 'page': page_num}),
+        range(2, first.get('total_pages', 1) + 1)
+    ))
+    if any(page is None for page in pages):
+        return None
+    return [item['id'] for page in pages for item in page.get('results', []) if item.get('id')]
+
+
+# --- Detail refresh ---
+def fetch_update(tmdb_id, row_id):
+    """
+    (status, row) for one stored movie. row holds fresh column values when status is 200;
+    404 means TMDB no longer returns the movie; any other status (None when the request
+    could not be completed) is a failure worth retrying.
+    """
+    status, details = tmdb_client.request(f"movie/{tmdb_id}", {'append_to_response': DETAIL_APPENDS})
+    if status != 200:
+        return status, None
+    if not details or not details.get('id'):
+        return 404, None
+    cert, cert_country = certification(details.get('release_dates'), any_region=True)
+    return 200, {
+        'id': row_id,
+        'title': details.get('title'),
+        'overview': details.get('overview'),
+        'poster_path': f"https://image.tmdb.org/t/p/w500{details['poster_path']}" if details.get('poster_path') else None,
+        'runtime': details.get('runtime'),
+        'adult': details.get('adult', False),
+        'vote_average': details.get('vote_average'),
+        'vote_count': details.get('vote_count'),
+        'rating': details.get('vote_average'),
+        'certification': cert,
+        'certification_country': cert_country,
+        'platform': watch_providers(details.get('watch/providers')),
+        'trailer_key': trailer_key(details.get('videos')),
+        'genre': ", ".join(g['name'] for g in details.get('genres', [])),
+        GENRE_IDS: [g['id'] for g in details.get('genres', [])],
+        'fetched_at': datetime.utcnow(),
+    }
+
+
+def refresh_movies(stored, pool, batch_size=200):
+    """
+    Re-fetches stored movies ({tmdb_id: row id}) in batches and updates them in place.
+    Movies whose fetch failed get FAILED_FETCH_PASSES more tries. Returns (updated, missing,
+    failed), where failed is {tmdb_id: row id} of the movies that still could not be fetched.
+    """
+    updated = missing = 0
+    pending = dict(stored)
+    for attempt in range(FAILED_FETCH_PASSES + 1):
+        if attempt:
+            time.sleep(FAILED_FETCH_BACKOFF * 2 ** (attempt - 1))
+            print(f"Retrying {len(pending)} movies whose refresh failed (pass {attempt + 1}).")
+        failed = {}
+        items = list(pending.items())
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            results = list(pool.map(lambda item: fetch_update(*item), batch))
+            for (tmdb_id, row_id), (status, _) in zip(batch, results):
+                if status == 404:
+                    missing += 1
+                elif status != 200:
+                    failed[tmdb_id] = row_id
+            updated += bulk_update_movies([row for status, row in results if status == 200])
+        pending = failed
+        if not pending:
+            break
+    return updated, missing, pending
+
+
+def sync(since=None, until=None, workers=8, batch_size=200):
+    """
+    Retries the movies earlier runs could not refresh, then walks [since, until] in
+    MAX_WINDOW steps, advancing the high-water mark after each window. Movies that fail are
+    put on the retry list rather than holding the mark back.
+    """
+    started = time.perf_counter()
+    since = since or get_high_water_mark()
+    until = until or datetime.utcnow()
+    total_changed = total_updated = 0
+
+    # Genre ids in the refreshed rows must exist in the genres table.
+    genre_data = tmdb_client.get("genre/movie/list")
+    if genre_data:
+        store_genres({g['id']: g['name'] for g in genre_data.get('genres', [])})
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sync') as pool:
+        retries = pending_retries()
+        if retries:
+            updated, missing, failed = refresh_movies(retries, pool, batch_size)
+            print(f"Retry list: {len(retries)} movies, {updated} updated, {missing} no longer available, "
+                  f"{len(failed)} failed.")
+            _report_failures(failed, record_retries(retries, failed))
+            total_changed += len(retries)
+            total_updated += updated
+
+        window_start = since
+        while window_start < until:
+            window_end = min(window_start + MAX_WINDOW, until)
+            changed = changed_movie_ids(window_start, window_end, pool)
+            if changed is None:
+                print(f"Could not read the changes feed for {window_start:%Y-%m-%d}..{window_end:%Y-%m-%d}. "
+                      f"Stopping; the next run resumes here.")
+                break
+
+            stored = stored_movie_ids(changed)
+            updated, missing, failed = refresh_movies(stored, pool, batch_size)
+            print(f"{window_start:%Y-%m-%d}..{window_end:%Y-%m-%d}: {len(changed)} changed on TMDB, "
+                  f"{len(stored)} stored, {updated} updated, {missing} no longer available, "
+                  f"{len(failed)} failed.")
+            total_changed += len(stored)
+            total_updated += updated
+            # Recorded before the mark moves, so a crash in between cannot lose the failed ids.
+            _report_failures(failed, record_retries(stored, failed))
+
+            set_high_water_mark(window_end)
+            window_start = window_end
+
+    elapsed = time.perf_counter() - started
+    print(f"Sync finished: {total_updated}/{total_changed} stored movies refreshed in {elapsed:.1f}s.")
+    return total_updated
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Refresh stored movies that changed on TMDB since the last sync.")
+    parser.add_argument('--since', type=lambda s: datetime.strptime(s, '%Y-%m-%d'),
+                        help="start date (YYYY-MM-DD); defaults to the stored high-water mark")
+    parser.add_argument('--workers', type=int, default=8, help=f"concurrent TMDB requests (max {MAX_WORKERS})")
+    parser.add_argument('--batch-size', type=int, default=200, help="movies per bulk update")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()  # sync_state / genre tables on first run
+        sync(since=args.since, workers=max(1, min(args.workers, MAX_WORKERS)), batch_size=args.batch_size)
+        print("TMDB request stats:")
+        tmdb_client.print_stats()
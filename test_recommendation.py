@@ -1,20 +1,20 @@
-import pickle
 from recommend import get_recommendations
+from similarity_index import load_content_model
 
 # Step 1: Load the complete model file
 try:
-    with open("movie_model.pkl", "rb") as f:
-        # Load all three components at once.
-        df, similarity_matrix, indices = pickle.load(f)
+    # Load all components at once (works for both dense and top-K models).
+    df, similarity_matrix, indices, title_index = load_content_model("movie_model")
 except FileNotFoundError:
-    print("Model file 'movie_model.pkl' not found. Please run build_model.py first.")
+    print("Model 'movie_model/' not found. Please run build_model.py first.")
     exit()
 
 # Step 2: Get user input
 movie_name = input("Enter a movie title to get recommendations: ")
 
 # Step 3: Get recommendations from the refactored function
-matched_title, recommended_movies = get_recommendations(movie_name, similarity_matrix, df, indices)
+matched_title, recommended_movies = get_recommendations(movie_name, similarity_matrix, df, indices,
+                                                         title_index=title_index)
 
 # Step 4: Display the results cleanly
 if not recommended_movies:
@@ -25,4 +25,4 @@ else:
     print("-" * 30)
     for i, movie in enumerate(recommended_movies, 1):
         print(f"{i}. {movie}")
-    print("-" * 30)
\ No newline at end of file
+    print("-" * 30)
@@ -0,0 +1,88 @@
+# tests/conftest.py
+# Run with `python -m pytest tests` from the repository root. The app is pointed at a
+# throwaway SQLite database and an unroutable TMDB base URL before anything imports it.
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_TMP = tempfile.mkdtemp(prefix='flicksy-tests-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_TMP, 'test.db')}")
+os.environ.setdefault('TMDB_BASE_URL', 'http://127.0.0.1:9/3')
+os.environ.setdefault('REFERENCE_SNAPSHOT_DIR', os.path.join(_TMP, 'reference_data'))
+
+
+@pytest.fixture
+def flask_app(monkeypatch):
+    """The app with fresh, empty tables; background warm-up is switched off."""
+    import app as app_module
+    monkeypatch.setattr(app_module.startup, 'start', lambda: None)
+    app_module.app.config['TESTING'] = True
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        yield app_module.app
+        app_module.db.session.remove()
+        app_module.db.drop_all()
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+class StubTMDB:
+    """
+    Local HTTP server standing in for TMDB. routes maps a path below /3 (e.g. 'movie/550')
+    to a function(params) -> (status, body) or (status, body, headers); unknown paths are 404.
+    Every request is recorded as (path, params).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                path = url.path.removeprefix('/3/')
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                stub.requests.append((path, params))
+                route = stub.routes.get(path)
+                status, body, headers = (route(params) + ({},))[:3] if route else (404, {}, {})
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/3"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def requested(self, path):
+        return [params for requested_path, params in self.requests if requested_path == path]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def tmdb_stub():
+    stub = StubTMDB()
+    yield stub
+    stub.close()
@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from models import db, User, Movie, Review
+from export_ratings import export_ratings_to_csv
+from ratings_store import load_export_arrays
+
+
+def _add_reviews(ratings):
+    """ratings: [(user_id, tmdb_id, rating)]; users and movies are created as needed."""
+    posted = datetime.utcnow() - timedelta(hours=1)
+    for user_id, tmdb_id, rating in ratings:
+        if db.session.get(User, user_id) is None:
+            db.session.add(User(user_id=user_id, full_name=f"User {user_id}", email=f"{user_id}@example.com",
+                                password_hash='x'))
+        movie = Movie.query.filter_by(tmdb_id=tmdb_id).first()
+        if movie is None:
+            movie = Movie(tmdb_id=tmdb_id, title=f"Movie {tmdb_id}")
+            db.session.add(movie)
+            db.session.flush()
+        db.session.add(Review(user_id=user_id, movie_id=movie.id, review_text='', rating=rating,
+                              timestamp=posted))
+    db.session.commit()
+
+
+def test_full_npy_export_leaves_the_live_columns_intact(flask_app, tmp_path):
+    csv_path, npy_dir = str(tmp_path / 'ratings.csv'), str(tmp_path / 'ratings_npy')
+    _add_reviews([(1, 550, 5), (1, 680, 4), (2, 550, 3)])
+    export_ratings_to_csv(csv_path, npy_dir=npy_dir, settle_seconds=0)
+    live = load_export_arrays(npy_dir)
+    assert live['movie_id'].tolist() == [550, 680, 550]
+
+    _add_reviews([(2, 13, 2)])
+    summary = export_ratings_to_csv(csv_path, npy_dir=npy_dir, settle_seconds=0)
+
+    # A reader holding the first export still sees it; the new export is a separate set of files.
+    assert live['rating'].tolist() == [5, 4, 3]
+    fresh = load_export_arrays(npy_dir)
+    assert summary['mode'] == 'full'
+    assert fresh['user_id'].tolist() == [1, 1, 2, 2]
+    assert fresh['movie_id'].tolist() == [550, 680, 550, 13]
+
+
+def test_incremental_export_appends_to_the_manifest_files(flask_app, tmp_path):
+    csv_path, npy_dir = str(tmp_path / 'ratings.csv'), str(tmp_path / 'ratings_npy')
+    _add_reviews([(1, 550, 5)])
+    export_ratings_to_csv(csv_path, npy_dir=npy_dir, settle_seconds=0)
+    _add_reviews([(2, 680, 1), (3, 550, 4)])
+    summary = export_ratings_to_csv(csv_path, incremental=True, npy_dir=npy_dir, settle_seconds=0)
+
+    assert (summary['mode'], summary['exported'], summary['ratings']) == ('incremental', 2, 3)
+    arrays = load_export_arrays(npy_dir)
+    assert arrays['user_id'].tolist() == [1, 2, 3]
+    assert arrays['rating'].dtype == np.int8
+    assert sum(name.endswith('.bin') for name in os.listdir(npy_dir)) == 3
+
+
+def test_old_column_files_are_pruned_two_exports_later(flask_app, tmp_path):
+    csv_path, npy_dir = str(tmp_path / 'ratings.csv'), str(tmp_path / 'ratings_npy')
+    _add_reviews([(1, 550, 5)])
+    for _ in range(3):
+        export_ratings_to_csv(csv_path, npy_dir=npy_dir, settle_seconds=0)
+    # The live export and the one before it.
+    assert sum(name.endswith('.bin') for name in os.listdir(npy_dir)) == 6
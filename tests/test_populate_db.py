@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from conftest import ROOT
+
+GENRES = [{'id': 28, 'name': 'Action'}, {'id': 35, 'name': 'Comedy'}, {'id': 18, 'name': 'Drama'},
+          {'id': 27, 'name': 'Horror'}, {'id': 10749, 'name': 'Romance'}]
+
+LISTINGS = {
+    ('en', '28'): [
+        {'id': 101, 'title': 'Heat', 'poster_path': '/heat.jpg', 'genre_ids': [28, 18], 'release_date': '1995-12-15',
+         'original_language': 'en', 'vote_count': 7000, 'vote_average': 7.9, 'overview': 'Cops and robbers.'},
+        {'id': 102, 'title': 'No Poster', 'poster_path': None, 'genre_ids': [28]},
+        {'id': 103, 'title': 'Speed', 'poster_path': '/speed.jpg', 'genre_ids': [28], 'original_language': 'en'},
+    ],
+    # 101 again, so it must be stored once.
+    ('en', '18'): [
+        {'id': 101, 'title': 'Heat', 'poster_path': '/heat.jpg', 'genre_ids': [28, 18], 'original_language': 'en'},
+    ],
+    ('hi', '35'): [
+        {'id': 201, 'title': 'Andaz Apna Apna', 'poster_path': '/aaa.jpg', 'genre_ids': [35], 'original_language': 'hi'},
+    ],
+}
+
+DETAILS = {
+    101: {'id': 101, 'runtime': 170,
+          'release_dates': {'results': [{'iso_3166_1': 'US', 'release_dates': [{'certification': 'R'}]}]},
+          'watch/providers': {'results': {'US': {'flatrate': [{'provider_name': 'Max'}]}}},
+          'videos': {'results': [{'type': 'Trailer', 'site': 'YouTube', 'key': 'heat-trailer'}]}},
+    103: {'id': 103, 'runtime': 116},
+    201: {'id': 201, 'runtime': 160,
+          'release_dates': {'results': [{'iso_3166_1': 'IN', 'release_dates': [{'certification': 'U'}]}]}},
+}
+
+
+def _serve_catalogue(stub):
+    stub.routes['genre/movie/list'] = lambda params: (200, {'genres': GENRES})
+    stub.routes['discover/movie'] = lambda params: (200, {
+        'page': int(params['page']), 'total_pages': 1,
+        'results': LISTINGS.get((params['with_original_language'], params['with_genres']), [])
+        if params['page'] == '1' else []})
+    for tmdb_id, details in DETAILS.items():
+        stub.routes[f'movie/{tmdb_id}'] = lambda params, details=details: (200, details)
+
+
+def _populate(stub, db_path):
+    env = {**os.environ, 'TMDB_BASE_URL': stub.base_url, 'DATABASE_URL': f"sqlite:///{db_path}"}
+    result = subprocess.run([sys.executable, 'populate_db.py', '--pages', '2', '--workers', '4'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def test_populate_db_stores_movies_from_the_tmdb_stub(tmdb_stub, tmp_path):
+    _serve_catalogue(tmdb_stub)
+    db_path = tmp_path / 'populate.db'
+
+    output = _populate(tmdb_stub, db_path)
+    assert "Inserted 3 movies" in output
+
+    with sqlite3.connect(db_path) as conn:
+        movies = {row[0]: row[1:] for row in conn.execute(
+            "SELECT tmdb_id, title, genre, poster_path, certification, platform,"
+            " trailer_key, runtime FROM movies")}
+        genres = dict(conn.execute("SELECT id, name FROM genres"))
+        movie_genres = sorted(conn.execute(
+            "SELECT m.tmdb_id, mg.genre_id FROM movie_genres mg JOIN movies m ON m.id = mg.movie_id"))
+
+    assert movies == {
+        101: ('Heat', 'Action, Drama', 'https://image.tmdb.org/t/p/w500/heat.jpg', 'R', 'Max', 'heat-trailer', 170),
+        103: ('Speed', 'Action', 'https://image.tmdb.org/t/p/w500/speed.jpg', None, None, None, 116),
+        201: ('Andaz Apna Apna', 'Comedy', 'https://image.tmdb.org/t/p/w500/aaa.jpg', 'U', None, None, 160),
+    }
+    assert genres == {genre['id']: genre['name'] for genre in GENRES}
+    assert movie_genres == [(101, 18), (101, 28), (103, 28), (201, 35)]
+    # Every language/genre query was listed, and only new movies were enriched.
+    assert len(tmdb_stub.requested('discover/movie')) == 7 * 5 * 2
+    assert len(tmdb_stub.requested('movie/101')) == 1
+
+
+def test_second_run_skips_stored_movies(tmdb_stub, tmp_path):
+    _serve_catalogue(tmdb_stub)
+    db_path = tmp_path / 'populate.db'
+    _populate(tmdb_stub, db_path)
+    tmdb_stub.requests.clear()
+
+    output = _populate(tmdb_stub, db_path)
+
+    assert "3 already stored, 0 new" in output
+    assert not [path for path, _ in tmdb_stub.requests if path.startswith('movie/')]
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0] == 3
@@ -0,0 +1,26 @@
+import numpy as np
+from recommend import top_n_indices
+
+
+def test_returns_best_first_with_ties_in_position_order():
+    scores = np.array([0.2, 0.9, 0.5, 0.9, 0.1, 0.5])
+    assert top_n_indices(scores, 4).tolist() == [1, 3, 2, 5]
+
+
+def test_sparse_row_of_zeros_returns_exactly_n():
+    scores = np.zeros(200000)
+    scores[[7, 150000, 42]] = [0.3, 0.8, 0.3]
+    top = top_n_indices(scores, 10)
+
+    assert len(top) == 10
+    assert top[:3].tolist() == [150000, 7, 42]
+    assert not scores[top[3:]].any()
+    assert top[3:].tolist() == sorted(top[3:].tolist())
+    assert top_n_indices(scores, 10).tolist() == top.tolist()
+
+
+def test_exclude_mask_and_positions():
+    scores = np.array([0.4, 0.8, 0.6, 0.2])
+    assert top_n_indices(scores, 2, exclude=[1]).tolist() == [2, 0]
+    assert top_n_indices(scores, 5, exclude=np.array([True, False, True, False])).tolist() == [1, 3]
+    assert top_n_indices(scores, 0).tolist() == []
@@ -0,0 +1,48 @@
+import pytest
+from recommendation_cache import MemoryBackend, RecommendationCache, SQLiteBackend
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'sqlite':
+        return RecommendationCache(SQLiteBackend(str(tmp_path / 'cache.sqlite3')))
+    return RecommendationCache(MemoryBackend())
+
+
+def test_get_or_compute_caches_the_result(cache):
+    assert cache.get_or_compute(1, 'v1', 8, lambda: ['a']) == ['a']
+    assert cache.get_or_compute(1, 'v1', 8, lambda: ['b']) == ['a']
+    assert cache.get(1, 'v2', 8) is None
+
+
+def test_result_computed_across_an_invalidation_is_not_cached(cache):
+    cache.set(2, 'v1', 8, ['other user'])
+
+    def compute():
+        # The user rates something (another request) while their recommendations are computed.
+        cache.invalidate_user(1)
+        return ['stale']
+
+    assert cache.get_or_compute(1, 'v1', 8, compute) == ['stale']
+    assert cache.get(1, 'v1', 8) is None
+    assert cache.get(2, 'v1', 8) == ['other user']
+    assert cache.get_or_compute(1, 'v1', 8, lambda: ['fresh']) == ['fresh']
+    assert cache.get(1, 'v1', 8) == ['fresh']
+
+
+def test_clear_also_rejects_results_started_before_it(cache):
+    def compute():
+        cache.clear()
+        return ['stale']
+
+    cache.get_or_compute(1, 'v1', 8, compute)
+    assert cache.get(1, 'v1', 8) is None
+
+
+def test_sqlite_invalidation_reaches_other_workers(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a, worker_b = RecommendationCache(SQLiteBackend(path)), RecommendationCache(SQLiteBackend(path))
+    generation = worker_a.generation(1)
+    worker_b.invalidate_user(1)
+    worker_a.set(1, 'v1', 8, ['stale'], generation=generation)
+    assert worker_b.get(1, 'v1', 8) is None
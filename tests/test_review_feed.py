@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from models import db, User, Movie, Review
+from review_feed import REVIEW_PAGE_SIZE
+
+
+def _movie_with_reviews(count):
+    user = User(full_name='Reviewer', email='reviewer@example.com', password_hash='x')
+    movie = Movie(tmdb_id=550, title='Fight Club')
+    db.session.add_all([user, movie])
+    db.session.flush()
+    started = datetime(2024, 1, 1)
+    for i in range(count):
+        db.session.add(Review(user_id=user.user_id, movie_id=movie.id, review_text=f"review {i}", rating=4,
+                              timestamp=started + timedelta(minutes=i)))
+    db.session.commit()
+    return movie
+
+
+def test_flicksy_reviews_have_their_own_endpoint(flask_app):
+    adapter = flask_app.url_map.bind('localhost')
+    assert adapter.match('/api/movie/550/reviews')[0] == 'get_movie_reviews'
+    assert adapter.match('/api/movie/550/flicksy-reviews')[0] == 'get_flicksy_movie_reviews'
+    assert adapter.match('/api/tv/1399/flicksy-reviews')[0] == 'get_flicksy_tv_reviews'
+
+
+def test_flicksy_reviews_page_with_cursor(client):
+    _movie_with_reviews(REVIEW_PAGE_SIZE + 5)
+
+    first = client.get('/api/movie/550/flicksy-reviews').get_json()
+    assert [r['content'] for r in first['reviews']] == [f"review {i}" for i in range(24, 4, -1)]
+    assert first['next_cursor']
+
+    second = client.get('/api/movie/550/flicksy-reviews', query_string={'before': first['next_cursor']}).get_json()
+    assert [r['content'] for r in second['reviews']] == [f"review {i}" for i in range(4, -1, -1)]
+    assert second['next_cursor'] is None
+
+
+def test_flicksy_reviews_reject_bad_cursor(client):
+    _movie_with_reviews(1)
+    response = client.get('/api/movie/550/flicksy-reviews', query_string={'before': 'not-a-cursor'})
+    assert response.status_code == 400
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import pytest
+from models import db, Movie, SyncRetry
+
+
+class FakeTMDB:
+    """Stands in for sync_catalogue.tmdb_client: a fixed changes feed, and movie/<id> returns 500 for broken ids."""
+
+    def __init__(self, changed, broken):
+        self.changed = changed
+        self.broken = set(broken)
+        self.detail_requests = []
+
+    def get(self, endpoint, params=None):
+        if endpoint == 'genre/movie/list':
+            return {'genres': [{'id': 18, 'name': 'Drama'}]}
+        if endpoint == 'movie/changes':
+            return {'page': 1, 'total_pages': 1, 'results': [{'id': tmdb_id} for tmdb_id in self.changed]}
+        raise AssertionError(f"unexpected endpoint {endpoint}")
+
+    def request(self, endpoint, params=None):
+        tmdb_id = int(endpoint.split('/')[1])
+        self.detail_requests.append(tmdb_id)
+        if tmdb_id in self.broken:
+            return 500, None
+        return 200, {'id': tmdb_id, 'title': f"Movie {tmdb_id} (updated)", 'genres': [{'id': 18, 'name': 'Drama'}]}
+
+
+@pytest.fixture
+def sync_module(flask_app, monkeypatch):
+    import sync_catalogue
+    monkeypatch.setattr(sync_catalogue, 'FAILED_FETCH_BACKOFF', 0)
+    for tmdb_id in (101, 102, 103):
+        db.session.add(Movie(tmdb_id=tmdb_id, title=f"Movie {tmdb_id}"))
+    db.session.commit()
+    return sync_catalogue
+
+
+def test_permanently_failing_movie_does_not_pin_the_high_water_mark(sync_module, monkeypatch):
+    fake = FakeTMDB(changed=[101, 102, 103], broken=[102])
+    monkeypatch.setattr(sync_module, 'tmdb_client', fake)
+    since = datetime(2024, 5, 1)
+    until = since + timedelta(days=3)
+
+    sync_module.sync(since=since, until=until, workers=2)
+
+    assert sync_module.get_high_water_mark() == until
+    assert Movie.query.filter_by(tmdb_id=101).one().title == "Movie 101 (updated)"
+    assert Movie.query.filter_by(tmdb_id=102).one().title == "Movie 102"
+    retry = SyncRetry.query.one()
+    assert (retry.tmdb_id, retry.attempts) == (102, 1)
+
+    # The next run retries the failed id even though the feed no longer reports it.
+    fake.changed, fake.detail_requests = [], []
+    sync_module.sync(since=until, until=until + timedelta(days=1), workers=2)
+    assert 102 in fake.detail_requests
+    assert sync_module.get_high_water_mark() == until + timedelta(days=1)
+    assert SyncRetry.query.one().attempts == 2
+
+
+def test_retry_list_drops_a_movie_after_max_runs_and_clears_on_success(sync_module, monkeypatch):
+    monkeypatch.setattr(sync_module, 'MAX_RETRY_RUNS', 3)
+    fake = FakeTMDB(changed=[102], broken=[102])
+    monkeypatch.setattr(sync_module, 'tmdb_client', fake)
+    day = datetime(2024, 5, 1)
+
+    sync_module.sync(since=day, until=day + timedelta(days=1), workers=1)
+    fake.changed = []
+    sync_module.sync(since=day + timedelta(days=1), until=day + timedelta(days=2), workers=1)
+    assert SyncRetry.query.one().attempts == 2
+    sync_module.sync(since=day + timedelta(days=2), until=day + timedelta(days=3), workers=1)
+    assert SyncRetry.query.count() == 0
+
+    fake.changed = [103]
+    fake.broken = {103}
+    sync_module.sync(since=day + timedelta(days=3), until=day + timedelta(days=4), workers=1)
+    assert SyncRetry.query.one().tmdb_id == 103
+    fake.broken = set()
+    fake.changed = []
+    sync_module.sync(since=day + timedelta(days=4), until=day + timedelta(days=5), workers=1)
+    assert SyncRetry.query.count() == 0
+    assert Movie.query.filter_by(tmdb_id=103).one().title == "Movie 103 (updated)"
@@ -0,0 +1,36 @@
+import time
+from tmdb_client import TMDBClient
+
+
+def _client(stub, **kwargs):
+    return TMDBClient(api_key='test', base_url=stub.base_url, cache=None, **kwargs)
+
+
+def test_long_retry_after_is_capped(tmdb_stub):
+    calls = []
+
+    def throttled(params):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            return 429, {'status_message': 'Too many requests'}, {'Retry-After': '3600'}
+        return 200, {'id': 550}
+
+    tmdb_stub.routes['movie/550'] = throttled
+    started = time.monotonic()
+    status, data = _client(tmdb_stub, max_retry_wait=0.2).request('movie/550')
+
+    assert (status, data) == (200, {'id': 550})
+    assert len(calls) == 3
+    assert time.monotonic() - started < 3
+    # Each wait was the cap rather than the hour TMDB asked for.
+    assert all(0.15 <= later - earlier < 1.5 for earlier, later in zip(calls, calls[1:]))
+
+
+def test_persistent_429_gives_up_after_the_retries(tmdb_stub):
+    tmdb_stub.routes['movie/550'] = lambda params: (429, {}, {'Retry-After': '600'})
+    started = time.monotonic()
+    status, data = _client(tmdb_stub, max_retries=2, max_retry_wait=0.1).request('movie/550')
+
+    assert (status, data) == (429, None)
+    assert len(tmdb_stub.requested('movie/550')) == 3
+    assert time.monotonic() - started < 3
@@ -0,0 +1,127 @@
+# title_index.py
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+import numpy as np
+
+
+def normalize_title(title):
+    """Lowercases, strips accents and punctuation, and collapses whitespace."""
+    title = unicodedata.normalize('NFKD', str(title))
+    title = ''.join(ch for ch in title if not unicodedata.combining(ch))
+    return re.sub(r'[\W_]+', ' ', title.lower()).strip()
+
+
+def _trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    Prebuilt lookup structure for resolving user-typed titles to model rows.
+    Resolution goes: exact title -> normalized title -> trigram candidates,
+    and only the small candidate set is ranked with SequenceMatcher (the same
+    ratio difflib.get_close_matches uses). Results are kept in an LRU cache.
+    """
+
+    def __init__(self, titles, max_candidates=50, posting_budget=20000, cache_size=4096):
+        self.max_candidates = max_candidates
+        self.posting_budget = posting_budget
+        self.cache_size = cache_size
+
+        self._exact = {}       # original title -> first row
+        self._normalized = {}  # normalized title -> position in self._titles
+        self._titles = []      # distinct normalized titles
+        self._display = []     # original title for each distinct normalized title
+        self._rows = []        # first model row for each distinct normalized title
+
+        postings = {}
+        for row, title in enumerate(titles):
+            if not isinstance(title, str) or not title:
+                continue
+            self._exact.setdefault(title, row)
+            normalized = normalize_title(title)
+            if normalized in self._normalized:
+                continue
+            position = len(self._titles)
+            self._normalized[normalized] = position
+            self._titles.append(normalized)
+            self._display.append(title)
+            self._rows.append(row)
+            for gram in _trigrams(normalized):
+                postings.setdefault(gram, []).append(position)
+
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._gram_counts = np.asarray([len(_trigrams(t)) for t in self._titles], dtype=np.int32)
+        self._init_cache()
+
+    def _init_cache(self):
+        self._resolve_cached = lru_cache(maxsize=self.cache_size)(self._resolve)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_resolve_cached', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_cache()
+
+    def __len__(self):
+        return len(self._titles)
+
+    def resolve(self, query, cutoff=0.6):
+        """
+        Returns (matched_title, row) for the best match of query, or (None, None)
+        when nothing scores at least `cutoff`.
+        """
+        return self._resolve_cached(query, cutoff)
+
+    def _resolve(self, query, cutoff):
+        if query in self._exact:
+            return query, self._exact[query]
+
+        normalized = normalize_title(query)
+        if not normalized:
+            return None, None
+        position = self._normalized.get(normalized)
+        if position is not None:
+            return self._display[position], self._rows[position]
+
+        candidates = self._candidates(normalized)
+        matcher = SequenceMatcher()
+        matcher.set_seq2(normalized)
+        best_score, best_position = cutoff, None
+        for position in candidates:
+            matcher.set_seq1(self._titles[position])
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score > best_score or (score == best_score and best_position is None):
+                best_score, best_position = score, position
+
+        if best_position is None:
+            return None, None
+        return self._display[best_position], self._rows[best_position]
+
+    def _candidates(self, normalized):
+        """Positions of the titles sharing the most (rarest) trigrams with normalized."""
+        grams = _trigrams(normalized)
+        lists = sorted((self._postings[g] for g in grams if g in self._postings), key=len)
+        if not lists:
+            return []
+
+        # Use the rarest trigrams first and stop before common ones blow up the candidate set.
+        selected, total = [], 0
+        for ids in lists:
+            if selected and total + len(ids) > self.posting_budget:
+                break
+            selected.append(ids)
+            total += len(ids)
+
+        ids, shared = np.unique(np.concatenate(selected), return_counts=True)
+        dice = 2.0 * shared / (len(grams) + self._gram_counts[ids])
+        top = np.argsort(-dice, kind='stable')[:self.max_candidates]
+        return ids[top].tolist()
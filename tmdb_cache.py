@@ -0,0 +1,144 @@
+# tmdb_cache.py
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# (endpoint pattern, fresh TTL in seconds). First match wins.
+DEFAULT_TTL_RULES = [
+    (r'^(genre|configuration)/', 7 * DAY),           # genre and language lists barely change
+    (r'^trending/', 6 * HOUR),                       # trending/movie/week
+    (r'^discover/', 2 * HOUR),                       # upcoming, popular on a platform
+    (r'^search/', 15 * MINUTE),
+    (r'^(movie|tv)/\d+/(videos|credits|release_dates)$', DAY),
+    (r'^(movie|tv|person)/\d+', 30 * MINUTE),        # details, reviews, providers, images
+]
+DEFAULT_TTL = 10 * MINUTE
+NOT_FOUND_TTL = 30 * MINUTE
+
+
+def make_cache_key(endpoint_path, params=None):
+    """endpoint + sorted params, without the api_key, so equivalent calls share an entry."""
+    endpoint_path = endpoint_path.strip('/')
+    items = sorted(
+        (str(k), str(v).lower() if isinstance(v, bool) else str(v))
+        for k, v in (params or {}).items()
+        if k != 'api_key' and v is not None
+    )
+    return endpoint_path + '?' + '&'.join(f'{k}={v}' for k, v in items)
+
+
+class TMDBResponseCache:
+    """
+    Shared, size-bounded cache of TMDB JSON responses.
+    - per-endpoint fresh TTLs (see DEFAULT_TTL_RULES)
+    - stale-while-revalidate: for stale_factor x TTL after expiry the old value is still
+      returned immediately while one background thread refreshes it
+    - 404s are cached as "not found" for NOT_FOUND_TTL
+    - least recently used entries are evicted past max_entries
+    """
+
+    def __init__(self, max_entries=5000, ttl_rules=None, default_ttl=DEFAULT_TTL,
+                 not_found_ttl=NOT_FOUND_TTL, stale_factor=1.0):
+        self.max_entries = max_entries
+        self.ttl_rules = [(re.compile(p), ttl) for p, ttl in (ttl_rules or DEFAULT_TTL_RULES)]
+        self.default_ttl = default_ttl
+        self.not_found_ttl = not_found_ttl
+        self.stale_factor = stale_factor
+        self._entries = OrderedDict()  # key -> (data, fresh_until, stale_until)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = self.stale_hits = self.misses = 0
+
+    def ttl_for(self, endpoint_path):
+        endpoint_path = endpoint_path.strip('/')
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(endpoint_path):
+                return ttl
+        return self.default_ttl
+
+    def get_or_fetch(self, endpoint_path, params, fetch):
+        """
+        Returns the cached response for (endpoint_path, params), calling fetch() on a miss.
+        fetch() must return (status_code, data): 200 responses are cached, 404s are cached
+        as None, and anything else (e.g. (None, None) after a network error) is not cached.
+        Callers get their own copy, so mutating the result never touches the cache.
+        """
+        return copy.deepcopy(self._get_or_fetch(endpoint_path, params, fetch))
+
+    def _get_or_fetch(self, endpoint_path, params, fetch):
+        key = make_cache_key(endpoint_path, params)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                data, fresh_until, stale_until = entry
+                if now < fresh_until:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return data
+                if now < stale_until:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, endpoint_path, fetch),
+                                         daemon=True).start()
+                    return data
+            self.misses += 1
+
+        return self._fetch_and_store(key, endpoint_path, fetch)
+
+    def _refresh(self, key, endpoint_path, fetch):
+        try:
+            self._fetch_and_store(key, endpoint_path, fetch)
+        except Exception as e:
+            print(f"Background refresh failed for '{key}': {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _fetch_and_store(self, key, endpoint_path, fetch):
+        status, data = fetch()
+        if status == 200:
+            self.store(key, data, self.ttl_for(endpoint_path))
+        elif status == 404:
+            self.store(key, None, self.not_found_ttl)
+            data = None
+        else:
+            # Transient failure: keep serving whatever we had, if anything.
+            with self._lock:
+                entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+        return data
+
+    def store(self, key, data, ttl):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (data, now + ttl, now + ttl * (1 + self.stale_factor))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, endpoint_path, params=None):
+        with self._lock:
+            self._entries.pop(make_cache_key(endpoint_path, params), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits,
+                    'stale_hits': self.stale_hits, 'misses': self.misses}
+
+
+# One cache per process, shared by app.py, populate_db.py and tmdb_importer.py.
+tmdb_cache = TMDBResponseCache()
@@ -0,0 +1,161 @@
+# tmdb_client.py
+import re
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import TMDB_API_KEY, TMDB_BASE_URL, TMDB_RATE_LIMIT
+from tmdb_cache import tmdb_cache
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+# Longest wait between retries, whether from backoff or a Retry-After header. The default
+# suits request threads; bulk jobs, which nobody is waiting on, pass a longer one.
+MAX_RETRY_WAIT = 2
+BULK_MAX_RETRY_WAIT = 60
+
+
+def endpoint_group(endpoint_path):
+    """movie/550/videos -> movie/{id}/videos, so stats are per endpoint rather than per title."""
+    return re.sub(r'/\d+(?=/|$)', '/{id}', endpoint_path.strip('/'))
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every thread using a client: on average at most `rate`
+    requests per second, with bursts of up to `burst`. acquire() blocks until a token is free.
+    """
+
+    def __init__(self, rate=TMDB_RATE_LIMIT, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Take the token now (possibly going negative) so waiting threads queue up fairly.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _CappedRetry(Retry):
+    """Retry that honours Retry-After only up to max_retry_after seconds (TMDB may ask for minutes)."""
+
+    def __init__(self, *args, max_retry_after=MAX_RETRY_WAIT, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kw):
+        kw.setdefault('max_retry_after', self.max_retry_after)
+        return super().new(**kw)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.max_retry_after)
+
+
+class TMDBClient:
+    """
+    Shared HTTP client for every TMDB call in the project.
+    - one keep-alive requests.Session with sized connection pools
+    - retries with exponential backoff on connection errors, 429 and 5xx,
+      honoring the Retry-After header TMDB sends with 429s up to max_retry_wait seconds,
+      so a long Retry-After cannot stall the request thread; the rate limiter does the pacing
+    - a timeout on every call
+    - per-endpoint call/error/latency counters (see stats())
+    - optional response caching through tmdb_cache
+    - optional client-side rate limiting (see RateLimiter) for bulk jobs
+    """
+
+    def __init__(self, api_key=TMDB_API_KEY, base_url=TMDB_BASE_URL, pool_connections=4, pool_maxsize=32,
+                 max_retries=3, backoff_factor=0.5, max_retry_wait=MAX_RETRY_WAIT, timeout=DEFAULT_TIMEOUT,
+                 cache=tmdb_cache, rate_limiter=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+
+        retry_strategy = _CappedRetry(
+            total=max_retries, backoff_factor=backoff_factor, backoff_max=max_retry_wait,
+            status_forcelist=[429, 500, 502, 503, 504], allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True, raise_on_status=False, max_retry_after=max_retry_wait
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              max_retries=retry_strategy)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def request(self, endpoint_path, params=None, timeout=None):
+        """
+        Performs one GET (retries happen inside the connection adapter).
+        Returns (status_code, data); (None, None) if the request could not be completed.
+        """
+        url = f"{self.base_url}/{endpoint_path.strip('/')}"
+        all_params = {'api_key': self.api_key, **(params or {})}
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        started = time.perf_counter()
+        status, data = None, None
+        try:
+            response = self.session.get(url, params=all_params, timeout=timeout or self.timeout)
+            status = response.status_code
+            if status == 200:
+                data = response.json()
+            elif status != 404:
+                print(f"TMDB request for '{endpoint_path}' failed with status {status}.")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"TMDB request for '{endpoint_path}' failed. Error: {e}")
+            status = None
+        finally:
+            self._record(endpoint_path, time.perf_counter() - started, ok=status in (200, 404))
+        return status, data
+
+    def get(self, endpoint_path, params=None, timeout=None, use_cache=True):
+        """Returns the JSON for a TMDB endpoint, or None if it was not found or the request failed."""
+        params = params or {}
+        if use_cache and self.cache is not None:
+            return self.cache.get_or_fetch(endpoint_path, params,
+                                           lambda: self.request(endpoint_path, params, timeout))
+        status, data = self.request(endpoint_path, params, timeout)
+        return data if status == 200 else None
+
+    def _record(self, endpoint_path, elapsed, ok):
+        group = endpoint_group(endpoint_path)
+        with self._stats_lock:
+            entry = self._stats.setdefault(group, {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['calls'] += 1
+            entry['errors'] += 0 if ok else 1
+            entry['total_ms'] += elapsed * 1000
+            entry['max_ms'] = max(entry['max_ms'], elapsed * 1000)
+
+    def stats(self):
+        """Per-endpoint counters: calls, errors, avg_ms and max_ms."""
+        with self._stats_lock:
+            return {
+                group: {'calls': s['calls'], 'errors': s['errors'],
+                        'avg_ms': round(s['total_ms'] / s['calls'], 1), 'max_ms': round(s['max_ms'], 1)}
+                for group, s in self._stats.items()
+            }
+
+    def print_stats(self):
+        for group, s in sorted(self.stats().items()):
+            print(f"  {group}: {s['calls']} calls, {s['errors']} errors, avg {s['avg_ms']} ms, max {s['max_ms']} ms")
+
+
+# One client (and connection pool) per process.
+tmdb_client = TMDBClient()
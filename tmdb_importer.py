@@ -1,178 +1,118 @@
-from tmdbv3api import TMDb, Movie as TMDbMovie, TV
 from models import db, Movie
 from datetime import datetime
-import requests
-from sqlalchemy.exc import IntegrityError
-import time # Import the time module for delays
+from movie_store import GENRE_IDS, stored_movie_ids, upsert_movies, bulk_update_movies, store_genres
+from tmdb_client import tmdb_client
+from tmdb_parsers import DETAIL_APPENDS, certification, trailer_key
 
-# --- SETUP ---
-tmdb = TMDb()
-tmdb.api_key = "YOUR_API_KEY"
-
-tmdb.language = 'en'
-tmdb.debug = True
-
-tmdb_movie = TMDbMovie()
-tmdb_tv = TV()
+# --- FUNCTIONS ---
+# All TMDB calls go through the shared tmdb_client, which retries with backoff,
+# applies timeouts and caches responses.
 
-# --- CONSTANTS FOR RETRY LOGIC ---
-MAX_RETRIES = 3
-RETRY_DELAY_SECONDS = 5
+# Columns refreshed on movies that are already stored (TMDB popularity data changes daily).
+TRENDING_REFRESH_COLUMNS = ['is_trending', 'vote_average', 'vote_count', 'rating']
 
-# --- FUNCTIONS ---
 
-def fetch_and_store_trending_movies(app):
+def fetch_and_store_trending_movies(app, combined=True):
     """
-    Fetches popular movies, gets their details, and stores them in the database.
-    Includes retry logic for the main API calls.
+    Fetches popular movies, gets details for the ones not stored yet, and upserts them.
+    Movies already stored only get their trending flag and vote counts refreshed.
+    combined=True fetches details, videos and release dates in one request per movie;
+    combined=False makes the three calls separately.
     """
-    trending = None
-    for attempt in range(MAX_RETRIES):
-        try:
-            print(f"Attempting to fetch popular movies list (Attempt {attempt + 1}/{MAX_RETRIES})...")
-            trending = tmdb_movie.popular()
-            print("Successfully fetched popular movies list.")
-            break # Success, exit the loop
-        except requests.exceptions.ConnectionError as e:
-            print(f"Connection error fetching popular list: {e}")
-            if attempt < MAX_RETRIES - 1:
-                print(f"Retrying in {RETRY_DELAY_SECONDS} seconds...")
-                time.sleep(RETRY_DELAY_SECONDS)
-            else:
-                print("Max retries reached for popular movies list. Aborting.")
-                return # Exit the function if we can't get the initial list
-
-    if not trending:
+    print("Fetching popular movies list...")
+    trending = tmdb_client.get("movie/popular")
+    if not trending or not trending.get('results'):
+        print("Could not fetch popular movies list. Aborting.")
         return
+    print("Successfully fetched popular movies list.")
+
+    popular = {m['id']: m for m in trending['results'] if m.get('id')}
 
     with app.app_context():
-        for m in trending:
-            if Movie.query.filter_by(tmdb_id=m.id).first():
+        # One IN query instead of a lookup per movie
+        stored = stored_movie_ids(popular.keys())
+
+        refreshed = bulk_update_movies([
+            {'id': stored[tmdb_id], 'is_trending': True, 'vote_average': m.get('vote_average'),
+             'vote_count': m.get('vote_count'), 'rating': m.get('vote_average')}
+            for tmdb_id, m in popular.items() if tmdb_id in stored
+        ])
+        # Movies that dropped off the list are no longer trending
+        Movie.query.filter(Movie.is_trending.is_(True), Movie.tmdb_id.notin_(list(popular))) \
+            .update({'is_trending': False}, synchronize_session=False)
+        db.session.commit()
+
+        new_rows, genre_map = [], {}
+        for tmdb_id in popular:
+            if tmdb_id in stored:
                 continue
 
-            # Get detailed info with retry logic
-            details = None
-            for attempt in range(MAX_RETRIES):
-                try:
-                    details = tmdb_movie.details(m.id)
-                    break # Success
-                except requests.exceptions.ConnectionError as e:
-                    print(f"Connection error fetching details for TMDB ID {m.id}: {e}")
-                    if attempt < MAX_RETRIES - 1:
-                        time.sleep(RETRY_DELAY_SECONDS)
-                    else:
-                        print(f"Max retries reached for TMDB ID {m.id}. Skipping movie.")
-            
-            if not details or not getattr(details, 'id', None):
+            # Get detailed info
+            details = fetch_movie_details(tmdb_id) if combined else tmdb_client.get(f"movie/{tmdb_id}")
+            if not details or not details.get('id'):
+                print(f"Could not fetch details for TMDB ID {tmdb_id}. Skipping movie.")
                 continue
 
-            # Get trailer and certification (these functions now have their own retry logic)
-            trailer_key = get_movie_trailer(details.id)
-            certification, cert_country = get_certification(details.id, "US")
+            # Get trailer and certification, from the combined payload when there is one
+            if combined:
+                movie_trailer = trailer_key(details.get('videos'))
+                cert, cert_country = certification(details.get('release_dates'), regions=("US",))
+            else:
+                movie_trailer = get_movie_trailer(details['id'])
+                cert, cert_country = get_certification(details['id'], "US")
 
             try:
-                release_date = datetime.strptime(details.release_date, '%Y-%m-%d') if details.release_date else None
+                release_date = datetime.strptime(details['release_date'], '%Y-%m-%d') if details.get('release_date') else None
             except (ValueError, TypeError):
                 release_date = None
 
-            genres = ", ".join([g['name'] for g in details.genres]) if hasattr(details, 'genres') else ""
-            poster_path = f"https://image.tmdb.org/t/p/w500{details.poster_path}" if details.poster_path else None
-            backdrop_path = f"https://image.tmdb.org/t/p/w780{details.backdrop_path}" if details.backdrop_path else None
-
-            movie = Movie(
-                tmdb_id=details.id,
-                title=details.title,
-                genre=genres,
-                language=details.original_language,
-                is_trending=True,
-                release_date=release_date,
-                link=f"https://www.themoviedb.org/movie/{details.id}",
-                poster_path=poster_path,
-                backdrop_path=backdrop_path,
-                overview=details.overview,
-                rating=details.vote_average,
-                vote_count=details.vote_count,
-                runtime=details.runtime,
-                trailer_key=trailer_key,
-                certification=certification,
-                certification_country=cert_country,
-                adult=details.adult
-            )
-            db.session.add(movie)
-
-        try:
-            db.session.commit()
-        except IntegrityError:
-            db.session.rollback()
-            print("Duplicate found during commit — skipped.")
+            genres = ", ".join([g['name'] for g in details.get('genres', [])])
+            genre_map.update({g['id']: g['name'] for g in details.get('genres', [])})
+            poster_path = f"https://image.tmdb.org/t/p/w500{details['poster_path']}" if details.get('poster_path') else None
+            backdrop_path = f"https://image.tmdb.org/t/p/w780{details['backdrop_path']}" if details.get('backdrop_path') else None
+
+            new_rows.append({
+                'tmdb_id': details['id'],
+                'title': details.get('title'),
+                'genre': genres,
+                GENRE_IDS: [g['id'] for g in details.get('genres', [])],
+                'language': details.get('original_language'),
+                'is_trending': True,
+                'release_date': release_date,
+                'link': f"https://www.themoviedb.org/movie/{details['id']}",
+                'poster_path': poster_path,
+                'backdrop_path': backdrop_path,
+                'overview': details.get('overview'),
+                'vote_average': details.get('vote_average'),
+                'rating': details.get('vote_average'),
+                'vote_count': details.get('vote_count'),
+                'runtime': details.get('runtime'),
+                'trailer_key': movie_trailer,
+                'certification': cert,
+                'certification_country': cert_country,
+                'adult': details.get('adult', False),
+                'fetched_at': datetime.utcnow(),
+            })
+
+        store_genres(genre_map)
+        # A movie stored concurrently since the IN query is updated rather than rejected.
+        inserted = upsert_movies(new_rows, TRENDING_REFRESH_COLUMNS)
+        print(f"Stored {inserted} new trending movies, refreshed {refreshed} existing ones.")
+
+
+def fetch_movie_details(tmdb_id):
+    """Details with videos, release dates and watch providers appended (one request)."""
+    return tmdb_client.get(f"movie/{tmdb_id}", {'append_to_response': DETAIL_APPENDS})
 
 
 def get_movie_trailer(movie_id):
-    """Fetches the YouTube trailer key for a movie, with retry logic."""
-    api_key = tmdb.api_key # Use the globally defined API key
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/videos"
-    params = {"api_key": api_key, "language": "en-US"}
-
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-            data = response.json()
-
-            for video in data.get('results', []):
-                if video.get('type') == 'Trailer' and video.get('site') == 'YouTube':
-                    return video.get('key')
-            return None # Found no trailer, so no need to retry
-        except requests.exceptions.ConnectionError as e:
-            print(f"Error fetching trailer for movie ID {movie_id} (Attempt {attempt + 1}): {e}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY_SECONDS)
-        except requests.exceptions.RequestException as e:
-            # For other errors like timeouts or bad responses, don't retry
-            print(f"A non-connection error occurred fetching trailer for movie ID {movie_id}: {e}")
-            break
-    
-    return None
+    """Fetches the YouTube trailer key for a movie."""
+    return trailer_key(tmdb_client.get(f"movie/{movie_id}/videos", {"language": "en-US"}))
 
 
 def get_certification(tmdb_id, region="US"):
-    """Fetches the content rating for a movie, with retry logic."""
-    api_key = tmdb.api_key
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}/release_dates"
-    params = {"api_key": api_key}
-
-    for attempt in range(MAX_RETRIES):
-        try:
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-
-            # Search for the target region first
-            for entry in data.get("results", []):
-                if entry.get("iso_3166_1") == region:
-                    for rd in entry.get("release_dates", []):
-                        cert = rd.get("certification")
-                        if cert and cert.strip():
-                            return cert.strip().upper(), region
-            
-            # If not found, fallback to searching for US certification
-            for entry in data.get("results", []):
-                if entry.get("iso_3166_1") == "US":
-                    for rd in entry.get("release_dates", []):
-                        cert = rd.get("certification")
-                        if cert and cert.strip():
-                            return cert.strip().upper(), "US"
-            
-            return None, None # Found no certification, no need to retry
-        except requests.exceptions.ConnectionError as e:
-            print(f"Error fetching certification for movie ID {tmdb_id} (Attempt {attempt + 1}): {e}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY_SECONDS)
-        except requests.exceptions.RequestException as e:
-            print(f"A non-connection error occurred fetching certification for movie ID {tmdb_id}: {e}")
-            break
-            
-    return None, None
+    """Fetches the content rating for a movie; falls back to the US rating."""
+    return certification(tmdb_client.get(f"movie/{tmdb_id}/release_dates"), regions=(region, "US"))
 
 
 # The save_movie function seems to be for a different purpose and doesn't make network calls
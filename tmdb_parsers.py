@@ -0,0 +1,54 @@
+# tmdb_parsers.py
+# Pure helpers that pull fields out of TMDB movie payloads.
+# Each one takes the body of the standalone endpoint (movie/{id}/videos, .../release_dates,
+# .../watch/providers), which is also what details carry under the same key when fetched with
+# append_to_response=DETAIL_APPENDS:
+#
+#   details = tmdb_client.get(f"movie/{tmdb_id}", {'append_to_response': DETAIL_APPENDS})
+#   trailer_key(details.get('videos'))
+
+# One detail request instead of four per movie.
+DETAIL_APPENDS = 'videos,release_dates,watch/providers'
+
+
+def trailer_key(videos):
+    """YouTube key of the first trailer, or None."""
+    for video in (videos or {}).get('results', []):
+        if video.get('type') == 'Trailer' and video.get('site') == 'YouTube':
+            return video.get('key')
+    return None
+
+
+def certification(release_dates, regions=("US",), any_region=False):
+    """
+    (certification, country) from the first of `regions` that has one; with any_region,
+    falls back to the first certification listed for any country. (None, None) if none is found.
+    """
+    results = (release_dates or {}).get('results', [])
+
+    def first_cert(entry):
+        for rd in entry.get('release_dates', []):
+            cert = rd.get('certification')
+            if cert and cert.strip():
+                return cert.strip().upper()
+        return None
+
+    for region in regions:
+        for entry in results:
+            if entry.get('iso_3166_1') == region:
+                cert = first_cert(entry)
+                if cert:
+                    return cert, region
+    if any_region:
+        for entry in results:
+            cert = first_cert(entry)
+            if cert:
+                return cert, entry.get('iso_3166_1')
+    return None, None
+
+
+def watch_providers(providers, region="US"):
+    """Comma-separated, sorted names of the flat-rate (subscription) providers in region, or None."""
+    flatrate = (providers or {}).get('results', {}).get(region, {}).get('flatrate', [])
+    names = [p.get('provider_name') for p in flatrate if p.get('provider_name')]
+    return ", ".join(sorted(names)) if names else None